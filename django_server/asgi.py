@@ -0,0 +1,16 @@
+"""
+ASGI config for django_server project.
+
+It exposes the ASGI callable as a module-level variable named ``application``, serving the same views as
+``wsgi.py`` so both can be run side by side.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from marknote.asgi import ASGIHandler
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_server.settings")
+
+application = ASGIHandler(get_wsgi_application())
@@ -2,3 +2,5 @@
 # 9/6/18
 
 __version__ = '1.0.2'
+
+default_app_config = 'marknote.apps.MarknoteConfig'
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class MarknoteConfig(AppConfig):
     name = 'marknote'
+
+    def ready(self):
+        from marknote import signals  # noqa: F401
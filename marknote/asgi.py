@@ -0,0 +1,159 @@
+import asyncio
+import io
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from marknote.settings import marknote_settings
+
+
+def get_environ(scope, body):
+    """
+    Returns the WSGI environ of an ASGI HTTP scope and the file holding its request body.
+    """
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI strings carry the raw bytes as latin-1
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/{}'.format(scope.get('http_version', '1.1')),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        value = value.decode('latin-1')
+        if name in environ:
+            # HTTP/2 clients may send each cookie in its own header
+            value = environ[name] + ('; ' if name == 'HTTP_COOKIE' else ',') + value
+        environ[name] = value
+    # chunked bodies have no Content-Length, and Django reads no more than it says
+    environ['CONTENT_LENGTH'] = str(body.seek(0, io.SEEK_END))
+    body.seek(0)
+    return environ
+
+
+class ASGIHandler:
+    """
+    Serves a Django WSGI application over ASGI. Request bodies are read and responses are sent on the event loop, so
+    a thread is only held while Django handles the request, in a pool of MARKNOTE_ASGI_THREADS threads. Bodies are
+    spooled to a temporary file once they exceed FILE_UPLOAD_MAX_MEMORY_SIZE, like Django's uploads. Streaming
+    responses are sent from the thread that made them, since their queries use its database connection, unless they
+    set asgi_streaming_content to an asynchronous stream, which is sent from the event loop.
+    """
+    def __init__(self, application, threads=None):
+        self.application = application
+        self.executor = ThreadPoolExecutor(threads or marknote_settings.ASGI_THREADS, thread_name_prefix='marknote')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError('Unsupported ASGI scope type: {}'.format(scope['type']))
+        # large bodies, such as imports, are spooled to disk
+        body = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body', False):
+                    break
+            loop = asyncio.get_event_loop()
+            response = await loop.run_in_executor(self.executor, self.handle, scope, body, send, loop)
+        finally:
+            body.close()
+        if response is not None:
+            start, content = response
+            await send(start)
+            if callable(content):
+                await self.send_stream(content, receive, send, loop)
+            else:
+                await send({'type': 'http.response.body', 'body': content})
+
+    async def send_stream(self, stream, receive, send, loop):
+        """
+        Sends an asynchronous stream until it ends or the client disconnects.
+        """
+        async def run_sync(function):
+            return await loop.run_in_executor(self.executor, function)
+
+        async def send_chunks():
+            async for chunk in stream(run_sync):
+                if chunk:
+                    chunk = chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def wait_for_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        sending = asyncio.ensure_future(send_chunks())
+        disconnect = asyncio.ensure_future(wait_for_disconnect())
+        await asyncio.wait([sending, disconnect], return_when=asyncio.FIRST_COMPLETED)
+        for task in (sending, disconnect):
+            task.cancel()
+        await asyncio.gather(sending, disconnect, return_exceptions=True)
+        if sending.done() and not sending.cancelled() and sending.exception() is not None:
+            raise sending.exception()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def handle(self, scope, body, send, loop):
+        """
+        Runs the application in a pool thread. Returns the start message and content of a response to send, with
+        the content of asynchronous streams as a function of run_sync, or None once a streaming response has been
+        sent.
+        """
+        start = {'type': 'http.response.start'}
+
+        def start_response(status, headers, exc_info=None):
+            start['status'] = int(status.split(' ', 1)[0])
+            start['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+        result = self.application(get_environ(scope, body), start_response)
+        try:
+            if getattr(result, 'asgi_streaming_content', None) is not None:
+                return start, result.asgi_streaming_content
+            if not getattr(result, 'streaming', False):
+                return start, b''.join(result)
+
+            def send_message(message):
+                asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+            send_message(start)
+            for chunk in result:
+                if chunk:
+                    send_message({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            send_message({'type': 'http.response.body', 'body': b''})
+            return None
+        finally:
+            # closing the response sends request_finished, which closes this thread's database connections
+            if hasattr(result, 'close'):
+                result.close()
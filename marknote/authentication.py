@@ -0,0 +1,105 @@
+import threading
+
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+from marknote.lru import LRUCache
+from marknote.settings import marknote_settings
+
+
+token_cache = LRUCache('TOKEN_CACHE_SIZE', 'TOKEN_CACHE_TIMEOUT')
+shared_stats = {'hits': 0, 'misses': 0}
+_shared_stats_lock = threading.Lock()
+
+
+def get_shared_cache():
+    alias = marknote_settings.TOKEN_CACHE_ALIAS
+    return caches[alias] if alias is not None else None
+
+
+def shared_key(key):
+    return 'marknote:token:' + key
+
+
+def count(stat):
+    with _shared_stats_lock:
+        shared_stats[stat] += 1
+
+
+def get_stats():
+    """
+    Returns the statistics of the in-process token cache, with the hits and misses of the shared cache behind it.
+    """
+    with _shared_stats_lock:
+        return dict(token_cache.get_stats(), shared_hits=shared_stats['hits'], shared_misses=shared_stats['misses'])
+
+
+def reset():
+    token_cache.clear()
+    with _shared_stats_lock:
+        for stat in shared_stats:
+            shared_stats[stat] = 0
+
+
+def invalidate_tokens(keys):
+    keys = list(keys)
+    token_cache.delete(keys)
+    shared = get_shared_cache()
+    if shared is not None and keys:
+        shared.delete_many([shared_key(key) for key in keys])
+
+
+def invalidate_user(user_id, model=None):
+    """
+    Forgets the tokens of a user, reading their keys for the shared cache.
+    """
+    token_cache.delete_matching(lambda entry: entry['user_id'] == user_id)
+    if model is not None and get_shared_cache() is not None:
+        invalidate_tokens(model.objects.filter(user=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that remembers the user of each valid token, for up to MARKNOTE_TOKEN_CACHE_TIMEOUT seconds
+    in an in-process cache of MARKNOTE_TOKEN_CACHE_SIZE tokens, in front of the MARKNOTE_TOKEN_CACHE_ALIAS cache when
+    one is set. Each request gets its own copy of the user, without the password hash, which is never cached.
+    Deleting a token or saving its user forgets it at once in this process and the shared cache, and after the
+    timeout in other processes.
+    """
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is None:
+            shared = get_shared_cache()
+            entry = shared.get(shared_key(key)) if shared is not None else None
+            if entry is None:
+                if shared is not None:
+                    count('misses')
+                # invalid tokens and inactive users raise here and are never cached
+                user, token = super(CachedTokenAuthentication, self).authenticate_credentials(key)
+                entry = self.make_entry(user, token)
+                if shared is not None:
+                    shared.set(shared_key(key), entry, marknote_settings.TOKEN_CACHE_TIMEOUT)
+            else:
+                count('hits')
+            token_cache.set(key, entry)
+        return self.load_entry(key, entry)
+
+    # fields never cached, which are loaded from the database if a request reads them
+    excluded_fields = ('password',)
+
+    def make_entry(self, user, token):
+        fields = [field.attname for field in user._meta.concrete_fields if field.attname not in self.excluded_fields]
+        return {
+            'db': user._state.db,
+            'user_id': user.pk,
+            'fields': fields,
+            'values': [getattr(user, field) for field in fields],
+            'created': token.created,
+        }
+
+    def load_entry(self, key, entry):
+        user_model = self.get_model()._meta.get_field('user').related_model
+        user = user_model.from_db(entry['db'], entry['fields'], entry['values'])
+        token = self.get_model().from_db(entry['db'], ['key', 'user_id', 'created'], [key, user.pk, entry['created']])
+        token.user = user
+        return user, token
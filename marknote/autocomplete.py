@@ -0,0 +1,30 @@
+from marknote.models import TITLE_LENGTH, get_title_key, prefix_q
+from marknote.settings import marknote_settings
+
+
+def get_prefix_key(prefix):
+    """
+    Returns prefix normalized like title keys, keeping a trailing space so a finished word only matches itself.
+    """
+    key = get_title_key(prefix)
+    if key and prefix[-1:].isspace() and len(key) < TITLE_LENGTH:
+        key += ' '
+    return key
+
+
+def get_matches(rows, prefix, limit):
+    """
+    Returns up to limit of rows whose title starts with prefix once normalized, most recently updated first. A
+    prefix matching fewer than MARKNOTE_AUTOCOMPLETE_SORT_THRESHOLD rows reads them from the title key index and sorts
+    them, and a prefix matching more, or an empty one, scans from the most recently updated row until limit match.
+    """
+    rows = rows.order_by('-updated', '-pk')
+    key = get_prefix_key(prefix)
+    if not key:
+        return list(rows[:limit])
+    threshold = marknote_settings.AUTOCOMPLETE_SORT_THRESHOLD
+    matches = rows.filter(prefix_q(key))
+    if len(matches.order_by().values_list('pk', flat=True)[:threshold]) < threshold:
+        return list(matches[:limit])
+    # the match cannot use an index, so the rows are read in update order
+    return list(rows.filter(title_key__startswith=key)[:limit])
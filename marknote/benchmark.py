@@ -0,0 +1,362 @@
+import asyncio
+import io
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from marknote import __version__, response_cache, search
+from marknote.asgi import ASGIHandler, get_environ
+from marknote.models import Folder, Note
+from marknote.serializers import FolderSummarySerializer, NoteSummarySerializer
+from marknote.settings import marknote_settings
+from marknote.summaries import FastJSONRenderer, folder_summaries, note_summaries
+
+
+WORDS = (
+    'note markdown folder list item heading link code todo idea draft meeting summary project review release '
+    'bug feature design test sync cache index query page tree search').split()
+
+# maximum queries per request for each benchmark case, with the user's permissions already cached
+QUERY_BUDGETS = {
+    'note list': 2,
+    'note list page': 2,
+    'note search': 2,
+    'note retrieve': 2,
+    'note create': 9,
+    'note update': 9,
+    'folder list': 2,
+    'folder retrieve': 6,
+    'folder tree': 2,
+    'folder delete deep': 115,
+    'autocomplete': 4,
+}
+
+
+def make_content(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)[:size]
+
+
+def seed(users=1, width=3, depth=3, notes=100, note_size=2000, batch_size=1000, random_seed=0, stdout=None):
+    """
+    Creates users with every MarkNote permission, a folder tree of the given width and depth for each, and notes
+    spread over their folders with log-normally distributed sizes around note_size characters. Returns the users.
+    """
+    rng = random.Random(random_seed)
+    perms = list(Permission.objects.filter(content_type__app_label='marknote'))
+    created = []
+    for index in range(users):
+        user = get_user_model().objects.create_user(username='bench{}_{}'.format(random_seed, index), password='bench')
+        user.user_permissions.add(*perms)
+        created.append(user)
+        # folders are saved individually since their paths include their ids
+        folders = []
+        level = [None]
+        for level_depth in range(depth):
+            next_level = []
+            for container in level:
+                for position in range(width):
+                    folder = Folder(title='folder {}.{}'.format(level_depth, position), owner=user, container=container)
+                    folder.save()
+                    next_level.append(folder)
+            folders.extend(next_level)
+            level = next_level
+        batch = []
+        for position in range(notes):
+            size = max(1, int(rng.lognormvariate(0, 1) * note_size / 1.65))
+            note = Note(
+                title=' '.join(rng.choice(WORDS) for _ in range(3))[:30],
+                content=make_content(rng, size),
+                owner=user,
+                container=rng.choice(folders + [None]),
+            )
+            note.update_summary()
+            batch.append(note)
+            if len(batch) >= batch_size:
+                Note.objects.bulk_create(batch)
+                batch = []
+        Note.objects.bulk_create(batch)
+        if stdout is not None:
+            stdout.write('Created {} with {} folders and {} notes.'.format(user.username, len(folders), notes))
+    # bulk inserts skip the search signals
+    search.get_backend().rebuild()
+    return created
+
+
+class Benchmark:
+    """
+    Times requests against each view and counts their queries. Mutations run in a transaction that is rolled back,
+    so the database is left as it was.
+    """
+    def __init__(self, user, repeat=10):
+        self.user = user
+        self.repeat = repeat
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def deep_folder(self, depth=10):
+        """
+        Creates a chain of depth nested folders with a note in each and returns the top folder.
+        """
+        root = container = None
+        for level in range(depth):
+            container = Folder.objects.create(title='deep {}'.format(level), owner=self.user, container=container)
+            Note.objects.create(title='deep', content='content', owner=self.user, container=container)
+            root = root or container
+        return root
+
+    def get_cases(self):
+        """
+        Returns the benchmark cases by name as functions that prepare a request and return its method, URL, and
+        body. Preparation is not timed.
+        """
+        note = Note.objects.filter(owner=self.user).order_by('pk').first()
+        folder = Folder.objects.filter(owner=self.user, depth=0).order_by('pk').first()
+        term = note.title.split()[0] if note is not None else 'note'
+        return {
+            'note list': lambda: ('get', reverse('marknote:note-list-create'), None),
+            'note list page': lambda: ('get', reverse('marknote:note-list-create') + '?limit=50', None),
+            'note search': lambda: ('get', reverse('marknote:note-list-create') + '?search=' + term, None),
+            'note retrieve': lambda: ('get', reverse('marknote:note-retrieve-update-destroy', args=[note.pk]), None),
+            'note create': lambda: ('post', reverse('marknote:note-list-create'), {
+                'title': 'benchmark', 'content': 'benchmark content',
+            }),
+            'note update': lambda: ('patch', reverse('marknote:note-retrieve-update-destroy', args=[note.pk]), {
+                'content': note.content + ' edited',
+            }),
+            'folder list': lambda: ('get', reverse('marknote:folder-list-create'), None),
+            'folder retrieve': lambda: (
+                'get', reverse('marknote:folder-retrieve-update-destroy', args=[folder.pk]), None,
+            ),
+            'folder tree': lambda: ('get', reverse('marknote:folder-tree') + '?notes=true', None),
+            'folder delete deep': lambda: (
+                'delete', reverse('marknote:folder-retrieve-update-destroy', args=[self.deep_folder().pk]), None,
+            ),
+            'autocomplete': lambda: ('get', reverse('marknote:autocomplete') + '?title=' + term[:3], None),
+        }
+
+    def run_case(self, prepare):
+        timings = []
+        queries = 0
+        status_code = None
+        for _ in range(self.repeat):
+            method, url, body = prepare()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(self.client, method)(url, body, format='json')
+                timings.append((time.perf_counter() - start) * 1000)
+            # savepoints only exist because the benchmark runs in a transaction
+            queries = max(queries, len([
+                query for query in captured.captured_queries if 'SAVEPOINT' not in query['sql'].upper()
+            ]))
+            status_code = response.status_code
+        timings.sort()
+        return {
+            'status': status_code,
+            'queries': queries,
+            'repeat': self.repeat,
+            'min_ms': round(timings[0], 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+
+    def run(self, names=None):
+        """
+        Runs the cases and returns the report.
+        """
+        results = {}
+        cache_stats = response_cache.get_stats()
+        # the test client's requests never leave the process
+        with override_settings(ALLOWED_HOSTS=['testserver']), transaction.atomic():
+            # warm the permission cache so every case measures the view
+            self.client.get(reverse('marknote:note-list-create'))
+            for name, prepare in self.get_cases().items():
+                if names and name not in names:
+                    continue
+                results[name] = self.run_case(prepare)
+            transaction.set_rollback(True)
+        return {
+            'version': __version__,
+            'database': connection.vendor,
+            'dataset': {
+                'notes': Note.objects.filter(owner=self.user).count(),
+                'folders': Folder.objects.filter(owner=self.user).count(),
+            },
+            'results': results,
+            'response_cache': dict(
+                {stat: value - cache_stats[stat] for stat, value in response_cache.get_stats().items()},
+                enabled=marknote_settings.RESPONSE_CACHE_ENABLED,
+            ),
+        }
+
+
+class ConcurrencyBenchmark:
+    """
+    Measures the throughput of concurrent clients reading notes and folders through the WSGI handler, with a thread
+    per client, and through the ASGI handler, with a task per client on one event loop and as many handler threads.
+    Requests authenticate with the user's token, which is created if needed, so they read committed data.
+    """
+    def __init__(self, user, clients=8, requests=200):
+        self.user = user
+        self.clients = clients
+        self.requests = requests
+
+    def get_scopes(self):
+        from rest_framework.authtoken.models import Token
+
+        token = Token.objects.get_or_create(user=self.user)[0]
+        note = Note.objects.filter(owner=self.user).order_by('pk').first()
+        folder = Folder.objects.filter(owner=self.user, depth=0).order_by('pk').first()
+        paths = [reverse('marknote:note-list-create') + '?limit=50']
+        if note is not None:
+            paths.append(reverse('marknote:note-retrieve-update-destroy', args=[note.pk]))
+        if folder is not None:
+            paths.append(reverse('marknote:folder-retrieve-update-destroy', args=[folder.pk]))
+        scopes = []
+        for path in paths:
+            path, _, query = path.partition('?')
+            scopes.append({
+                'type': 'http',
+                'method': 'GET',
+                'path': path,
+                'query_string': query.encode('latin-1'),
+                'headers': [(b'host', b'testserver'), (b'authorization', 'Token {}'.format(token.key).encode())],
+                'server': ('testserver', 80),
+            })
+        return scopes
+
+    def get_client_scopes(self, scopes):
+        """
+        Returns the scopes each client requests in turn, cycling through scopes.
+        """
+        count = self.requests // self.clients
+        return [[scopes[(client + index) % len(scopes)] for index in range(count)] for client in range(self.clients)]
+
+    def run_wsgi(self, scopes):
+        application = WSGIHandler()
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split(' ', 1)[0]))
+
+        def client(client_scopes):
+            for scope in client_scopes:
+                response = application(get_environ(scope, io.BytesIO()), start_response)
+                b''.join(response)
+                response.close()
+
+        with ThreadPoolExecutor(self.clients) as executor:
+            list(executor.map(client, self.get_client_scopes(scopes)))
+        return statuses
+
+    def run_asgi(self, scopes):
+        application = ASGIHandler(WSGIHandler(), threads=self.clients)
+        statuses = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        async def client(client_scopes):
+            for scope in client_scopes:
+                await application(scope, receive, send)
+
+        async def main():
+            await asyncio.gather(*(client(client_scopes) for client_scopes in self.get_client_scopes(scopes)))
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(main())
+        finally:
+            loop.close()
+            application.executor.shutdown()
+        return statuses
+
+    def run(self):
+        """
+        Runs the clients against each handler and returns their requests per second and failed requests.
+        """
+        scopes = self.get_scopes()
+        results = {'clients': self.clients, 'requests': self.requests // self.clients * self.clients}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+                start = time.perf_counter()
+                statuses = run(scopes)
+                seconds = time.perf_counter() - start
+                results[name] = {
+                    'seconds': round(seconds, 3),
+                    'requests_per_second': round(len(statuses) / seconds, 1),
+                    'errors': len([status for status in statuses if status != 200]),
+                }
+        return results
+
+
+class SerializationBenchmark:
+    """
+    Measures how many of the user's note and folder summaries per second are read, represented, and rendered by the
+    model serializers with JSONRenderer and by the values_list serializers with FastJSONRenderer, taking the best of
+    repeat runs of each.
+    """
+    def __init__(self, user, repeat=5):
+        self.user = user
+        self.repeat = repeat
+
+    def measure(self, render, count):
+        seconds = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            render()
+            seconds.append(time.perf_counter() - start)
+        return round(count / min(seconds), 1) if count else None
+
+    def run(self):
+        """
+        Returns the objects per second of each path and their ratio for notes and folders.
+        """
+        results = {}
+        for name, queryset, serializer_class, values_serializer in (
+            ('notes', Note.objects.filter(owner=self.user).defer('content'), NoteSummarySerializer, note_summaries),
+            ('folders', Folder.objects.filter(owner=self.user), FolderSummarySerializer, folder_summaries),
+        ):
+            count = queryset.count()
+            serializer = self.measure(
+                lambda: JSONRenderer().render(serializer_class(queryset.all(), many=True).data), count,
+            )
+            fast = self.measure(lambda: FastJSONRenderer().render(values_serializer.serialize(queryset.all())), count)
+            results[name] = {
+                'objects': count,
+                'serializer_per_second': serializer,
+                'fast_per_second': fast,
+                'speedup': round(fast / serializer, 2) if count else None,
+            }
+        return results
+
+
+def check_budgets(report, budgets=QUERY_BUDGETS):
+    """
+    Returns a message for each case that used more queries than its budget.
+    """
+    return [
+        '{}: {} queries, budget {}'.format(name, result['queries'], budgets[name])
+        for name, result in sorted(report['results'].items())
+        if name in budgets and result['queries'] > budgets[name]
+    ]
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from marknote.settings import marknote_settings
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+_brokers = {}
+_brokers_lock = threading.Lock()
+
+
+class Subscription:
+    """
+    Wakes a waiting event stream when its owner's notes or folders change. Notifications carry no data, so waking
+    after several changes reads them all at once, and waits can be made from a thread or from an event loop.
+    """
+    def __init__(self, broker, owner_id):
+        self.broker = broker
+        self.owner_id = owner_id
+        self.event = threading.Event()
+        self.loop = None
+        self.async_event = None
+
+    def notify(self):
+        self.event.set()
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.async_event.set)
+
+    def wait(self, timeout=None):
+        """
+        Returns whether the owner changed within timeout seconds.
+        """
+        notified = self.event.wait(timeout)
+        self.event.clear()
+        return notified
+
+    async def wait_async(self, timeout=None):
+        if self.loop is None:
+            self.async_event = asyncio.Event()
+            self.loop = asyncio.get_event_loop()
+        # notifications before the loop was set only set the thread event
+        notified = self.event.is_set()
+        if not notified:
+            try:
+                await asyncio.wait_for(self.async_event.wait(), timeout)
+                notified = True
+            except asyncio.TimeoutError:
+                pass
+        self.event.clear()
+        self.async_event.clear()
+        return notified
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    Notifies the subscriptions of this process.
+    """
+    def __init__(self):
+        self.subscriptions = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def subscribe(self, owner_id):
+        subscription = Subscription(self, owner_id)
+        with self.lock:
+            self.subscriptions[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.owner_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscriptions[subscription.owner_id]
+
+    def notify(self, owner_ids):
+        with self.lock:
+            subscriptions = [
+                subscription for owner_id in owner_ids for subscription in self.subscriptions.get(owner_id, ())
+            ]
+        for subscription in subscriptions:
+            subscription.notify()
+
+    def publish(self, owner_ids):
+        self.notify(owner_ids)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publishes changes to every process through Redis at MARKNOTE_EVENT_BROKER_URL, with a thread in each process
+    notifying its subscriptions. Requires the redis package.
+    """
+    channel = 'marknote:events'
+
+    def __init__(self):
+        super(RedisBroker, self).__init__()
+        if redis is None:
+            raise ImproperlyConfigured('RedisBroker requires the redis package.')
+        self.client = redis.Redis.from_url(marknote_settings.EVENT_BROKER_URL)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(**{self.channel: self.handle})
+        self.thread = self.pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def handle(self, message):
+        self.notify([int(owner_id) for owner_id in message['data'].split(b',')])
+
+    def publish(self, owner_ids):
+        self.client.publish(self.channel, ','.join(str(owner_id) for owner_id in owner_ids))
+
+
+def get_broker():
+    """
+    Returns the broker named by MARKNOTE_EVENT_BROKER, shared by the whole process.
+    """
+    path = marknote_settings.EVENT_BROKER
+    with _brokers_lock:
+        if path not in _brokers:
+            _brokers[path] = import_string(path)()
+        return _brokers[path]
@@ -0,0 +1,217 @@
+from django.db import connections, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from marknote import changes, response_cache, revisions, search, serializers
+from marknote.models import Folder, Note, NoteArchive, get_title_key, load_archived_content
+from marknote.permissions import has_perms
+
+
+def can_return_ids(using):
+    """
+    Returns whether bulk inserts on the database set the primary keys of the inserted objects, which only some
+    backends do.
+    """
+    features = connections[using].features
+    return getattr(features, 'can_return_rows_from_bulk_insert', False) or \
+        getattr(features, 'can_return_ids_from_bulk_insert', False)
+
+
+def is_integer(value):
+    # JSON true and false decode to bools, which are ints
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class BulkOperations:
+    """
+    Validates a list of create, update, and delete operations with a summary serializer and applies the valid ones
+    with bulk queries in one transaction, creates first and deletes last. Each operation gets a result in the same
+    position as the request.
+    """
+    model = None
+    serializer_class = None
+    update_fields = ()
+
+    def __init__(self, request, operations):
+        self.request = request
+        self.operations = operations
+        self.results = [None] * len(operations)
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+
+    @property
+    def db(self):
+        return self.model.objects.db
+
+    def has_perm(self, action):
+        return has_perms(self.request.user, ['{}.{}_{}'.format(
+            self.model._meta.app_label, action, self.model._meta.model_name,
+        )])
+
+    def error(self, index, status_code, errors):
+        self.results[index] = {'status': status_code, 'errors': errors}
+
+    def get_serializer(self, *args, **kwargs):
+        return self.serializer_class(*args, context={'request': self.request}, **kwargs)
+
+    def get_instances(self, ids):
+        return self.model.objects.filter(owner=self.request.user.id, pk__in=ids).in_bulk()
+
+    def validate(self):
+        ids = [op.get('pk') for op in self.operations if isinstance(op, dict) and op.get('action') != 'create']
+        instances = self.get_instances([pk for pk in ids if is_integer(pk)])
+        perms = {action: self.has_perm(action) for action in ('add', 'change', 'delete')}
+        seen = set()
+        for index, op in enumerate(self.operations):
+            action = op.get('action') if isinstance(op, dict) else None
+            if action not in ('create', 'update', 'delete'):
+                self.error(index, status.HTTP_400_BAD_REQUEST, {'action': ['Must be create, update, or delete.']})
+            elif not perms[{'create': 'add', 'update': 'change', 'delete': 'delete'}[action]]:
+                self.error(index, status.HTTP_403_FORBIDDEN, {'detail': 'Permission denied.'})
+            elif action == 'create':
+                serializer = self.get_serializer(data=op.get('data', {}))
+                if serializer.is_valid():
+                    self.creates.append((index, self.model(**serializer.validated_data)))
+                else:
+                    self.error(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+            elif not is_integer(op.get('pk')):
+                self.error(index, status.HTTP_400_BAD_REQUEST, {'pk': ['Must be an integer.']})
+            elif op['pk'] not in instances:
+                self.error(index, status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'})
+            elif op['pk'] in seen:
+                self.error(index, status.HTTP_400_BAD_REQUEST, {'pk': ['Only one operation is allowed per item.']})
+            elif action == 'update':
+                seen.add(op['pk'])
+                instance = instances[op['pk']]
+                serializer = self.get_serializer(instance, data=op.get('data', {}), partial=True)
+                if serializer.is_valid():
+                    for field, value in serializer.validated_data.items():
+                        setattr(instance, field, value)
+                    self.updates.append((index, instance))
+                else:
+                    self.error(index, status.HTTP_400_BAD_REQUEST, serializer.errors)
+            else:
+                seen.add(op['pk'])
+                self.deletes.append((index, instances[op['pk']]))
+
+    @property
+    def can_bulk_create(self):
+        # results need the primary keys
+        return can_return_ids(self.db)
+
+    def create(self, objs):
+        if self.can_bulk_create:
+            self.model.objects.bulk_create(objs)
+        else:
+            for obj in objs:
+                obj.save()
+
+    def update(self, objs):
+        now = timezone.now()
+        for obj in objs:
+            obj.updated = now
+            # bulk updates skip pre_save, which sets the title key
+            obj.title_key = get_title_key(obj.title)
+        self.model.objects.bulk_update(objs, self.update_fields + ('title_key', 'updated'))
+
+    def delete(self, objs):
+        self.model.objects.filter(pk__in=[obj.pk for obj in objs]).delete()
+
+    def run(self):
+        """
+        Applies the operations and returns the list of results.
+        """
+        self.validate()
+        with transaction.atomic(using=self.db):
+            if self.creates:
+                self.create([obj for index, obj in self.creates])
+            if self.updates:
+                self.update([obj for index, obj in self.updates])
+            if self.deletes:
+                self.delete([obj for index, obj in self.deletes])
+        for status_code, objs in ((status.HTTP_201_CREATED, self.creates), (status.HTTP_200_OK, self.updates)):
+            for index, obj in objs:
+                if self.results[index] is None:
+                    self.results[index] = {'status': status_code, 'data': self.get_serializer(obj).data}
+        for index, obj in self.deletes:
+            self.results[index] = {'status': status.HTTP_204_NO_CONTENT, 'pk': obj.pk}
+        return self.results
+
+
+class NoteBulkOperations(BulkOperations):
+    model = Note
+    serializer_class = serializers.NoteSummarySerializer
+    update_fields = ('title', 'content', 'container', 'archived') + Note.SUMMARY_FIELDS
+
+    def get_instances(self, ids):
+        instances = super(NoteBulkOperations, self).get_instances(ids)
+        # archived content is needed for the summaries and search index of updated notes
+        load_archived_content(instances.values())
+        for instance in instances.values():
+            instance.thaw()
+        return instances
+
+    def create(self, objs):
+        for obj in objs:
+            obj.update_summary()
+        super(NoteBulkOperations, self).create(objs)
+        if self.can_bulk_create:
+            search.get_backend(self.db).index(objs)
+            revisions.record_revisions(objs, created=True)
+            changes.record_changes(objs)
+            self.invalidate(objs)
+
+    def update(self, objs):
+        for obj in objs:
+            obj.update_summary()
+        super(NoteBulkOperations, self).update(objs)
+        NoteArchive.objects.filter(note__in=[obj.pk for obj in objs if getattr(obj, 'thawed', False)]).delete()
+        search.get_backend(self.db).index(objs)
+        revisions.record_revisions(objs)
+        changes.record_changes(objs)
+        self.invalidate(objs)
+
+    def invalidate(self, objs):
+        containers = [obj.container_id for obj in objs] + [obj.loaded_container_id for obj in objs]
+        response_cache.invalidate_notes(self.request.user.id, containers)
+
+
+class FolderBulkOperations(BulkOperations):
+    model = Folder
+    serializer_class = serializers.FolderSummarySerializer
+    update_fields = ('title', 'container')
+
+    def create(self, objs):
+        super(FolderBulkOperations, self).create(objs)
+        if self.can_bulk_create:
+            changes.record_changes(objs)
+        # paths include the new ids
+        objs = [obj for obj in objs if not obj.path]
+        for obj in objs:
+            obj.path = obj.get_path()
+            obj.depth = obj.path.count('/') - 2
+        if objs:
+            Folder.objects.bulk_update(objs, ('path', 'depth'))
+            response_cache.invalidate_folders(self.request.user.id)
+
+    def update(self, objs):
+        # moved folders save individually to move their subtrees
+        moved = [obj for obj in objs if obj.path != obj.get_path()]
+        super(FolderBulkOperations, self).update([obj for obj in objs if obj not in moved])
+        changes.record_changes([obj for obj in objs if obj not in moved])
+        response_cache.invalidate_folders(self.request.user.id)
+        for index, obj in self.updates:
+            if obj not in moved:
+                continue
+            # earlier moves in the batch may have changed either path
+            obj.path = Folder.objects.filter(pk=obj.pk).values_list('path', flat=True).get()
+            if obj.container is not None:
+                obj.container.refresh_from_db(fields=('path', 'depth'))
+            try:
+                serializers.validate_folder_container(obj, obj.container)
+            except ValidationError as e:
+                self.error(index, status.HTTP_400_BAD_REQUEST, {'container': e.detail})
+                continue
+            obj.save()
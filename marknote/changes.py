@@ -0,0 +1,103 @@
+from collections import Counter, OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max
+
+from marknote.brokers import get_broker
+from marknote.models import Change, ChangeCounter, Folder, Note
+
+
+KINDS = {Note: Change.NOTE, Folder: Change.FOLDER}
+
+
+def reserve_sequences(counts):
+    """
+    Reserves counts[owner_id] change sequences for each owner and returns the last sequence before them by owner. The
+    owners' counters stay locked until the transaction ends, so their changes commit in sequence order.
+    """
+    sequences = {}
+    # locked in one order so writers of several owners do not deadlock
+    for owner_id in sorted(counts):
+        counter, created = ChangeCounter.objects.select_for_update().get_or_create(owner_id=owner_id)
+        sequences[owner_id] = counter.sequence
+        counter.sequence += counts[owner_id]
+        counter.save(update_fields=['sequence'])
+    return sequences
+
+
+def record_changes(objs, deleted=False):
+    """
+    Records a change for each note or folder in objs, and notifies the event streams of their owners once the changes
+    are committed.
+    """
+    if not objs:
+        return
+    with transaction.atomic(using=Change.objects.db):
+        sequences = reserve_sequences(Counter(obj.owner_id for obj in objs))
+        changes = []
+        for obj in objs:
+            sequences[obj.owner_id] += 1
+            changes.append(Change(
+                owner_id=obj.owner_id, sequence=sequences[obj.owner_id], kind=KINDS[type(obj)], object_id=obj.pk,
+                deleted=deleted,
+            ))
+        Change.objects.bulk_create(changes)
+    owner_ids = set(sequences)
+    transaction.on_commit(lambda: get_broker().publish(owner_ids), using=Change.objects.db)
+
+
+def get_latest_change(user_id):
+    return (
+        Change.objects.filter(owner=user_id).order_by('-sequence').values_list('sequence', flat=True).first() or 0
+    )
+
+
+def get_changes(user_id, since=0, limit=500, load=True):
+    """
+    Returns the latest change of each note and folder of a user changed after the since cursor, up to limit changes,
+    in sequence order, along with the next cursor and whether more changes follow. An unchanged feed
+    costs one indexed query. Objects changed again later in the feed only appear at their latest change, and saved
+    objects that no longer exist are left out until their deletion.
+    """
+    rows = list(
+        Change.objects.filter(owner=user_id, sequence__gt=since).order_by('sequence')
+        .values_list('sequence', 'kind', 'object_id', 'deleted')[:limit]
+    )
+    if not rows:
+        return [], since, False
+    latest = OrderedDict()
+    for sequence, kind, object_id, deleted in rows:
+        latest.pop((kind, object_id), None)
+        latest[(kind, object_id)] = (sequence, deleted)
+    if not load:
+        changes = [
+            {'sequence': sequence, 'type': kind, 'pk': object_id, 'deleted': deleted}
+            for (kind, object_id), (sequence, deleted) in latest.items()
+        ]
+        return changes, rows[-1][0], len(rows) == limit
+    ids = {Change.NOTE: [], Change.FOLDER: []}
+    for (kind, object_id), (sequence, deleted) in latest.items():
+        if not deleted:
+            ids[kind].append(object_id)
+    objects = {
+        Change.NOTE: Note.objects.filter(owner=user_id).in_bulk(ids[Change.NOTE]) if ids[Change.NOTE] else {},
+        Change.FOLDER: Folder.objects.filter(owner=user_id).in_bulk(ids[Change.FOLDER]) if ids[Change.FOLDER] else {},
+    }
+    changes = []
+    for (kind, object_id), (sequence, deleted) in latest.items():
+        obj = objects[kind].get(object_id)
+        if deleted or obj is not None:
+            changes.append({'sequence': sequence, 'type': kind, 'pk': object_id, 'deleted': deleted, 'object': obj})
+    return changes, rows[-1][0], len(rows) == limit
+
+
+def compact_changes():
+    """
+    Deletes the changes that a later change of the same object supersedes and those of deleted users, which no
+    cursor needs. Returns the number of changes deleted.
+    """
+    latest = Change.objects.values('kind', 'object_id').annotate(latest=Max('pk')).values_list('latest', flat=True)
+    superseded = Change.objects.exclude(pk__in=latest)
+    orphaned = Change.objects.exclude(owner__in=get_user_model().objects.values('pk'))
+    return superseded.delete()[0] + orphaned.delete()[0]
@@ -0,0 +1,126 @@
+import hashlib
+
+from django.db.models import Count, IntegerField, Max, Q, Value
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from marknote.expansion import get_expansion_options
+from marknote.models import Folder, Note, subtree_q
+from marknote.rendering import get_render_format
+from marknote.settings import marknote_settings
+
+
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def get_stats(*querysets):
+    """
+    Returns the number of rows and the latest update of each queryset, read with one query.
+    """
+    parts = [
+        qs.order_by().values('owner').annotate(
+            part=Value(index, IntegerField()), count=Count('pk'), updated=Max('updated'),
+        ).values_list('part', 'count', 'updated')
+        for index, qs in enumerate(querysets)
+    ]
+    stats = [(0, None)] * len(parts)
+    for index, count, updated in parts[0].union(*parts[1:], all=True):
+        # rows of other owners are grouped separately
+        total, latest = stats[index]
+        stats[index] = (total + count, max(updated, latest) if latest is not None else updated)
+    return stats
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET requests carrying If-None-Match or If-Modified-Since with 304 Not Modified when the validators from
+    get_etag and get_last_modified still match. The validators are computed from cheap queries that never load note
+    content, before the full response is built.
+    """
+    def get_etag(self, request, *args, **kwargs):
+        return None
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request, *args, **kwargs)
+        etag = quote_etag(etag) if etag is not None else None
+        last_modified = self.get_last_modified(request, *args, **kwargs)
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified is not None else None,
+        )
+        if response is None:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        if etag is not None and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified is not None and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+
+class ListConditionalGetMixin(ConditionalGetMixin):
+    """
+    Derives the list ETag from the pks and updates of the rows on the requested page and the first row of the next,
+    so a page costs the same to validate wherever it is. Unpaginated lists use the count and latest update of the
+    filtered rows instead. Either changes on every create, update, and delete. No Last-Modified is sent since deletes
+    do not advance it.
+    """
+    def get_etag(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if self.paginator is not None and self.paginator.is_requested(request):
+            rows = self.paginator.get_page_queryset(queryset.values_list('pk', 'updated'), request)
+            parts = [part for pk, updated in rows for part in (pk, updated.isoformat())]
+        else:
+            stats = queryset.aggregate(count=Count('pk'), updated=Max('updated'))
+            parts = [stats['count'], stats['updated'].isoformat() if stats['updated'] else '']
+        return make_etag(request.user.id, request.get_full_path(), *parts)
+
+
+class NoteConditionalGetMixin(ConditionalGetMixin):
+    def get_validators(self, **kwargs):
+        if not hasattr(self, '_validators'):
+            self._validators = self.get_queryset().filter(pk=kwargs['pk']).values_list('pk', 'updated').first()
+        return self._validators
+
+    def get_etag(self, request, *args, **kwargs):
+        validators = self.get_validators(**kwargs)
+        if validators is None:
+            return None
+        # rendered responses are a different representation, which changes with the renderer
+        if get_render_format(request) is not None:
+            return make_etag(validators[0], validators[1].isoformat(), request.query_params['render'],
+                             marknote_settings.RENDERER)
+        return make_etag(validators[0], validators[1].isoformat())
+
+    def get_last_modified(self, request, *args, **kwargs):
+        validators = self.get_validators(**kwargs)
+        return validators[1] if validators is not None else None
+
+
+class FolderConditionalGetMixin(ConditionalGetMixin):
+    """
+    Derives the folder ETag from the folder, its ancestors, and its direct children, since all of them appear in
+    the folder detail. Expanded details deeper than one level use the whole subtree instead of the direct children.
+    No Last-Modified is sent since deleting a child does not advance it.
+    """
+    def get_etag(self, request, *args, **kwargs):
+        folder = self.get_queryset().prefetch_related(None).filter(pk=kwargs['pk']).only('pk', 'updated', 'path')
+        folder = folder.first()
+        if folder is None:
+            return None
+        options = get_expansion_options(request)
+        if options is not None and options['depth'] > 1:
+            folders = subtree_q(folder.path) & ~Q(pk=folder.pk)
+            notes = Note.objects.filter(subtree_q(folder.path, 'container__path'))
+        else:
+            folders = Q(container=folder.pk)
+            notes = Note.objects.filter(container=folder.pk)
+        stats = get_stats(Folder.objects.filter(folders | Q(pk__in=folder.ancestor_ids)), notes)
+        parts = [folder.pk, folder.updated.isoformat(), request.get_full_path()]
+        for count, updated in stats:
+            parts.extend([count, updated.isoformat() if updated else ''])
+        return make_etag(*parts)
@@ -0,0 +1,92 @@
+import json
+import time
+
+from django.db import close_old_connections
+from rest_framework.renderers import BaseRenderer
+
+from marknote.brokers import get_broker
+from marknote.changes import get_changes
+from marknote.settings import marknote_settings
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Accepts requests for an event stream, whose errors are rendered as JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode('utf-8') if data is not None else b''
+
+
+def format_event(change):
+    return 'id: {}\nevent: change\ndata: {}\n\n'.format(change['sequence'], json.dumps(change))
+
+
+class EventStream:
+    """
+    Streams the changes of an owner's notes and folders after the cursor as server-sent events, whose ids are the
+    change sequence so a reconnecting client resumes from its Last-Event-ID. The changes are only read when the broker
+    reports one, so an idle stream makes no queries and sends a comment every MARKNOTE_EVENT_KEEPALIVE seconds. The
+    stream ends after MARKNOTE_EVENT_STREAM_TIMEOUT seconds and the client reconnects.
+    """
+    limit = 500
+    keepalive = ': keepalive\n\n'
+
+    def __init__(self, owner_id, cursor):
+        self.owner_id = owner_id
+        self.cursor = cursor
+
+    def read(self):
+        """
+        Returns the events since the cursor, which moves past them.
+        """
+        events = []
+        more = True
+        while more:
+            changes, self.cursor, more = get_changes(self.owner_id, self.cursor, self.limit, load=False)
+            events.extend(format_event(change) for change in changes)
+        return ''.join(events)
+
+    def start(self):
+        return 'retry: {}\n\n'.format(int(marknote_settings.EVENT_RETRY * 1000))
+
+    def __iter__(self):
+        subscription = get_broker().subscribe(self.owner_id)
+        try:
+            yield self.start()
+            # changes may have been made between the client's last event and subscribing
+            yield self.read()
+            deadline = time.monotonic() + marknote_settings.EVENT_STREAM_TIMEOUT
+            while time.monotonic() < deadline:
+                if subscription.wait(min(marknote_settings.EVENT_KEEPALIVE, deadline - time.monotonic())):
+                    yield self.read()
+                else:
+                    yield self.keepalive
+        finally:
+            subscription.close()
+
+    async def stream_async(self, run_sync):
+        """
+        Streams the events on an event loop, only holding a thread while reading changes with run_sync.
+        """
+        subscription = get_broker().subscribe(self.owner_id)
+        try:
+            yield self.start()
+            yield await run_sync(self.read_and_close)
+            deadline = time.monotonic() + marknote_settings.EVENT_STREAM_TIMEOUT
+            while time.monotonic() < deadline:
+                if await subscription.wait_async(min(marknote_settings.EVENT_KEEPALIVE, deadline - time.monotonic())):
+                    yield await run_sync(self.read_and_close)
+                else:
+                    yield self.keepalive
+        finally:
+            subscription.close()
+
+    def read_and_close(self):
+        try:
+            return self.read()
+        finally:
+            # no request finishes in the pool thread to close its connection
+            close_old_connections()
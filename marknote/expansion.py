@@ -0,0 +1,147 @@
+from collections import defaultdict
+
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from rest_framework.exceptions import ValidationError
+
+from marknote import serializers
+from marknote.models import Folder, Note
+from marknote.pagination import KeysetPagination
+from marknote.settings import marknote_settings
+
+
+RELATIONS = ('folders', 'notes')
+
+
+def get_expansion_options(request):
+    """
+    Returns the depth, expanded relations, per folder limit, and top level cursors requested with the depth, expand,
+    limit, folders_cursor, and notes_cursor query parameters, or None if none of them were given.
+    """
+    params = request.query_params
+    names = ('depth', 'expand', 'limit') + tuple(relation + '_cursor' for relation in RELATIONS)
+    if not any(name in params for name in names):
+        return None
+    try:
+        depth = int(params.get('depth', 1))
+    except ValueError:
+        depth = 0
+    if not 1 <= depth <= marknote_settings.EXPAND_MAX_DEPTH:
+        raise ValidationError({'depth': ['Must be a number from 1 to {}.'.format(marknote_settings.EXPAND_MAX_DEPTH)]})
+    expand = params.get('expand')
+    expand = RELATIONS if expand is None else tuple(relation for relation in expand.split(',') if relation)
+    if any(relation not in RELATIONS for relation in expand):
+        raise ValidationError({'expand': ['Must be a comma separated list of folders and notes.']})
+    limit = KeysetPagination().get_limit(request) if 'limit' in params else None
+    cursors = {relation: params.get(relation + '_cursor') for relation in RELATIONS}
+    return {'depth': depth, 'expand': expand, 'limit': limit, 'cursors': cursors}
+
+
+def limit_per_container(queryset, limit):
+    """
+    Returns the first limit rows of queryset in each container with one query, ranking rows with a window function
+    where the database supports one.
+    """
+    if not connections[queryset.db].features.supports_over_clause:
+        counts = defaultdict(int)
+        rows = []
+        for row in queryset:
+            counts[row.container_id] += 1
+            if counts[row.container_id] <= limit:
+                rows.append(row)
+        return rows
+    queryset = queryset.annotate(row_position=Window(
+        RowNumber(),
+        partition_by=[F('container')],
+        order_by=[F(field[1:]).desc() if field.startswith('-') else F(field).asc() for field in queryset.query.order_by],
+    )).order_by()
+    sql, params = queryset.query.get_compiler(queryset.db).as_sql()
+    return list(queryset.model.objects.db_manager(queryset.db).raw(
+        'SELECT * FROM ({}) ranked WHERE row_position <= %s ORDER BY row_position'.format(sql),
+        tuple(params) + (limit,),
+    ))
+
+
+class FolderExpansion:
+    """
+    Builds folder detail data with the requested levels of nested folders and notes, using one query per level for
+    each expanded relation regardless of how many folders the level has. With a limit, each folder lists at most that
+    many children of each relation, and folders with more get a folders_next or notes_next cursor. The cursor is
+    passed back as folders_cursor or notes_cursor on that folder's detail to continue its list.
+    """
+    serializer_classes = {'folders': serializers.FolderSummarySerializer, 'notes': serializers.NoteSummarySerializer}
+    pagination = KeysetPagination()
+
+    def __init__(self, folder, depth=1, expand=RELATIONS, limit=None, cursors=None):
+        self.folder = folder
+        self.depth = depth
+        self.expand = expand
+        self.limit = limit
+        self.cursors = cursors or {}
+
+    def get_queryset(self, relation):
+        if relation == 'folders':
+            return Folder.objects.all().filter(owner=self.folder.owner_id)
+        # summaries never include content
+        return Note.objects.all().filter(owner=self.folder.owner_id).defer('content')
+
+    def get_children(self, relation, container_ids, cursor=None):
+        """
+        Returns the children of each container, and the cursor of each container with more children than the limit.
+        """
+        qs = self.get_queryset(relation).filter(container__in=container_ids)
+        if cursor:
+            qs = self.pagination.filter_cursor(qs, cursor)
+        qs = qs.order_by(*self.pagination.ordering)
+        rows = list(qs) if self.limit is None else limit_per_container(qs, self.limit + 1)
+        children = defaultdict(list)
+        for row in rows:
+            children[row.container_id].append(row)
+        next_cursors = {}
+        if self.limit is not None:
+            for container_id, objs in children.items():
+                if len(objs) > self.limit:
+                    del objs[self.limit:]
+                    next_cursors[container_id] = self.pagination.encode_cursor(objs[-1])
+        return children, next_cursors
+
+    def get_levels(self):
+        levels = []
+        parents = [self.folder.pk]
+        for depth in range(self.depth):
+            level = {
+                relation: self.get_children(relation, parents, self.cursors.get(relation) if depth == 0 else None)
+                for relation in self.expand
+            }
+            levels.append(level)
+            parents = [obj.pk for objs in level.get('folders', ({}, {}))[0].values() for obj in objs]
+            if not parents:
+                break
+        return levels
+
+    def get_data(self, context):
+        levels = self.get_levels()
+        # the first level is serialized as if it were prefetched
+        self.folder._prefetched_objects_cache = {
+            relation: levels[0][relation][0].get(self.folder.pk, []) if relation in self.expand else []
+            for relation in RELATIONS
+        }
+        data = serializers.FolderSerializer(self.folder, context=context).data
+        for relation in RELATIONS:
+            if relation not in self.expand:
+                del data[relation]
+        parents = {self.folder.pk: data}
+        for depth, level in enumerate(levels):
+            for relation, (children, next_cursors) in level.items():
+                if depth > 0:
+                    objs = [obj for pk in parents for obj in children.get(pk, [])]
+                    for parent in parents.values():
+                        parent[relation] = []
+                    for row in self.serializer_classes[relation](objs, many=True, context=context).data:
+                        parents[row['container']][relation].append(row)
+                if self.limit is not None:
+                    for pk, parent in parents.items():
+                        parent[relation + '_next'] = next_cursors.get(pk)
+            parents = {row['pk']: row for parent in parents.values() for row in parent.get('folders', [])}
+        return data
@@ -0,0 +1,132 @@
+import json
+import re
+import zipfile
+
+from marknote.models import Folder, Note, load_archived_content
+
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'zip': ('application/zip', 'zip'),
+}
+
+
+def iter_batches(qs, batch_size):
+    """
+    Yields lists of up to batch_size rows, reading qs in chunks with iterator.
+    """
+    batch = []
+    for obj in qs.iterator(chunk_size=batch_size):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_notes(user_id, batch_size, ordering=('pk',)):
+    for batch in iter_batches(Note.objects.filter(owner=user_id).order_by(*ordering), batch_size):
+        load_archived_content(batch)
+        yield from batch
+
+
+def get_folders(user_id):
+    # parents are listed before their folders
+    return Folder.objects.filter(owner=user_id).order_by('depth', 'title', 'pk')
+
+
+def iter_ndjson(user_id, batch_size=1000):
+    """
+    Yields a line of JSON for each folder, parents first, and then for each note.
+    """
+    for folder in get_folders(user_id).iterator(chunk_size=batch_size):
+        yield json.dumps({
+            'type': 'folder',
+            'pk': folder.pk,
+            'title': folder.title,
+            'container': folder.container_id,
+            'created': folder.created.isoformat(),
+            'updated': folder.updated.isoformat(),
+        }) + '\n'
+    for note in iter_notes(user_id, batch_size):
+        yield json.dumps({
+            'type': 'note',
+            'pk': note.pk,
+            'title': note.title,
+            'container': note.container_id,
+            'content': note.content,
+            'created': note.created.isoformat(),
+            'updated': note.updated.isoformat(),
+        }) + '\n'
+
+
+def get_file_name(title, used, extension=''):
+    """
+    Returns a file name for title that is not in used, which it is added to.
+    """
+    name = re.sub(r'[\x00-\x1f/\\:*?"<>|]', '_', title).strip(' .') or 'untitled'
+    candidate = name + extension
+    number = 1
+    while candidate.lower() in used:
+        number += 1
+        candidate = '{} ({}){}'.format(name, number, extension)
+    used.add(candidate.lower())
+    return candidate
+
+
+class StreamBuffer:
+    """
+    An unseekable file that keeps what was written until it is taken, so a zip file can be streamed as it is built.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_zip(user_id, batch_size=1000):
+    """
+    Yields a zip file of a directory for each folder and a markdown file for each note, laid out by folder. Notes are
+    read grouped by folder, so only the names of one folder's notes are kept to avoid duplicates. Besides the folder
+    paths, the zip file only keeps the small central directory record of each file until it is finished.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        paths = {None: ''}
+        used = {None: set()}
+        for folder in get_folders(user_id).iterator(chunk_size=batch_size):
+            parent = folder.container_id if folder.container_id in paths else None
+            paths[folder.pk] = paths[parent] + get_file_name(folder.title, used[parent]) + '/'
+            used[folder.pk] = set()
+            archive.writestr(paths[folder.pk], b'')
+            yield buffer.take()
+        container_id = names = None
+        for note in iter_notes(user_id, batch_size, ordering=('container', 'title', 'pk')):
+            if note.container_id != container_id or names is None:
+                container_id = note.container_id
+                names = set(used.get(container_id, ()))
+            info = zipfile.ZipInfo(
+                paths.get(container_id, '') + get_file_name(note.title, names, '.md'),
+                date_time=note.updated.timetuple()[:6],
+            )
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, note.content.encode('utf-8'))
+            yield buffer.take()
+    yield buffer.take()
+
+
+def iter_export(user_id, export_format='ndjson', batch_size=1000):
+    if export_format == 'zip':
+        return (chunk for chunk in iter_zip(user_id, batch_size) if chunk)
+    return (line.encode('utf-8') for line in iter_ndjson(user_id, batch_size))
@@ -0,0 +1,216 @@
+import json
+import posixpath
+import tarfile
+import time
+import zipfile
+import zlib
+
+from django.db import transaction
+
+from marknote import changes, response_cache, revisions, search
+from marknote.bulk import can_return_ids, is_integer
+from marknote.models import TITLE_LENGTH, Folder, Note
+from marknote.settings import marknote_settings
+
+
+TYPES = ('ndjson', 'zip', 'tar')
+MARKDOWN_EXTENSIONS = ('.md', '.markdown', '.txt')
+# raised reading encrypted, unsupported, corrupt, or truncated archive members
+READ_ERRORS = (RuntimeError, NotImplementedError, EOFError, zlib.error, zipfile.BadZipFile, tarfile.TarError)
+
+
+def get_import_type(name):
+    """
+    Returns the import type of a file name from its extension, or None if it is not recognized.
+    """
+    name = name.lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.zip'):
+        return 'zip'
+    if name.endswith(('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')):
+        return 'tar'
+    return None
+
+
+def is_pk(value):
+    return value is None or is_integer(value)
+
+
+class Importer:
+    """
+    Imports folders and notes for a user from NDJSON in the export format or from a zip or tar archive of markdown
+    files, reading the input one line or file at a time. Folders are created as they are found and notes are inserted
+    in batches of batch_size, each in its own transaction. On databases that return the ids of bulk inserts a batch
+    is inserted with bulk_create and its search index, revisions, and cached responses are updated together, and
+    elsewhere the notes are saved one at a time. Invalid lines and files are reported with their error and skipped.
+    """
+    def __init__(self, user, batch_size=1000, max_errors=1000):
+        self.user = user
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.batch = []
+        # folder ids by path for archives and by exported pk for NDJSON
+        self.folders = {}
+        self.report = {'folders': 0, 'notes': 0, 'skipped': 0, 'error_count': 0, 'errors': []}
+
+    @property
+    def db(self):
+        return Note.objects.db
+
+    def error(self, source, message):
+        # only the first max_errors are kept
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'source': source, 'error': message})
+
+    def create_folder(self, title, container_id):
+        folder = Folder(title=title[:TITLE_LENGTH], owner=self.user, container_id=container_id)
+        folder.save()
+        self.report['folders'] += 1
+        return folder.pk
+
+    def get_path_folder(self, parts):
+        """
+        Returns the id of the folder at a path of folder titles, creating the missing folders.
+        """
+        container_id = None
+        for index in range(len(parts)):
+            key = tuple(parts[:index + 1])
+            if key not in self.folders:
+                self.folders[key] = self.create_folder(parts[index], container_id)
+            container_id = self.folders[key]
+        return container_id
+
+    def add_note(self, title, content, container_id):
+        note = Note(title=title[:TITLE_LENGTH], content=content, owner=self.user, container_id=container_id)
+        note.update_summary()
+        self.batch.append(note)
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def create_notes(self, objs):
+        """
+        Inserts objs and sets their primary keys. Returns whether they were inserted in bulk, skipping the signals.
+        """
+        if can_return_ids(self.db):
+            Note.objects.bulk_create(objs)
+            return True
+        for obj in objs:
+            obj.save()
+        return False
+
+    def flush(self):
+        if not self.batch:
+            return
+        objs, self.batch = self.batch, []
+        with transaction.atomic(using=self.db):
+            if self.create_notes(objs):
+                search.get_backend(self.db).index(objs)
+                revisions.record_revisions(objs, created=True)
+                changes.record_changes(objs)
+        response_cache.invalidate_notes(self.user.pk, [obj.container_id for obj in objs])
+        self.report['notes'] += len(objs)
+
+    def import_ndjson(self, lines):
+        for number, line in enumerate(lines, start=1):
+            source = 'line {}'.format(number)
+            if isinstance(line, bytes):
+                try:
+                    line = line.decode('utf-8')
+                except UnicodeDecodeError:
+                    self.error(source, 'Not UTF-8.')
+                    continue
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                self.error(source, 'Not JSON.')
+                continue
+            if not isinstance(row, dict) or row.get('type') not in ('folder', 'note'):
+                self.error(source, 'Expected an object with a type of folder or note.')
+                continue
+            if not isinstance(row.get('title'), str) or not row['title']:
+                self.error(source, 'Expected a title.')
+                continue
+            if any(not is_pk(row.get(key)) for key in ('pk', 'container')):
+                self.error(source, 'Expected the pk and container to be integers.')
+                continue
+            container_id = None
+            if row.get('container') is not None:
+                container_id = self.folders.get(('pk', row['container']))
+                if container_id is None:
+                    self.error(source, 'Unknown container, imported at the top level.')
+            if row['type'] == 'folder':
+                self.folders[('pk', row.get('pk'))] = self.create_folder(row['title'], container_id)
+            elif not isinstance(row.get('content', ''), str):
+                self.error(source, 'Expected the content to be a string.')
+            else:
+                self.add_note(row['title'], row.get('content', ''), container_id)
+
+    def add_file(self, name, is_dir, size, read):
+        """
+        Imports an archive member as a folder or a markdown note, with read returning its bytes. Members above
+        MARKNOTE_IMPORT_MAX_FILE_SIZE bytes and those that cannot be read are reported and skipped.
+        """
+        parts = [part for part in posixpath.normpath(name.replace('\\', '/')).split('/') if part not in ('', '.')]
+        if not parts or '..' in parts or any(part.startswith('.') for part in parts):
+            self.report['skipped'] += 1
+            return
+        if is_dir:
+            self.get_path_folder(parts)
+            return
+        title, extension = posixpath.splitext(parts[-1])
+        if extension.lower() not in MARKDOWN_EXTENSIONS:
+            self.report['skipped'] += 1
+            return
+        max_size = marknote_settings.IMPORT_MAX_FILE_SIZE
+        if max_size is not None and size > max_size:
+            self.error(name, 'Larger than the maximum of {} bytes.'.format(max_size))
+            return
+        try:
+            content = read().decode('utf-8')
+        except UnicodeDecodeError:
+            self.error(name, 'Not UTF-8.')
+            return
+        except READ_ERRORS as e:
+            self.error(name, 'Could not be read: {}'.format(e))
+            return
+        self.add_note(title, content, self.get_path_folder(parts[:-1]))
+
+    def import_zip(self, file):
+        with zipfile.ZipFile(file) as archive:
+            for info in archive.infolist():
+                self.add_file(info.filename, info.is_dir(), info.file_size, lambda: archive.read(info))
+
+    def import_tar(self, file):
+        # stream mode reads the members in order without seeking
+        with tarfile.open(fileobj=file, mode='r|*') as archive:
+            for member in archive:
+                if member.isdir() or member.isfile():
+                    self.add_file(
+                        member.name, member.isdir(), member.size, lambda: archive.extractfile(member).read(),
+                    )
+
+    def run(self, file, import_type):
+        """
+        Imports file and returns the number of folders, notes, and skipped files, the errors, and the throughput.
+        """
+        start = time.perf_counter()
+        try:
+            if import_type == 'ndjson':
+                self.import_ndjson(file)
+            elif import_type == 'zip':
+                self.import_zip(file)
+            else:
+                self.import_tar(file)
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            self.error('archive', str(e))
+        self.flush()
+        if self.report['folders']:
+            response_cache.invalidate_folders(self.user.pk)
+        seconds = time.perf_counter() - start
+        self.report['seconds'] = round(seconds, 3)
+        self.report['notes_per_second'] = round(self.report['notes'] / seconds, 1) if seconds else None
+        return self.report
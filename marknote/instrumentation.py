@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+from marknote.settings import marknote_settings
+
+
+logger = logging.getLogger('marknote.instrumentation')
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """
+    Collects the query count and the database, serialization, and render time of one request, in milliseconds, and
+    whether its response was a response cache hit or miss.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.response_cache = None
+        self.timings = {'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+        self.depth = {}
+
+    @property
+    def total(self):
+        return (time.perf_counter() - self.start) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        # database execute wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.timings['db'] += (time.perf_counter() - start) * 1000
+
+    def get_budget_flags(self, total):
+        flags = []
+        if marknote_settings.QUERY_BUDGET is not None and self.queries > marknote_settings.QUERY_BUDGET:
+            flags.append('queries')
+        if marknote_settings.TIME_BUDGET is not None and total > marknote_settings.TIME_BUDGET:
+            flags.append('time')
+        return flags
+
+
+def get_metrics():
+    """
+    Returns the metrics of the request being handled by this thread, or None outside of an instrumented request.
+    """
+    return getattr(_local, 'metrics', None)
+
+
+@contextmanager
+def timer(name):
+    """
+    Adds the time spent in the block to the named timing of the current request. Nested blocks with the same name
+    are only counted once.
+    """
+    metrics = get_metrics()
+    if metrics is None or metrics.depth.get(name):
+        yield
+        return
+    metrics.depth[name] = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += (time.perf_counter() - start) * 1000
+        metrics.depth[name] = False
+
+
+class InstrumentationMiddleware:
+    """
+    Records the query count, the database, serialization, render, and total time, and the response cache result of
+    each request. They are sent in a Server-Timing header and logged to marknote.instrumentation, as a warning when the request exceeds the
+    MARKNOTE_QUERY_BUDGET or MARKNOTE_TIME_BUDGET.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        total = metrics.total
+        flags = metrics.get_budget_flags(total)
+        response['Server-Timing'] = ', '.join(
+            ['db;dur={:.3f};desc="{} queries"'.format(metrics.timings['db'], metrics.queries)] +
+            ['{};dur={:.3f}'.format(name, metrics.timings[name]) for name in ('serialize', 'render')] +
+            ['total;dur={:.3f}'.format(total)] +
+            (['cache;desc="{}"'.format(metrics.response_cache)] if metrics.response_cache else []) +
+            (['budget;desc="{}"'.format(','.join(flags))] if flags else [])
+        )
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.queries,
+            'db_ms': round(metrics.timings['db'], 3),
+            'serialize_ms': round(metrics.timings['serialize'], 3),
+            'render_ms': round(metrics.timings['render'], 3),
+            'total_ms': round(total, 3),
+            'response_cache': metrics.response_cache or '',
+            'over_budget': ','.join(flags),
+        }
+        logger.log(
+            logging.WARNING if flags else logging.INFO,
+            ' '.join('{}={}'.format(key, value) for key, value in fields.items()),
+            extra={'marknote': fields},
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns
+        metrics = get_metrics()
+        if metrics is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.timings['render'] += (time.perf_counter() - start) * 1000
+            response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+from marknote.settings import marknote_settings
+
+
+class LRUCache:
+    """
+    A thread safe in-process cache keeping the most recently used entries, up to the MarkNote setting named by
+    size_setting, for up to the number of seconds of the one named by timeout_setting, or until evicted without one.
+    Settings are read on each use so they can be overridden in tests.
+    """
+    def __init__(self, size_setting, timeout_setting=None):
+        self.size_setting = size_setting
+        self.timeout_setting = timeout_setting
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """
+        Returns the value of key, or None if it is missing or expired.
+        """
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= now:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value):
+        size = getattr(marknote_settings, self.size_setting)
+        if size <= 0:
+            return
+        expires = None
+        if self.timeout_setting is not None:
+            expires = time.monotonic() + getattr(marknote_settings, self.timeout_setting)
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                if self.entries.pop(key, None) is not None:
+                    self.stats['invalidations'] += 1
+
+    def delete_matching(self, predicate):
+        """
+        Deletes the entries whose value matches predicate.
+        """
+        with self.lock:
+            keys = [key for key, (expires, value) in self.entries.items() if predicate(value)]
+        self.delete(keys)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            for stat in self.stats:
+                self.stats[stat] = 0
+
+    def get_stats(self):
+        """
+        Returns the hit, miss, eviction, and invalidation counts of this process, the hit rate, and the size.
+        """
+        with self.lock:
+            stats = dict(self.stats, size=len(self.entries))
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+        return stats
@@ -0,0 +1,52 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from marknote.benchmark import Benchmark, ConcurrencyBenchmark, SerializationBenchmark, check_budgets
+from marknote.models import Note
+
+
+class Command(BaseCommand):
+    help = 'Times each API view, checks its query count against a budget, and writes a JSON report.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to benchmark as. Defaults to the user with the most notes.')
+        parser.add_argument('--repeat', type=int, default=10, help='Number of times each request is timed.')
+        parser.add_argument('--case', action='append', help='Benchmark case to run. Defaults to all cases.')
+        parser.add_argument('--output', help='File the JSON report is written to. Defaults to standard output.')
+        parser.add_argument(
+            '--clients', type=int,
+            help='Also compare the throughput of this many concurrent clients through the WSGI and ASGI handlers.',
+        )
+        parser.add_argument('--requests', type=int, default=200, help='Number of concurrent requests per handler.')
+        parser.add_argument(
+            '--serialization', action='store_true',
+            help='Also measure the summaries per second of the list serializers and renderers.',
+        )
+        parser.add_argument('--no-budgets', action='store_true', help='Do not fail when a query budget is exceeded.')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['user']:
+            user = users.filter(username=options['user']).first()
+        else:
+            owner = Note.objects.values('owner').annotate(count=Count('pk')).order_by('-count').first()
+            user = users.filter(pk=owner['owner']).first() if owner else None
+        if user is None:
+            raise CommandError('No user to benchmark.')
+        report = Benchmark(user, repeat=options['repeat']).run(options['case'])
+        if options['clients']:
+            report['concurrency'] = ConcurrencyBenchmark(user, options['clients'], options['requests']).run()
+        if options['serialization']:
+            report['serialization'] = SerializationBenchmark(user, options['repeat']).run()
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+        errors = check_budgets(report)
+        if errors and not options['no_budgets']:
+            raise CommandError('Query budgets exceeded:\n' + '\n'.join(errors))
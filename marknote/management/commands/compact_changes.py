@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from marknote.changes import compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Deletes change feed entries that later changes supersede and those of deleted users.'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Deleted {} changes.'.format(compact_changes()))
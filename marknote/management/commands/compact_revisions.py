@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from marknote.revisions import compact_revisions
+
+
+class Command(BaseCommand):
+    help = 'Deletes old note revisions, keeping the latest revisions and those created recently.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, help='Number of latest revisions kept for each note.')
+        parser.add_argument('--days', type=int, help='Keep revisions created within this many days.')
+
+    def handle(self, *args, **options):
+        if options['keep'] is None and options['days'] is None:
+            raise CommandError('Give --keep, --days, or both.')
+        before = timezone.now() - timedelta(days=options['days']) if options['days'] is not None else None
+        count = compact_revisions(keep=options['keep'], before=before)
+        self.stdout.write('Deleted {} revisions.'.format(count))
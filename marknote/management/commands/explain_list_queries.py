@@ -0,0 +1,50 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from marknote.models import Folder, Note
+from marknote.pagination import KeysetPagination
+
+
+def get_list_queries(user_id, limit=100):
+    """
+    Returns the owner-scoped list queries by name, as paginated by the list views.
+    """
+    ordering = KeysetPagination.ordering
+    folder_id = Folder.objects.filter(owner=user_id).values_list('pk', flat=True).first()
+    return {
+        'note list': Note.objects.filter(owner=user_id).order_by(*ordering)[:limit + 1],
+        'note list after cursor': Note.objects.filter(owner=user_id, title__gt='m').order_by(*ordering)[:limit + 1],
+        'folder list': Folder.objects.filter(owner=user_id).order_by(*ordering)[:limit + 1],
+        'notes in folder': Note.objects.filter(owner=user_id, container=folder_id),
+        'folders in folder': Folder.objects.filter(owner=user_id, container=folder_id),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Prints the query plan and timing of the owner-scoped list queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username whose lists are queried. Defaults to the user with the most notes.')
+        parser.add_argument('--limit', type=int, default=100, help='Page size of the list queries.')
+        parser.add_argument('--repeat', type=int, default=10, help='Number of times each query is timed.')
+
+    def handle(self, *args, **options):
+        users = get_user_model().objects.all()
+        if options['user']:
+            user = users.filter(username=options['user']).first()
+        else:
+            owner = Note.objects.values('owner').annotate(count=Count('pk')).order_by('-count').first()
+            user = users.filter(pk=owner['owner']).first() if owner else None
+        if user is None:
+            raise CommandError('No user to query.')
+        for name, qs in get_list_queries(user.pk, options['limit']).items():
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                list(qs.all())
+            elapsed = (time.perf_counter() - start) / options['repeat']
+            self.stdout.write('{}: {:.3f} ms'.format(name, elapsed * 1000))
+            for line in qs.explain().splitlines():
+                self.stdout.write('    ' + line)
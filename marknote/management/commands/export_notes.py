@@ -0,0 +1,30 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from marknote.export import FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Exports a user's folders and notes as NDJSON or as a zip of markdown files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help='Username to export.')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson', help='Export format.')
+        parser.add_argument('--output', help='File the export is written to. Defaults to standard output.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows read per query.')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError('No user named {}.'.format(options['user']))
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in iter_export(user.pk, options['format'], options['batch_size']):
+                output.write(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
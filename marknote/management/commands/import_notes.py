@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from marknote.importer import TYPES, Importer, get_import_type
+
+
+class Command(BaseCommand):
+    help = "Imports an NDJSON export or a zip or tar archive of markdown files into a user's folders and notes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('user', help='Username to import into.')
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--type', choices=TYPES, help='Import type. Defaults to the type of the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of notes inserted per transaction.')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError('No user named {}.'.format(options['user']))
+        import_type = options['type'] or get_import_type(options['path'])
+        if import_type is None:
+            raise CommandError('Unknown import type for {}, use --type.'.format(options['path']))
+        with open(options['path'], 'rb') as file:
+            report = Importer(user, options['batch_size']).run(file, import_type)
+        for error in report['errors']:
+            self.stderr.write('{}: {}'.format(error['source'], error['error']))
+        self.stdout.write(
+            'Imported {folders} folders and {notes} notes in {seconds}s ({notes_per_second} notes/s), '
+            'skipped {skipped} files, {error_count} errors.'.format(**report)
+        )
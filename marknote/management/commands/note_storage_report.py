@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from marknote.storage import get_report
+
+
+class Command(BaseCommand):
+    help = 'Reports the stored size of note content and the time to read a note in each storage tier.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sample-size', type=int, default=20, help='Number of notes read from each tier.')
+
+    def handle(self, *args, **options):
+        report = get_report(sample_size=options['sample_size'])
+        for name, stats in report.items():
+            saved = 1 - stats['stored_size'] / stats['content_size'] if stats['content_size'] else 0
+            self.stdout.write('{}: {} notes, {} characters stored as {} ({:.0%} smaller), {} ms per read'.format(
+                name,
+                stats['notes'],
+                stats['content_size'],
+                stats['stored_size'],
+                saved,
+                stats['read_ms'] if stats['read_ms'] is not None else '-',
+            ))
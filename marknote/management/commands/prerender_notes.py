@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from marknote.export import iter_batches
+from marknote.models import Note, load_archived_content
+from marknote.rendering import prerender_notes
+from marknote.settings import marknote_settings
+
+
+class Command(BaseCommand):
+    help = 'Renders every note whose content is not in the shared render cache yet, such as after a deploy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of notes rendered per batch.')
+
+    def handle(self, *args, **options):
+        if marknote_settings.RENDER_CACHE_ALIAS is None:
+            raise CommandError('Set MARKNOTE_RENDER_CACHE_ALIAS to a cache shared by the server processes.')
+        count = total = 0
+        for batch in iter_batches(Note.objects.order_by('pk'), options['batch_size']):
+            load_archived_content(batch)
+            count += prerender_notes(batch)
+            total += len(batch)
+        self.stdout.write('Rendered {} of {} notes.'.format(count, total))
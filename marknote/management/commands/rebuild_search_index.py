@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from marknote import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full text search index for all notes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to rebuild the index on.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of notes indexed per batch.')
+
+    def handle(self, *args, **options):
+        search.reset_backends()
+        backend = search.get_backend(options['database'])
+        with transaction.atomic(using=options['database']):
+            count = backend.rebuild(batch_size=options['batch_size'])
+        self.stdout.write('Indexed {} notes with {}.'.format(count, backend.__class__.__name__))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from marknote.benchmark import seed
+
+
+class Command(BaseCommand):
+    help = 'Creates users with folder trees and notes for benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1, help='Number of users to create.')
+        parser.add_argument('--width', type=int, default=3, help='Number of folders in each folder.')
+        parser.add_argument('--depth', type=int, default=3, help='Number of folder levels.')
+        parser.add_argument('--notes', type=int, default=1000, help='Number of notes per user.')
+        parser.add_argument('--note-size', type=int, default=2000, help='Median note size in characters.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of notes inserted per batch.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, which also names the users.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed(
+                users=options['users'],
+                width=options['width'],
+                depth=options['depth'],
+                notes=options['notes'],
+                note_size=options['note_size'],
+                batch_size=options['batch_size'],
+                random_seed=options['seed'],
+                stdout=self.stdout,
+            )
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from marknote.storage import archive_notes, compress_notes
+
+
+class Command(BaseCommand):
+    help = 'Compresses large notes and moves notes that have not been updated recently into the archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            help='Archive notes not updated for this many days. Defaults to MARKNOTE_ARCHIVE_AFTER_DAYS.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of notes moved per batch.')
+
+    def handle(self, *args, **options):
+        compressed = compress_notes(batch_size=options['batch_size'])
+        archived = archive_notes(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write('Compressed {} notes and archived {} notes.'.format(compressed, archived))
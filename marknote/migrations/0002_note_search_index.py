@@ -0,0 +1,57 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE marknote_notes_fts USING fts5(title, content, tokenize='trigram case_sensitive 0')",
+    "INSERT INTO marknote_notes_fts(rowid, title, content) SELECT id, title, content FROM marknote_notes",
+)
+SQLITE_DROP = (
+    "DROP TABLE IF EXISTS marknote_notes_fts",
+)
+POSTGRES_CREATE = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # the plain content is kept for substring matches, since notes may store it compressed
+    "CREATE TABLE marknote_notes_search ("
+    "note_id integer PRIMARY KEY REFERENCES marknote_notes (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "content text NOT NULL, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX marknote_notes_search_document ON marknote_notes_search USING gin (document)",
+    "CREATE INDEX marknote_notes_search_content_trgm ON marknote_notes_search USING gin (content gin_trgm_ops)",
+    "CREATE INDEX marknote_notes_title_trgm ON marknote_notes USING gin (title gin_trgm_ops)",
+    "INSERT INTO marknote_notes_search (note_id, content, document) SELECT id, content, "
+    "setweight(to_tsvector('simple', title), 'A') || setweight(to_tsvector('simple', content), 'B') "
+    "FROM marknote_notes",
+)
+POSTGRES_DROP = (
+    "DROP INDEX IF EXISTS marknote_notes_title_trgm",
+    "DROP TABLE IF EXISTS marknote_notes_search",
+)
+
+
+def run(schema_editor, statements):
+    with transaction.atomic(using=schema_editor.connection.alias):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+
+
+def create_index(apps, schema_editor):
+    # a database without FTS5 trigram or pg_trgm support is left unindexed and searched with the basic backend
+    try:
+        run(schema_editor, {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE})
+    except DatabaseError:
+        pass
+
+
+def drop_index(apps, schema_editor):
+    run(schema_editor, {'sqlite': SQLITE_DROP, 'postgresql': POSTGRES_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:10
+
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    Folder = apps.get_model('marknote', 'Folder')
+    db_alias = schema_editor.connection.alias
+    # walk the hierarchy one level at a time from the top level folders
+    level = Folder.objects.using(db_alias).filter(container__isnull=True)
+    paths = {None: '/'}
+    depth = 0
+    while paths:
+        children = {}
+        for folder in level:
+            folder.path = '{}{}/'.format(paths[folder.container_id], folder.pk)
+            folder.depth = depth
+            folder.save(update_fields=['path', 'depth'])
+            children[folder.pk] = folder.path
+        paths = children
+        level = Folder.objects.using(db_alias).filter(container_id__in=list(children))
+        depth += 1
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0002_note_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='folder',
+            name='depth',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='folder',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=2048),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+    ]
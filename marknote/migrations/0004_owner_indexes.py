@@ -0,0 +1,29 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0003_folder_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'title', '-updated'], name='folders_owner_title_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'container'], name='folders_owner_container'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'title', '-updated'], name='notes_owner_title_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'container'], name='notes_owner_container'),
+        ),
+    ]
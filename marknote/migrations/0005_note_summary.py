@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:22
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def populate_summaries(apps, schema_editor):
+    Note = apps.get_model('marknote', 'Note')
+    db_alias = schema_editor.connection.alias
+    batch = []
+    for note in Note.objects.using(db_alias).only('id', 'content').iterator():
+        note.content_length = len(note.content)
+        note.preview = ' '.join(note.content[:200].split())[:100]
+        note.content_hash = hashlib.sha256(note.content.encode('utf-8')).hexdigest()
+        batch.append(note)
+        if len(batch) >= 1000:
+            Note.objects.using(db_alias).bulk_update(batch, ['content_length', 'preview', 'content_hash'])
+            batch = []
+    Note.objects.using(db_alias).bulk_update(batch, ['content_length', 'preview', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0004_owner_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='note',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='content_length',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='preview',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
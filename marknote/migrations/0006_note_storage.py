@@ -0,0 +1,57 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:32
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
+import django.db.models.deletion
+import marknote.models
+
+
+STORAGE_MARKER = '\x01'
+
+
+def escape_content(apps, schema_editor):
+    # existing content starting with the marker would otherwise be read as escaped or compressed
+    Note = apps.get_model('marknote', 'Note')
+    Note.objects.using(schema_editor.connection.alias).filter(content__startswith=STORAGE_MARKER).update(
+        content=Concat(Value(STORAGE_MARKER), F('content')),
+    )
+
+
+def unescape_content(apps, schema_editor):
+    Note = apps.get_model('marknote', 'Note')
+    Note.objects.using(schema_editor.connection.alias).filter(content__startswith=STORAGE_MARKER * 2).update(
+        content=Substr(F('content'), 2),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0005_note_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteArchive',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='marknote.Note')),
+                ('data', models.BinaryField()),
+                ('archived', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'marknote_note_archive',
+            },
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='archived',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='content',
+            field=marknote.models.CompressedTextField(),
+        ),
+        migrations.RunPython(escape_content, unescape_content),
+    ]
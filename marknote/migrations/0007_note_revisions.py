@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import marknote.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0006_note_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('snapshot', models.PositiveIntegerField()),
+                ('title', models.CharField(max_length=30)),
+                ('data', marknote.models.CompressedTextField()),
+                ('content_length', models.PositiveIntegerField(default=0)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='marknote.Note')),
+            ],
+            options={
+                'db_table': 'marknote_note_revisions',
+                'unique_together': {('note', 'number')},
+            },
+        ),
+    ]
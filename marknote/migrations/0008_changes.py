@@ -0,0 +1,68 @@
+# Generated by Django 2.2.28 on 2026-10-18 18:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_changes(apps, schema_editor):
+    # existing folders, parents first, and notes start the feed
+    Change = apps.get_model('marknote', 'Change')
+    ChangeCounter = apps.get_model('marknote', 'ChangeCounter')
+    db_alias = schema_editor.connection.alias
+    sequences = {}
+    for model_name, kind, ordering in (('Folder', 'folder', ('depth', 'id')), ('Note', 'note', ('id',))):
+        model = apps.get_model('marknote', model_name)
+        batch = []
+        for pk, owner_id in model.objects.using(db_alias).order_by(*ordering).values_list('id', 'owner').iterator():
+            sequences[owner_id] = sequences.get(owner_id, 0) + 1
+            batch.append(Change(owner_id=owner_id, sequence=sequences[owner_id], kind=kind, object_id=pk))
+            if len(batch) >= 1000:
+                Change.objects.using(db_alias).bulk_create(batch)
+                batch = []
+        Change.objects.using(db_alias).bulk_create(batch)
+    ChangeCounter.objects.using(db_alias).bulk_create([
+        ChangeCounter(owner_id=owner_id, sequence=sequence) for owner_id, sequence in sequences.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('marknote', '0007_note_revisions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Change',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveIntegerField()),
+                ('kind', models.CharField(choices=[('note', 'Note'), ('folder', 'Folder')], max_length=6)),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'marknote_changes',
+                'unique_together': {('owner', 'sequence')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeCounter',
+            fields=[
+                ('owner', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('sequence', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'marknote_change_counters',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='change',
+            index=models.Index(fields=['kind', 'object_id'], name='changes_object'),
+        ),
+        migrations.RunPython(populate_changes, migrations.RunPython.noop),
+    ]
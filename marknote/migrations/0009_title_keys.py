@@ -0,0 +1,87 @@
+# Generated by Django 2.2.28 on 2026-10-18 19:18
+
+import unicodedata
+
+from django.db import migrations, models
+import marknote.models
+
+
+def populate_title_keys(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for model_name in ('Folder', 'Note'):
+        model = apps.get_model('marknote', model_name)
+        batch = []
+        for obj in model.objects.using(db_alias).only('id', 'title').iterator():
+            # without accents, case folded, with single spaces
+            title = unicodedata.normalize('NFKD', obj.title)
+            title = ''.join(char for char in title if not unicodedata.combining(char))
+            obj.title_key = ' '.join(title.casefold().split())[:30]
+            batch.append(obj)
+            if len(batch) >= 1000:
+                model.objects.using(db_alias).bulk_update(batch, ['title_key'])
+                batch = []
+        model.objects.using(db_alias).bulk_update(batch, ['title_key'])
+
+
+# prefix matches can only use an index with the pattern operator class on PostgreSQL, like the _like indexes
+# Django adds for indexed text fields, and the owner column keeps the operator class of its type
+POSTGRES_CREATE = (
+    "CREATE INDEX folders_owner_title_key_like ON marknote_folders (owner_id, title_key varchar_pattern_ops, updated)",
+    "CREATE INDEX notes_owner_title_key_like ON marknote_notes (owner_id, title_key varchar_pattern_ops, updated)",
+)
+POSTGRES_DROP = (
+    "DROP INDEX IF EXISTS notes_owner_title_key_like",
+    "DROP INDEX IF EXISTS folders_owner_title_key_like",
+)
+
+
+def run(schema_editor, statements):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def create_pattern_indexes(apps, schema_editor):
+    run(schema_editor, POSTGRES_CREATE)
+
+
+def drop_pattern_indexes(apps, schema_editor):
+    run(schema_editor, POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marknote', '0008_changes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='folder',
+            name='title_key',
+            field=marknote.models.TitleKeyField(blank=True, default='', editable=False, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='title_key',
+            field=marknote.models.TitleKeyField(blank=True, default='', editable=False, max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'title_key', 'updated'], name='folders_owner_title_key'),
+        ),
+        migrations.AddIndex(
+            model_name='folder',
+            index=models.Index(fields=['owner', 'updated'], name='folders_owner_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'title_key', 'updated'], name='notes_owner_title_key'),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'updated'], name='notes_owner_updated'),
+        ),
+        migrations.RunPython(populate_title_keys, migrations.RunPython.noop),
+        migrations.RunPython(create_pattern_indexes, drop_pattern_indexes),
+    ]
@@ -1,9 +1,84 @@
+import base64
+import hashlib
+import unicodedata
+import zlib
+
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.lookups import StartsWith
+
+from marknote.settings import marknote_settings
+
+
+TITLE_LENGTH = 30
+
+
+def get_title_key(title):
+    """
+    Returns title normalized for prefix matching, without accents, case folded, with single spaces, and cut to the
+    title length.
+    """
+    title = ''.join(char for char in unicodedata.normalize('NFKD', title) if not unicodedata.combining(char))
+    return ' '.join(title.casefold().split())[:TITLE_LENGTH]
+
+
+def get_prefix_bound(prefix):
+    """
+    Returns the least string that sorts after every string starting with prefix in code point order, or None if every
+    string from prefix on starts with it.
+    """
+    for index in range(len(prefix) - 1, -1, -1):
+        code = ord(prefix[index]) + 1
+        # surrogates cannot be encoded
+        if code == 0xd800:
+            code = 0xe000
+        if code <= 0x10ffff:
+            return prefix[:index] + chr(code)
+    return None
+
+
+@models.CharField.register_lookup
+class Prefix(StartsWith):
+    """
+    A startswith lookup that can use an index. On PostgreSQL it relies on a pattern ops index, since the range of
+    strings starting with a prefix depends on the collation. SQLite's LIKE ignores case and cannot use an index, so
+    the prefix is matched there as a range, which holds under the binary collation SQLite columns use by default.
+    """
+    lookup_name = 'prefix'
+
+    def as_sqlite(self, compiler, connection):
+        if not self.rhs_is_direct_value() or self.bilateral_transforms or not isinstance(self.rhs, str):
+            return super(Prefix, self).as_sql(compiler, connection)
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        bound = get_prefix_bound(self.rhs)
+        if bound is None:
+            return '{} >= %s'.format(lhs), lhs_params + [self.rhs]
+        return '({lhs} >= %s AND {lhs} < %s)'.format(lhs=lhs), lhs_params + [self.rhs] + lhs_params + [bound]
+
+
+def prefix_q(prefix, field='title_key'):
+    """
+    Returns a filter for values starting with prefix that can use an index.
+    """
+    return Q(**{field + '__prefix': prefix})
+
+
+class TitleKeyField(models.CharField):
+    """
+    The normalized title, set from the title whenever the row is saved or bulk created.
+    """
+    def pre_save(self, model_instance, add):
+        value = get_title_key(model_instance.title)
+        setattr(model_instance, self.attname, value)
+        return value
 
 
 class Base(models.Model):
-    title = models.CharField(max_length=30)
+    title = models.CharField(max_length=TITLE_LENGTH)
+    # precomputed from title for autocompletion
+    title_key = TitleKeyField(max_length=TITLE_LENGTH, editable=False, blank=True, default='')
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
@@ -12,17 +87,259 @@ class Base(models.Model):
         abstract = True
         ordering = ['title', '-updated']
 
+    def save(self, *args, **kwargs):
+        if kwargs.get('update_fields') is not None and 'title' in kwargs['update_fields']:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'title_key'}
+        super(Base, self).save(*args, **kwargs)
+
+
+def subtree_q(path, field='path'):
+    """
+    Returns a filter for everything at or below a materialized path that can use the path index.
+    """
+    return Q(**{field + '__prefix': path})
+
 
 class Folder(Base):
     container = models.ForeignKey('self', related_name='folders', on_delete=models.CASCADE, null=True)
+    # materialized path of ancestor ids ending with this folder's id, such as /1/5/9/, which PostgreSQL also indexes
+    # with varchar_pattern_ops for prefix matches
+    path = models.CharField(max_length=2048, db_index=True, editable=False, default='')
+    depth = models.PositiveIntegerField(editable=False, default=0)
 
     class Meta:
         db_table = 'marknote_folders'
+        indexes = [
+            models.Index(fields=['owner', 'title', '-updated'], name='folders_owner_title_updated'),
+            models.Index(fields=['owner', 'container'], name='folders_owner_container'),
+            # the migration adds a copy with varchar_pattern_ops on PostgreSQL for prefix matches
+            models.Index(fields=['owner', 'title_key', 'updated'], name='folders_owner_title_key'),
+            models.Index(fields=['owner', 'updated'], name='folders_owner_updated'),
+        ]
+
+    @property
+    def ancestor_ids(self):
+        return [int(pk) for pk in self.path.strip('/').split('/')[:-1]]
+
+    def get_path(self):
+        parent_path = self.container.path if self.container_id is not None else '/'
+        return '{}{}/'.format(parent_path, self.pk)
+
+    def save(self, *args, **kwargs):
+        old_path = old_depth = None
+        if self.pk is not None:
+            # compare against the stored path in case this instance is stale
+            old_path, old_depth = Folder.objects.filter(pk=self.pk).values_list('path', 'depth').first() or ('', 0)
+            self.path = self.get_path()
+            self.depth = self.path.count('/') - 2
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'path', 'depth'}
+        super(Folder, self).save(*args, **kwargs)
+        if self.pk is not None and not self.path:
+            # the path of a new folder includes its id
+            self.path = self.get_path()
+            self.depth = self.path.count('/') - 2
+            Folder.objects.filter(pk=self.pk).update(path=self.path, depth=self.depth)
+        elif old_path and old_path != self.path:
+            # move the subtree
+            Folder.objects.filter(subtree_q(old_path)).exclude(pk=self.pk).update(
+                path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+                depth=F('depth') + (self.depth - old_depth),
+            )
+
+
+# stored text starting with the marker is either escaped plain text or compressed text
+STORAGE_MARKER = '\x01'
+COMPRESSED_PREFIX = STORAGE_MARKER + 'z'
+
+
+def compress_text(value):
+    """
+    Returns text as stored, compressed if it reaches MARKNOTE_COMPRESS_THRESHOLD characters.
+    """
+    threshold = marknote_settings.COMPRESS_THRESHOLD
+    if value is None:
+        return value
+    if threshold is not None and len(value) >= threshold:
+        return COMPRESSED_PREFIX + base64.b85encode(zlib.compress(value.encode('utf-8'))).decode('ascii')
+    if value.startswith(STORAGE_MARKER):
+        return STORAGE_MARKER + value
+    return value
+
+
+def decompress_text(value):
+    if value is None or not value.startswith(STORAGE_MARKER):
+        return value
+    if value.startswith(COMPRESSED_PREFIX):
+        return zlib.decompress(base64.b85decode(value[len(COMPRESSED_PREFIX):])).decode('utf-8')
+    return value[len(STORAGE_MARKER):]
+
+
+class CompressedTextField(models.TextField):
+    """
+    Text stored compressed once it reaches MARKNOTE_COMPRESS_THRESHOLD characters and decompressed when loaded, so
+    readers always see the original text. Database substring lookups cannot match compressed values.
+    """
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def get_prep_value(self, value):
+        return compress_text(super(CompressedTextField, self).get_prep_value(value))
+
+
+def get_preview(content):
+    return ' '.join(content[:Note.PREVIEW_LENGTH * 2].split())[:Note.PREVIEW_LENGTH]
+
+
+def get_content_hash(content):
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 
 class Note(Base):
+    PREVIEW_LENGTH = 100
+    SUMMARY_FIELDS = ('content_length', 'preview', 'content_hash')
+
     container = models.ForeignKey(Folder, related_name='notes', on_delete=models.CASCADE, null=True)
-    content = models.TextField()
+    content = CompressedTextField()
+    # archived content is moved to NoteArchive and content is left empty
+    archived = models.BooleanField(editable=False, default=False)
+    # precomputed from content so listings never load it
+    content_length = models.PositiveIntegerField(editable=False, default=0)
+    preview = models.CharField(max_length=PREVIEW_LENGTH, editable=False, blank=True, default='')
+    content_hash = models.CharField(max_length=64, editable=False, blank=True, default='')
 
     class Meta:
         db_table = 'marknote_notes'
+        indexes = [
+            models.Index(fields=['owner', 'title', '-updated'], name='notes_owner_title_updated'),
+            models.Index(fields=['owner', 'container'], name='notes_owner_container'),
+            # the migration adds a copy with varchar_pattern_ops on PostgreSQL for prefix matches
+            models.Index(fields=['owner', 'title_key', 'updated'], name='notes_owner_title_key'),
+            models.Index(fields=['owner', 'updated'], name='notes_owner_updated'),
+        ]
+
+    def update_summary(self):
+        self.content_length = len(self.content)
+        self.preview = get_preview(self.content)
+        self.content_hash = get_content_hash(self.content)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Note, cls).from_db(db, field_names, values)
+        # the stored content, which the next revision is recorded against
+        if 'content' in instance.__dict__ and not instance.archived:
+            instance.loaded_content = instance.content
+            instance.loaded_content_hash = instance.__dict__.get('content_hash')
+        return instance
+
+    def thaw(self):
+        """
+        Takes the note out of the archive, loading its content unless new content was set. The archived copy is
+        deleted when the note is saved.
+        """
+        if not self.archived:
+            return
+        if not self.content:
+            load_archived_content([self])
+        self.archived = False
+        self.thawed = True
+
+    def save(self, *args, **kwargs):
+        if 'content' not in self.get_deferred_fields():
+            if self.archived:
+                self.thaw()
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = set(kwargs['update_fields']) | {'content', 'archived'}
+            self.update_summary()
+            if kwargs.get('update_fields') is not None and 'content' in kwargs['update_fields']:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | set(self.SUMMARY_FIELDS)
+        super(Note, self).save(*args, **kwargs)
+        if getattr(self, 'thawed', False):
+            NoteArchive.objects.filter(note=self.pk).delete()
+            self.thawed = False
+
+
+class NoteArchive(models.Model):
+    """
+    Compressed content of notes in the cold tier.
+    """
+    note = models.OneToOneField(Note, primary_key=True, related_name='archive', on_delete=models.CASCADE)
+    data = models.BinaryField()
+    archived = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'marknote_note_archive'
+
+
+class NoteRevision(models.Model):
+    """
+    A version of a note's title and content. Snapshot revisions store the content, and other revisions store the
+    operations that produce it from the previous revision. Each revision records the number of the snapshot it
+    builds on.
+    """
+    note = models.ForeignKey(Note, related_name='revisions', on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    snapshot = models.PositiveIntegerField()
+    title = models.CharField(max_length=TITLE_LENGTH)
+    data = CompressedTextField()
+    content_length = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=64)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'marknote_note_revisions'
+        unique_together = ('note', 'number')
+
+    @property
+    def is_snapshot(self):
+        return self.snapshot == self.number
+
+
+class Change(models.Model):
+    """
+    A note or folder that was saved or deleted, numbered by a sequence per owner in the order changes commit. Deleted
+    objects keep their change as a tombstone.
+    """
+    NOTE = 'note'
+    FOLDER = 'folder'
+    KINDS = ((NOTE, 'Note'), (FOLDER, 'Folder'))
+
+    # without a constraint, since deleting a user records the deletion of its notes after their changes are deleted
+    owner = models.ForeignKey(get_user_model(), on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    sequence = models.PositiveIntegerField()
+    kind = models.CharField(max_length=6, choices=KINDS)
+    object_id = models.PositiveIntegerField()
+    deleted = models.BooleanField(default=False)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'marknote_changes'
+        unique_together = ('owner', 'sequence')
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='changes_object'),
+        ]
+
+
+class ChangeCounter(models.Model):
+    """
+    The last change sequence of an owner. Writers lock it until they commit, so an owner's changes commit in sequence
+    order and a cursor never passes a change that has yet to commit.
+    """
+    owner = models.OneToOneField(
+        get_user_model(), primary_key=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+',
+    )
+    sequence = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'marknote_change_counters'
+
+
+def load_archived_content(notes):
+    """
+    Sets the content of the archived notes among notes from the archive with one query.
+    """
+    archived = {note.pk: note for note in notes if note.archived}
+    if not archived:
+        return
+    for note_id, data in NoteArchive.objects.filter(note__in=list(archived)).values_list('note', 'data'):
+        archived[note_id].content = zlib.decompress(data).decode('utf-8')
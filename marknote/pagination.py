@@ -0,0 +1,104 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+from marknote.settings import marknote_settings
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in cursor pagination over the default ordering of title and updated, with pk as a tiebreaker. Pages are
+    selected with a keyset condition instead of an offset so every page costs the same. Lists are paginated when a
+    cursor or limit is requested or when MARKNOTE_PAGE_SIZE is set, and paginated searches use this ordering rather
+    than relevance.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    ordering = ('title', '-updated', 'pk')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.paginated = False
+        self.next_cursor = None
+
+    def get_limit(self, request):
+        limit = request.query_params.get(self.limit_query_param)
+        try:
+            limit = int(limit)
+        except (TypeError, ValueError):
+            limit = marknote_settings.PAGE_SIZE or marknote_settings.MAX_PAGE_SIZE
+        return max(1, min(limit, marknote_settings.MAX_PAGE_SIZE))
+
+    def is_requested(self, request):
+        return (
+            marknote_settings.PAGE_SIZE is not None or
+            self.cursor_query_param in request.query_params or
+            self.limit_query_param in request.query_params
+        )
+
+    @staticmethod
+    def encode_cursor(obj):
+        position = [obj.title, obj.updated.isoformat(), obj.pk]
+        return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            title, updated, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            updated = parse_datetime(updated)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(title, str) or updated is None:
+            raise NotFound(self.invalid_cursor_message)
+        return title, updated, pk
+
+    def filter_cursor(self, queryset, cursor):
+        """
+        Filters queryset to the rows after the position encoded in cursor.
+        """
+        title, updated, pk = self.decode_cursor(cursor)
+        return queryset.filter(
+            Q(title__gt=title) |
+            Q(title=title, updated__lt=updated) |
+            Q(title=title, updated=updated, pk__gt=pk)
+        )
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Returns the rows of the requested page, followed by the first row of the next page if there is one.
+        """
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = self.filter_cursor(queryset, cursor)
+        return queryset[:self.get_limit(request) + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        self.paginated = True
+        limit = self.get_limit(request)
+        page = list(self.get_page_queryset(queryset, request))
+        if len(page) > limit:
+            page = page[:limit]
+            self.next_cursor = self.encode_cursor(page[-1])
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(data)
+
+    def get_envelope(self, key, data):
+        """
+        Wraps list data in the response envelope under key, adding the next cursor when the list was paginated.
+        """
+        envelope = OrderedDict([(key, data)])
+        if self.paginated:
+            envelope['next'] = self.next_cursor
+        return envelope
@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+
+class Conflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The note has changed since the base version.'
+    default_code = 'conflict'
+
+
+def apply_operations(content, operations):
+    """
+    Returns content with each operation's delete characters at its offset replaced by its insert text. Offsets count
+    characters of the original content, and operations must be in order without overlapping.
+    """
+    pieces = []
+    position = 0
+    for index, op in enumerate(operations):
+        offset, delete = op['offset'], op.get('delete', 0)
+        if offset < position or offset + delete > len(content):
+            raise ValidationError({'operations': {index: ['Operations must be in order, within the content, and '
+                                                          'must not overlap.']}})
+        pieces.append(content[position:offset])
+        pieces.append(op.get('insert', ''))
+        position = offset + delete
+    pieces.append(content[position:])
+    return ''.join(pieces)
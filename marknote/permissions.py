@@ -0,0 +1,71 @@
+from django.db import transaction
+from rest_framework.permissions import DjangoModelPermissions
+
+from marknote.lru import LRUCache
+
+
+permission_cache = LRUCache('PERMISSION_CACHE_SIZE', 'PERMISSION_CACHE_TIMEOUT')
+
+
+def get_stats():
+    return permission_cache.get_stats()
+
+
+def reset():
+    permission_cache.clear()
+
+
+def get_permissions(user):
+    """
+    Returns the permissions the user's authentication backends grant them, from the cache when present.
+    """
+    permissions = permission_cache.get(user.pk)
+    if permissions is None:
+        permissions = frozenset(user.get_all_permissions())
+        permission_cache.set(user.pk, permissions)
+    return permissions
+
+
+def has_perms(user, perms):
+    """
+    Returns whether the user has every permission in perms, like User.has_perms, for backends that grant permissions
+    through get_all_permissions.
+    """
+    perms = list(perms)
+    if not perms or (user.is_active and user.is_superuser):
+        return True
+    # anonymous and inactive users are not cached
+    if user.pk is None or not user.is_active:
+        return user.has_perms(perms)
+    permissions = get_permissions(user)
+    return all(perm in permissions for perm in perms)
+
+
+def invalidate_users(user_ids=None):
+    """
+    Forgets the permissions of the users, or of every user when user_ids is None, now and again once the transaction
+    commits so concurrent requests do not cache the permissions from before it.
+    """
+    def invalidate():
+        if user_ids is None:
+            permission_cache.delete_matching(lambda permissions: True)
+        else:
+            permission_cache.delete(user_ids)
+
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+class CachedDjangoModelPermissions(DjangoModelPermissions):
+    """
+    DjangoModelPermissions that keeps each user's permissions for up to MARKNOTE_PERMISSION_CACHE_TIMEOUT seconds in
+    an in-process cache of MARKNOTE_PERMISSION_CACHE_SIZE users. Changing a user's permissions or groups, or a group's
+    permissions, forgets them at once in this process and after the timeout in other processes.
+    """
+    def has_permission(self, request, view):
+        if getattr(view, '_ignore_model_permissions', False):
+            return True
+        if not request.user or (not request.user.is_authenticated and self.authenticated_users_only):
+            return False
+        queryset = self._queryset(view)
+        return has_perms(request.user, self.get_required_permissions(request.method, queryset.model))
@@ -0,0 +1,243 @@
+import html
+import re
+import threading
+
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ValidationError
+
+from marknote.lru import LRUCache
+from marknote.settings import marknote_settings
+
+try:
+    import markdown
+    import markdown.treeprocessors
+except ImportError:
+    markdown = None
+
+
+FORMATS = ('html',)
+
+_stats = {'hits': 0, 'misses': 0, 'renders': 0}
+_lock = threading.Lock()
+_local = threading.local()
+render_cache = LRUCache('RENDER_CACHE_SIZE')
+
+
+BLOCK_PATTERNS = {
+    'fence': re.compile(r'^ {0,3}(```|~~~)'),
+    'heading': re.compile(r'^ {0,3}(#{1,6})\s+(.*?)\s*#*\s*$'),
+    'rule': re.compile(r'^ {0,3}([-*_])( *\1){2,} *$'),
+    'quote': re.compile(r'^ {0,3}> ?(.*)$'),
+    'item': re.compile(r'^ {0,3}([-*+]|\d{1,9}[.)])\s+(.*)$'),
+}
+INLINE_PATTERNS = (
+    (re.compile(r'\*\*(.+?)\*\*|__(.+?)__'), 'strong'),
+    (re.compile(r'\*(.+?)\*|\b_(.+?)_\b'), 'em'),
+    (re.compile(r'~~(.+?)~~'), 'del'),
+)
+CODE_SPAN = re.compile(r'`([^`]+)`')
+LINK = re.compile(r'\[([^\]]+)\]\(([^)\s]+)\)')
+SAFE_URL = re.compile(r'^(https?:|mailto:|/|#|\.|[^:]*$)', re.IGNORECASE)
+
+
+def render_inline(text):
+    code = []
+
+    def stash(match):
+        code.append('<code>{}</code>'.format(html.escape(match.group(1))))
+        return '\x00{}\x00'.format(len(code) - 1)
+
+    text = html.escape(CODE_SPAN.sub(stash, text.replace('\x00', '')), quote=False)
+
+    def link(match):
+        url = html.unescape(match.group(2))
+        if not SAFE_URL.match(url):
+            return match.group(1)
+        return '<a href="{}">{}</a>'.format(html.escape(url), match.group(1))
+
+    text = LINK.sub(link, text)
+    for pattern, tag in INLINE_PATTERNS:
+        text = pattern.sub(lambda match: '<{0}>{1}</{0}>'.format(tag, match.group(1) or match.group(2)), text)
+    return re.sub('\x00(\\d+)\x00', lambda match: code[int(match.group(1))], text)
+
+
+def render_basic(content):
+    """
+    Renders the common subset of markdown: headings, paragraphs, fenced code, block quotes, lists, rules, code spans,
+    emphasis, and links. Raw HTML is escaped.
+    """
+    lines = content.replace('\r\n', '\n').split('\n')
+    blocks = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        match = BLOCK_PATTERNS['fence'].match(line)
+        if match:
+            code = []
+            index += 1
+            while index < len(lines) and not lines[index].lstrip().startswith(match.group(1)):
+                code.append(lines[index])
+                index += 1
+            blocks.append('<pre><code>{}</code></pre>'.format(html.escape('\n'.join(code) + '\n' if code else '')))
+            index += 1
+            continue
+        if not line.strip():
+            index += 1
+            continue
+        match = BLOCK_PATTERNS['heading'].match(line)
+        if match:
+            level = len(match.group(1))
+            blocks.append('<h{0}>{1}</h{0}>'.format(level, render_inline(match.group(2))))
+            index += 1
+            continue
+        if BLOCK_PATTERNS['rule'].match(line):
+            blocks.append('<hr>')
+            index += 1
+            continue
+        if BLOCK_PATTERNS['quote'].match(line):
+            quoted = []
+            while index < len(lines) and BLOCK_PATTERNS['quote'].match(lines[index]):
+                quoted.append(BLOCK_PATTERNS['quote'].match(lines[index]).group(1))
+                index += 1
+            blocks.append('<blockquote>\n{}\n</blockquote>'.format(render_basic('\n'.join(quoted))))
+            continue
+        match = BLOCK_PATTERNS['item'].match(line)
+        if match:
+            tag = 'ul' if match.group(1) in '-*+' else 'ol'
+            items = []
+            while index < len(lines):
+                match = BLOCK_PATTERNS['item'].match(lines[index])
+                if match is None or (match.group(1) in '-*+') != (tag == 'ul'):
+                    break
+                items.append('<li>{}</li>'.format(render_inline(match.group(2))))
+                index += 1
+            blocks.append('<{0}>\n{1}\n</{0}>'.format(tag, '\n'.join(items)))
+            continue
+        paragraph = []
+        while index < len(lines) and lines[index].strip() and \
+                not any(pattern.match(lines[index]) for pattern in BLOCK_PATTERNS.values()):
+            paragraph.append(lines[index].strip())
+            index += 1
+        blocks.append('<p>{}</p>'.format(render_inline('\n'.join(paragraph))))
+    return '\n'.join(blocks)
+
+
+if markdown is not None:
+    class SafeURLs(markdown.treeprocessors.Treeprocessor):
+        """
+        Removes the link and image URLs render_basic would not link.
+        """
+        def run(self, root):
+            for element in root.iter():
+                for attribute in ('href', 'src'):
+                    if attribute in element.attrib and not SAFE_URL.match(html.unescape(element.get(attribute))):
+                        del element.attrib[attribute]
+
+
+def get_markdown():
+    """
+    Returns this thread's markdown converter, which escapes raw HTML like render_basic.
+    """
+    converter = getattr(_local, 'markdown', None)
+    if converter is None:
+        converter = markdown.Markdown(extensions=['fenced_code', 'tables'])
+        converter.preprocessors.deregister('html_block')
+        converter.inlinePatterns.deregister('html')
+        converter.treeprocessors.register(SafeURLs(converter), 'safe_urls', 0)
+        _local.markdown = converter
+    return converter.reset()
+
+
+def render_markdown(content):
+    """
+    Renders content with the markdown package when it is installed, or with render_basic otherwise. Either way raw
+    HTML is escaped and unsafe link URLs are dropped.
+    """
+    if markdown is None:
+        return render_basic(content)
+    return get_markdown().convert(content)
+
+
+def get_renderer():
+    return import_string(marknote_settings.RENDERER)
+
+
+def get_shared_cache():
+    alias = marknote_settings.RENDER_CACHE_ALIAS
+    return caches[alias] if alias is not None else None
+
+
+def get_key(content_hash):
+    return 'marknote:rendered:{}:{}'.format(marknote_settings.RENDERER, content_hash)
+
+
+def get_stats():
+    """
+    Returns the hit, miss, and render counts of this process and the size of its render cache.
+    """
+    with _lock:
+        return dict(_stats, size=render_cache.get_stats()['size'])
+
+
+def reset():
+    render_cache.clear()
+    with _lock:
+        for stat in _stats:
+            _stats[stat] = 0
+
+
+def count(stat, amount=1):
+    with _lock:
+        _stats[stat] += amount
+
+
+def render_note(note):
+    """
+    Returns the rendered HTML of a note's content. Renders are cached by content hash in a least recently used cache
+    of MARKNOTE_RENDER_CACHE_SIZE entries in each process, in front of the MARKNOTE_RENDER_CACHE_ALIAS cache when one
+    is set, so unchanged content is never rendered twice.
+    """
+    key = get_key(note.content_hash)
+    rendered = render_cache.get(key)
+    if rendered is None:
+        shared = get_shared_cache()
+        rendered = shared.get(key) if shared is not None else None
+        if rendered is None:
+            count('misses')
+            count('renders')
+            rendered = get_renderer()(note.content)
+            if shared is not None:
+                shared.set(key, rendered, None)
+        else:
+            count('hits')
+        render_cache.set(key, rendered)
+    else:
+        count('hits')
+    return rendered
+
+
+def prerender_notes(notes):
+    """
+    Renders the notes whose content is not in the shared cache yet and stores them there. Returns the number rendered.
+    """
+    shared = get_shared_cache()
+    keys = {get_key(note.content_hash): note for note in notes}
+    missing = set(keys) - set(shared.get_many(list(keys)))
+    renderer = get_renderer()
+    rendered = {key: renderer(keys[key].content) for key in missing}
+    shared.set_many(rendered, None)
+    count('renders', len(rendered))
+    return len(rendered)
+
+
+def get_render_format(request):
+    """
+    Returns the format of the render query parameter, or None if rendering was not requested.
+    """
+    render_format = request.query_params.get('render') if request is not None else None
+    if render_format is None:
+        return None
+    if render_format not in FORMATS:
+        raise ValidationError({'render': ['Must be one of {}.'.format(', '.join(FORMATS))]})
+    return render_format
@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from marknote.instrumentation import get_metrics
+from marknote.settings import marknote_settings
+
+
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[marknote_settings.RESPONSE_CACHE_ALIAS]
+
+
+def count(stat, amount=1):
+    with _stats_lock:
+        _stats[stat] += amount
+
+
+def record(stat, result):
+    """
+    Counts a hit or miss and marks the current request with its result for the instrumentation middleware.
+    """
+    count(stat)
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.response_cache = result
+
+
+def get_stats():
+    """
+    Returns the hit, miss, and invalidation counts of this process.
+    """
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_stats():
+    with _stats_lock:
+        for stat in _stats:
+            _stats[stat] = 0
+
+
+def scope_key(*scope):
+    return 'marknote:generation:' + ':'.join(str(part) for part in scope)
+
+
+def get_generations(scopes):
+    """
+    Returns the current generation of each scope, starting a new generation for scopes the cache does not have.
+    """
+    cache = get_cache()
+    keys = [scope_key(*scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid.uuid4().hex, None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """
+    Starts a new generation for each scope so responses cached under the old one are no longer found, now and again
+    once the transaction commits so concurrent requests do not cache the rows from before it under the new one.
+    """
+    if not marknote_settings.RESPONSE_CACHE_ENABLED:
+        return
+
+    def start():
+        get_cache().set_many({scope_key(*scope): uuid.uuid4().hex for scope in scopes}, None)
+
+    start()
+    transaction.on_commit(start)
+    count('invalidations', len(scopes))
+
+
+def invalidate_notes(owner_id, container_ids):
+    invalidate(('notes', owner_id), *[('folder', pk) for pk in set(container_ids) if pk is not None])
+
+
+def invalidate_folders(owner_id):
+    invalidate(('folders', owner_id))
+
+
+class CachedResponseMixin:
+    """
+    Caches successful GET response data per owner and query string. Each response is cached under the generations of
+    the scopes from get_cache_scopes, and signals start new generations when notes or folders change.
+    """
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return []
+
+    def get_cache_key(self, request, *args, **kwargs):
+        generations = get_generations(self.get_cache_scopes(request, *args, **kwargs))
+        path = hashlib.sha1(request.get_full_path().encode('utf-8')).hexdigest()
+        return 'marknote:response:{}:{}:{}'.format(request.user.id, path, ':'.join(generations))
+
+    def get(self, request, *args, **kwargs):
+        if not marknote_settings.RESPONSE_CACHE_ENABLED:
+            return super(CachedResponseMixin, self).get(request, *args, **kwargs)
+        cache = get_cache()
+        key = self.get_cache_key(request, *args, **kwargs)
+        data = cache.get(key)
+        if data is not None:
+            record('hits', 'hit')
+            return Response(data)
+        record('misses', 'miss')
+        response = super(CachedResponseMixin, self).get(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, marknote_settings.RESPONSE_CACHE_TIMEOUT)
+        return response
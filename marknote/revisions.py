@@ -0,0 +1,157 @@
+import difflib
+import json
+
+from django.db.models import Max, OuterRef, Subquery
+
+from marknote.models import NoteRevision, get_content_hash
+from marknote.patch import apply_operations
+from marknote.settings import marknote_settings
+
+
+def common_prefix_length(a, b):
+    # binary search over slice comparisons, which run in C
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[:middle] == b[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def common_suffix_length(a, b, limit):
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len(a) - middle:] == b[len(b) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def make_operations(old, new):
+    """
+    Returns the operations that turn old into new, in the format of content patches, from a line diff of the text
+    between their common prefix and suffix, or None if the changed lines multiplied exceed
+    MARKNOTE_REVISION_DIFF_MAX_COMPARISONS, since the diff takes quadratic time.
+    """
+    prefix = common_prefix_length(old, new)
+    suffix = common_suffix_length(old, new, min(len(old), len(new)) - prefix)
+    old_lines = old[prefix:len(old) - suffix].splitlines(True)
+    new_lines = new[prefix:len(new) - suffix].splitlines(True)
+    if len(old_lines) * len(new_lines) > marknote_settings.REVISION_DIFF_MAX_COMPARISONS:
+        return None
+    operations = []
+    offset = prefix
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False).get_opcodes():
+        length = sum(len(line) for line in old_lines[i1:i2])
+        if tag != 'equal':
+            operations.append({'offset': offset, 'delete': length, 'insert': ''.join(new_lines[j1:j2])})
+        offset += length
+    return operations
+
+
+def record_revisions(notes, created=False):
+    """
+    Records a revision for each note whose title or content differs from its latest revision. A revision is stored as
+    the operations from the previous revision when the content the note was loaded with is that revision, and as a
+    snapshot of the content otherwise, every MARKNOTE_REVISION_SNAPSHOT_INTERVAL revisions, or when the change is too
+    large to diff. Newly created notes
+    skip the lookup of their latest revision.
+    """
+    if not marknote_settings.REVISIONS_ENABLED:
+        return
+    notes = [note for note in notes if 'content' not in note.get_deferred_fields()]
+    if not notes:
+        return
+    latest = {}
+    if not created:
+        latest_number = NoteRevision.objects.filter(note=OuterRef('note')).order_by('-number').values('number')[:1]
+        latest = {
+            revision.note_id: revision
+            for revision in NoteRevision.objects.filter(
+                note__in=[note.pk for note in notes],
+                number=Subquery(latest_number),
+            ).defer('data')
+        }
+    revisions = []
+    for note in notes:
+        revision = latest.get(note.pk)
+        if revision is not None and (revision.title, revision.content_hash) == (note.title, note.content_hash):
+            continue
+        number = revision.number + 1 if revision is not None else 1
+        previous = getattr(note, 'loaded_content', None)
+        if revision is None and previous is not None and get_content_hash(previous) != note.content_hash:
+            # history starts with the content the note had before its first recorded change
+            revisions.append(NoteRevision(
+                note=note, number=number, snapshot=number, title=note.title, data=previous,
+                content_length=len(previous), content_hash=get_content_hash(previous),
+            ))
+            revision = revisions[-1]
+            number += 1
+        operations = None
+        if (revision is not None and previous is not None and
+                revision.content_hash == getattr(note, 'loaded_content_hash', None) and
+                number - revision.snapshot < marknote_settings.REVISION_SNAPSHOT_INTERVAL):
+            operations = make_operations(previous, note.content)
+        delta = operations is not None
+        revisions.append(NoteRevision(
+            note=note,
+            number=number,
+            snapshot=revision.snapshot if delta else number,
+            title=note.title,
+            data=json.dumps(operations) if delta else note.content,
+            content_length=note.content_length,
+            content_hash=note.content_hash,
+        ))
+        note.loaded_content = note.content
+        note.loaded_content_hash = note.content_hash
+    NoteRevision.objects.bulk_create(revisions)
+
+
+def get_revision_content(revision):
+    """
+    Returns the content of a revision from its snapshot and the deltas since, with one query.
+    """
+    if revision.is_snapshot:
+        return revision.data
+    content = None
+    for data, number, snapshot in NoteRevision.objects.filter(
+        note=revision.note_id, number__gte=revision.snapshot, number__lte=revision.number,
+    ).order_by('number').values_list('data', 'number', 'snapshot'):
+        content = data if number == snapshot else apply_operations(content, json.loads(data))
+    return content
+
+
+def compact_revisions(keep=None, before=None):
+    """
+    Deletes the revisions of each note that are neither among its latest keep nor created after before, always
+    keeping its latest revision. The oldest remaining revision of a note becomes a snapshot if it was a delta.
+    Returns the number of revisions deleted.
+    """
+    if keep is None and before is None:
+        return 0
+    deleted = 0
+    latest = NoteRevision.objects.values('note').annotate(number=Max('number')).values_list('note', 'number')
+    for note_id, latest_number in latest:
+        revisions = NoteRevision.objects.filter(note=note_id)
+        cutoffs = []
+        if keep is not None:
+            cutoffs.append(latest_number - max(keep, 1) + 1)
+        if before is not None:
+            created = revisions.filter(created__gte=before).order_by('number').values_list('number', flat=True)
+            cutoffs.append(created.first() or latest_number)
+        cutoff = min(cutoffs)
+        if not revisions.filter(number__lt=cutoff).exists():
+            continue
+        oldest = revisions.get(number=cutoff)
+        if oldest.snapshot != oldest.number:
+            oldest.data = get_revision_content(oldest)
+            oldest.snapshot = oldest.number
+            oldest.save(update_fields=['data', 'snapshot'])
+            # later deltas now build on the new snapshot
+            revisions.filter(number__gt=cutoff, snapshot__lt=cutoff).update(snapshot=cutoff)
+        deleted += revisions.filter(number__lt=cutoff).delete()[0]
+    return deleted
@@ -0,0 +1,228 @@
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from marknote.models import Note, load_archived_content
+from marknote.storage import compressed_q, get_stored_matches
+
+
+SQLITE_TABLE = 'marknote_notes_fts'
+POSTGRES_TABLE = 'marknote_notes_search'
+
+
+class RawSubquery(RawSQL):
+    """
+    A raw subquery for __in lookups, which add the parentheses themselves.
+    """
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+class BasicSearchBackend:
+    """
+    Unindexed search using case insensitive substring matches. Used on database backends without a supported full
+    text index and for terms too short to be indexed.
+    """
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def connection(self):
+        return connections[self.alias]
+
+    def index(self, notes):
+        pass
+
+    def remove(self, note_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def content_q(self, qs, term):
+        # without an index of the plain content, compressed and archived content is matched in Python, since the
+        # stored text would match its encoding
+        return (Q(content__icontains=term) & ~compressed_q()) | Q(pk__in=get_stored_matches(qs, term))
+
+    def filter(self, qs, search=None, title=None, content=None):
+        if search is not None:
+            qs = qs.filter(Q(title__icontains=search) | self.content_q(qs, search))
+        if title is not None:
+            qs = qs.filter(title__icontains=title)
+        if content is not None:
+            qs = qs.filter(self.content_q(qs, content))
+        return qs
+
+    def rebuild(self, batch_size=1000):
+        """
+        Clears the index and indexes every note in batches. Returns the number of notes indexed.
+        """
+        self.clear()
+        count = 0
+        batch = []
+        for note in Note.objects.using(self.alias).only('id', 'title', 'content', 'archived').iterator():
+            batch.append(note)
+            if len(batch) >= batch_size:
+                load_archived_content(batch)
+                self.index(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            load_archived_content(batch)
+            self.index(batch)
+            count += len(batch)
+        return count
+
+
+class SQLiteSearchBackend(BasicSearchBackend):
+    """
+    Search backed by an FTS5 virtual table using the trigram tokenizer, so indexed matches keep the substring
+    semantics of the basic backend. General searches are ranked with bm25. Content terms too short to be indexed are
+    matched with LIKE against the plain content the table stores.
+    """
+    min_term_length = 3
+
+    def index(self, notes):
+        rows = [(note.id, note.title, note.content) for note in notes]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM {} WHERE rowid = %s'.format(SQLITE_TABLE), [(row[0],) for row in rows])
+            cursor.executemany(
+                'INSERT INTO {}(rowid, title, content) VALUES (%s, %s, %s)'.format(SQLITE_TABLE),
+                rows,
+            )
+
+    def remove(self, note_ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany('DELETE FROM {} WHERE rowid = %s'.format(SQLITE_TABLE), [(i,) for i in note_ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {}'.format(SQLITE_TABLE))
+
+    def content_q(self, qs, term):
+        # the index holds the plain content of every note, including compressed and archived notes, which is read
+        # by rowid for each note the rest of the filter selects
+        return Q(pk__in=RawSubquery(
+            "SELECT rowid FROM {table} WHERE rowid = {notes}.id AND content LIKE %s ESCAPE '\\'".format(
+                table=SQLITE_TABLE,
+                notes=Note._meta.db_table,
+            ),
+            ['%{}%'.format(self.connection.ops.prep_for_like_query(term))],
+        ))
+
+    @staticmethod
+    def phrase(term):
+        return '"{}"'.format(term.replace('"', '""'))
+
+    def filter(self, qs, search=None, title=None, content=None):
+        expressions = []
+        fallback = {}
+        for column, term in (('search', search), ('title', title), ('content', content)):
+            if term is None:
+                continue
+            if len(term) < self.min_term_length:
+                fallback[column] = term
+            elif column == 'search':
+                expressions.append(self.phrase(term))
+            else:
+                expressions.append('{} : {}'.format(column, self.phrase(term)))
+        qs = super(SQLiteSearchBackend, self).filter(qs, **fallback)
+        if not expressions:
+            return qs
+        qs = qs.extra(
+            tables=[SQLITE_TABLE],
+            where=[
+                '{}.rowid = {}.id'.format(SQLITE_TABLE, Note._meta.db_table),
+                '{} MATCH %s'.format(SQLITE_TABLE),
+            ],
+            params=[' AND '.join(expressions)],
+        )
+        if 'search' in fallback or search is None:
+            return qs
+        return qs.extra(
+            select={'search_rank': 'bm25({})'.format(SQLITE_TABLE)},
+        ).order_by('search_rank', *Note._meta.ordering)
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """
+    Search backed by a weighted tsvector table with a GIN index. General searches match words and are ranked with
+    ts_rank. Title and content filters keep substring semantics and use the pg_trgm indexes created by the migration,
+    content filters matching the plain content the table stores.
+    """
+    config = 'simple'
+
+    def index(self, notes):
+        rows = [(note.id, note.title, note.content) for note in notes]
+        if not rows:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO {table} (note_id, content, document) VALUES ('
+                '%s, %s, setweight(to_tsvector(%s::regconfig, %s), \'A\') || '
+                'setweight(to_tsvector(%s::regconfig, %s), \'B\')'
+                ') ON CONFLICT (note_id) DO UPDATE SET content = EXCLUDED.content, document = EXCLUDED.document'
+                .format(table=POSTGRES_TABLE),
+                [(note_id, text, self.config, title, self.config, text) for note_id, title, text in rows],
+            )
+
+    def remove(self, note_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE note_id = ANY(%s)'.format(POSTGRES_TABLE), [list(note_ids)])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute('TRUNCATE {}'.format(POSTGRES_TABLE))
+
+    def content_q(self, qs, term):
+        # the index holds the plain content of every note, including compressed and archived notes
+        return Q(pk__in=RawSubquery(
+            'SELECT note_id FROM {} WHERE content ILIKE %s'.format(POSTGRES_TABLE),
+            ['%{}%'.format(self.connection.ops.prep_for_like_query(term))],
+        ))
+
+    def filter(self, qs, search=None, title=None, content=None):
+        qs = super(PostgresSearchBackend, self).filter(qs, title=title, content=content)
+        if search is None:
+            return qs
+        return qs.extra(
+            tables=[POSTGRES_TABLE],
+            where=[
+                '{}.note_id = {}.id'.format(POSTGRES_TABLE, Note._meta.db_table),
+                '{}.document @@ plainto_tsquery(%s::regconfig, %s)'.format(POSTGRES_TABLE),
+            ],
+            params=[self.config, search],
+            select={
+                'search_rank': 'ts_rank({}.document, plainto_tsquery(%s::regconfig, %s))'.format(POSTGRES_TABLE),
+            },
+            select_params=[self.config, search],
+        ).order_by('-search_rank', *Note._meta.ordering)
+
+
+_backends = {}
+
+
+def get_backend(using=None):
+    """
+    Returns the search backend for a database alias. The indexed backends are only used once their table exists.
+    """
+    alias = using or router.db_for_read(Note)
+    if alias not in _backends:
+        connection = connections[alias]
+        tables = connection.introspection.table_names()
+        if connection.vendor == 'sqlite' and SQLITE_TABLE in tables:
+            _backends[alias] = SQLiteSearchBackend(alias)
+        elif connection.vendor == 'postgresql' and POSTGRES_TABLE in tables:
+            _backends[alias] = PostgresSearchBackend(alias)
+        else:
+            _backends[alias] = BasicSearchBackend(alias)
+    return _backends[alias]
+
+
+def reset_backends():
+    """
+    Forgets the cached backends so the next lookup inspects the database again.
+    """
+    _backends.clear()
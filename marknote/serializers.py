@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from rest_framework.serializers import unicode_to_repr
 
-from marknote.models import Note, Folder
+from marknote.instrumentation import timer
+from marknote.models import Note, NoteRevision, Folder, load_archived_content
+from marknote.patch import Conflict, apply_operations
+from marknote.rendering import get_render_format, render_note
+from marknote.revisions import get_revision_content
 
 
 class CurrentUserDefault:
@@ -18,7 +22,22 @@ class CurrentUserDefault:
         self.user_id = serializer_field.context['request'].user.id
 
 
-class NoteSummarySerializer(serializers.ModelSerializer):
+class TimedSerializerMixin:
+    """
+    Counts representation time towards the serialization timing of instrumented requests.
+    """
+    def to_representation(self, instance):
+        with timer('serialize'):
+            return super(TimedSerializerMixin, self).to_representation(instance)
+
+
+def validate_folder_container(folder, container):
+    if container is not None and folder is not None and container.path.startswith(folder.path):
+        raise serializers.ValidationError('A folder cannot be moved into itself or one of its folders.')
+    return container
+
+
+class NoteSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     content = serializers.CharField(write_only=True, allow_blank=True)
     owner_id = serializers.HiddenField(default=CurrentUserDefault())
 
@@ -28,6 +47,9 @@ class NoteSummarySerializer(serializers.ModelSerializer):
             'pk',
             'title',
             'content',
+            'content_length',
+            'preview',
+            'content_hash',
             'container',
             'created',
             'updated',
@@ -35,20 +57,97 @@ class NoteSummarySerializer(serializers.ModelSerializer):
         )
 
 
-class NoteSerializer(serializers.ModelSerializer):
+class NoteTitleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Note
+        fields = (
+            'pk',
+            'title',
+            'container',
+            'updated',
+        )
+
+
+class PatchOperationSerializer(serializers.Serializer):
+    offset = serializers.IntegerField(min_value=0)
+    delete = serializers.IntegerField(min_value=0, default=0)
+    insert = serializers.CharField(allow_blank=True, trim_whitespace=False, default='')
+
+
+class ContentPatchSerializer(serializers.Serializer):
+    base = serializers.CharField()
+    operations = PatchOperationSerializer(many=True)
+
+
+class NoteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    content_patch = ContentPatchSerializer(write_only=True, required=False)
+
     class Meta:
         model = Note
         fields = (
             'pk',
             'title',
             'content',
+            'content_hash',
+            'content_patch',
             'container',
             'created',
             'updated',
         )
 
+    def validate(self, attrs):
+        """
+        Replaces a content patch with the content it produces, if its base is the hash of the current content.
+        """
+        content_patch = attrs.pop('content_patch', None)
+        if content_patch is None:
+            return attrs
+        if self.instance is None:
+            raise serializers.ValidationError({'content_patch': ['Only existing notes can be patched.']})
+        if 'content' in attrs:
+            raise serializers.ValidationError({'content_patch': ['Send either content or a content patch.']})
+        if content_patch['base'] != self.instance.content_hash:
+            raise Conflict({'detail': Conflict.default_detail, 'content_hash': self.instance.content_hash})
+        load_archived_content([self.instance])
+        attrs['content'] = apply_operations(self.instance.content, content_patch['operations'])
+        return attrs
+
+    def to_representation(self, instance):
+        # archived content is read from the archive
+        load_archived_content([instance])
+        data = super(NoteSerializer, self).to_representation(instance)
+        if get_render_format(self.context.get('request')) == 'html':
+            data['rendered'] = render_note(instance)
+        return data
+
+    def update(self, instance, validated_data):
+        instance.thaw()
+        return super(NoteSerializer, self).update(instance, validated_data)
+
+
+class NoteRevisionSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    class Meta:
+        model = NoteRevision
+        fields = (
+            'number',
+            'title',
+            'content_length',
+            'content_hash',
+            'created',
+        )
+
+
+class NoteRevisionSerializer(NoteRevisionSummarySerializer):
+    content = serializers.SerializerMethodField()
+
+    class Meta(NoteRevisionSummarySerializer.Meta):
+        fields = NoteRevisionSummarySerializer.Meta.fields + ('content',)
 
-class FolderSummarySerializer(serializers.ModelSerializer):
+    def get_content(self, obj):
+        return get_revision_content(obj)
+
+
+class FolderSummarySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     owner_id = serializers.HiddenField(default=CurrentUserDefault())
 
     class Meta:
@@ -62,10 +161,25 @@ class FolderSummarySerializer(serializers.ModelSerializer):
             'owner_id',
         )
 
+    def validate_container(self, value):
+        return validate_folder_container(self.instance, value)
+
 
-class FolderSerializer(serializers.ModelSerializer):
+class FolderTitleSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Folder
+        fields = (
+            'pk',
+            'title',
+            'container',
+            'updated',
+        )
+
+
+class FolderSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     notes = NoteSummarySerializer(many=True, read_only=True)
     folders = FolderSummarySerializer(many=True, read_only=True)
+    ancestors = serializers.SerializerMethodField()
 
     class Meta:
         model = Folder
@@ -73,8 +187,16 @@ class FolderSerializer(serializers.ModelSerializer):
             'pk',
             'title',
             'container',
+            'ancestors',
             'notes',
             'folders',
             'created',
             'updated',
         )
+
+    def get_ancestors(self, obj):
+        ancestors = Folder.objects.only('pk', 'title').in_bulk(obj.ancestor_ids)
+        return [{'pk': pk, 'title': ancestors[pk].title} for pk in obj.ancestor_ids if pk in ancestors]
+
+    def validate_container(self, value):
+        return validate_folder_container(self.instance, value)
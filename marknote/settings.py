@@ -0,0 +1,65 @@
+from django.conf import settings
+
+
+DEFAULTS = {
+    # pagination
+    'PAGE_SIZE': None,
+    'MAX_PAGE_SIZE': 1000,
+    # autocompletion, in titles per type and matching titles
+    'AUTOCOMPLETE_LIMIT': 10,
+    'AUTOCOMPLETE_MAX_LIMIT': 50,
+    'AUTOCOMPLETE_SORT_THRESHOLD': 1000,
+    # bulk operations
+    'BULK_MAX_OPERATIONS': 1000,
+    # imports, in bytes per archive member
+    'IMPORT_MAX_FILE_SIZE': 10 * 1024 * 1024,
+    # response cache
+    'RESPONSE_CACHE_ENABLED': False,
+    'RESPONSE_CACHE_ALIAS': 'default',
+    'RESPONSE_CACHE_TIMEOUT': 300,
+    # folder expansion
+    'EXPAND_MAX_DEPTH': 5,
+    # note storage, in characters and days
+    'COMPRESS_THRESHOLD': None,
+    'ARCHIVE_AFTER_DAYS': None,
+    # revisions
+    'REVISIONS_ENABLED': True,
+    'REVISION_SNAPSHOT_INTERVAL': 20,
+    'REVISION_DIFF_MAX_COMPARISONS': 250000,
+    # rendering, with the shared render cache disabled by default
+    'RENDERER': 'marknote.rendering.render_markdown',
+    'RENDER_CACHE_SIZE': 1000,
+    'RENDER_CACHE_ALIAS': None,
+    # ASGI handler threads, defaulting to the thread pool default
+    'ASGI_THREADS': None,
+    # token authentication cache, in seconds, with the shared cache disabled by default
+    'TOKEN_CACHE_SIZE': 10000,
+    'TOKEN_CACHE_TIMEOUT': 60,
+    'TOKEN_CACHE_ALIAS': None,
+    # permission cache, in seconds
+    'PERMISSION_CACHE_SIZE': 10000,
+    'PERMISSION_CACHE_TIMEOUT': 60,
+    # event streams, in seconds
+    'EVENT_BROKER': 'marknote.brokers.LocalBroker',
+    'EVENT_BROKER_URL': None,
+    'EVENT_KEEPALIVE': 15,
+    'EVENT_RETRY': 3,
+    'EVENT_STREAM_TIMEOUT': 300,
+    # instrumentation, in queries and milliseconds per request
+    'QUERY_BUDGET': None,
+    'TIME_BUDGET': None,
+}
+
+
+class MarknoteSettings:
+    """
+    Reads MarkNote settings from the Django settings module, where each is prefixed with MARKNOTE_. Settings are
+    looked up on every access so they can be overridden in tests.
+    """
+    def __getattr__(self, name):
+        if name not in DEFAULTS:
+            raise AttributeError('Invalid MarkNote setting: {}'.format(name))
+        return getattr(settings, 'MARKNOTE_' + name, DEFAULTS[name])
+
+
+marknote_settings = MarknoteSettings()
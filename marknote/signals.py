@@ -0,0 +1,117 @@
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from marknote import authentication, changes, permissions, response_cache, revisions, search
+from marknote.models import Folder, Note
+
+
+@receiver(post_init, sender=Note)
+def remember_note_container(sender, instance, **kwargs):
+    # the container a note was loaded with, so a move also invalidates the folder it left
+    instance.loaded_container_id = instance.__dict__.get('container_id')
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, using, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    search.get_backend(using).index([instance])
+
+
+@receiver(post_save, sender=Note)
+def record_note_revision(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    revisions.record_revisions([instance], created=created)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_note(sender, instance, using, **kwargs):
+    search.get_backend(using).remove([instance.id])
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_delete, sender=Note)
+def invalidate_note_responses(sender, instance, **kwargs):
+    response_cache.invalidate_notes(instance.owner_id, [instance.container_id, instance.loaded_container_id])
+    instance.loaded_container_id = instance.container_id
+
+
+@receiver(post_save, sender=Folder)
+@receiver(post_delete, sender=Folder)
+def invalidate_folder_responses(sender, instance, **kwargs):
+    response_cache.invalidate_folders(instance.owner_id)
+
+
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=Folder)
+def record_change(sender, instance, **kwargs):
+    changes.record_changes([instance])
+
+
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=Folder)
+def record_deletion(sender, instance, **kwargs):
+    changes.record_changes([instance], deleted=True)
+
+
+def get_token_model():
+    if not apps.is_installed('rest_framework.authtoken'):
+        return None
+    from rest_framework.authtoken.models import Token
+    return Token
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def forget_user(sender, instance, update_fields=None, **kwargs):
+    # logging in only updates last_login
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    authentication.invalidate_user(instance.pk, get_token_model())
+    # a created user may reuse the id of a user whose creation was rolled back
+    permissions.invalidate_users([instance.pk])
+
+
+def forget_token(sender, instance, **kwargs):
+    authentication.invalidate_tokens([instance.key])
+
+
+if get_token_model() is not None:
+    post_save.connect(forget_token, sender=get_token_model())
+    post_delete.connect(forget_token, sender=get_token_model())
+
+
+def forget_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        permissions.invalidate_users([instance.pk])
+    else:
+        # cleared from a permission or group, whose users are no longer known
+        permissions.invalidate_users(list(pk_set) if pk_set is not None else None)
+
+
+def forget_group_permissions(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        permissions.invalidate_users()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_deleted_user(sender, instance, **kwargs):
+    permissions.invalidate_users([instance.pk])
+
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def forget_deleted_permissions(sender, **kwargs):
+    permissions.invalidate_users()
+
+
+for field in ('user_permissions', 'groups'):
+    if hasattr(get_user_model(), field):
+        m2m_changed.connect(forget_user_permissions, sender=getattr(get_user_model(), field).through)
+m2m_changed.connect(forget_group_permissions, sender=Group.permissions.through)
@@ -0,0 +1,103 @@
+import time
+import zlib
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from marknote import serializers
+from marknote.models import COMPRESSED_PREFIX, Note, NoteArchive, load_archived_content
+from marknote.settings import marknote_settings
+
+
+def compressed_q():
+    return Q(content__startswith=COMPRESSED_PREFIX)
+
+
+def compress_notes(batch_size=1000):
+    """
+    Rewrites uncompressed notes at or above MARKNOTE_COMPRESS_THRESHOLD characters so they are stored compressed.
+    Returns the number of notes compressed.
+    """
+    threshold = marknote_settings.COMPRESS_THRESHOLD
+    if threshold is None:
+        return 0
+    qs = Note.objects.filter(content_length__gte=threshold, archived=False).exclude(compressed_q()).order_by('pk')
+    count = last_pk = 0
+    while True:
+        # locked until written back, so saves in between are not reverted
+        with transaction.atomic():
+            batch = list(qs.filter(pk__gt=last_pk).select_for_update().only('pk', 'content')[:batch_size])
+            if not batch:
+                return count
+            # content is compressed as it is written back, which leaves updated and the search index as they were
+            qs.bulk_update(batch, ['content'])
+        count += len(batch)
+        last_pk = batch[-1].pk
+
+
+def archive_notes(days=None, batch_size=1000):
+    """
+    Moves the content of notes not updated for days, MARKNOTE_ARCHIVE_AFTER_DAYS by default, into the compressed
+    archive. Summaries and the search index keep describing the archived content. Returns the number of notes archived.
+    """
+    days = days if days is not None else marknote_settings.ARCHIVE_AFTER_DAYS
+    if days is None:
+        return 0
+    cutoff = timezone.now() - timedelta(days=days)
+    qs = Note.objects.filter(updated__lt=cutoff, archived=False)
+    count = 0
+    while True:
+        # locked until archived, so saves in between are not lost
+        with transaction.atomic():
+            batch = list(qs.select_for_update().only('pk', 'content')[:batch_size])
+            if not batch:
+                return count
+            NoteArchive.objects.bulk_create([
+                NoteArchive(note_id=note.pk, data=zlib.compress(note.content.encode('utf-8'))) for note in batch
+            ])
+            # an update leaves updated as it was
+            ids = [note.pk for note in batch]
+            archived = qs.filter(pk__in=ids).update(content='', archived=True)
+            if archived < len(batch):
+                # notes saved since they were read keep their content
+                NoteArchive.objects.filter(note__in=ids, note__archived=False).delete()
+        count += archived
+
+
+def get_stored_matches(qs, term):
+    """
+    Returns the ids of the compressed and archived notes in qs whose content contains term case insensitively, which
+    the database cannot match itself.
+    """
+    term = term.lower()
+    notes = list(qs.filter(compressed_q() | Q(archived=True)).only('pk', 'content', 'archived').order_by())
+    load_archived_content(notes)
+    return [note.pk for note in notes if term in note.content.lower()]
+
+
+def get_report(sample_size=20):
+    """
+    Returns the number of notes, their content size, and their stored size in each tier, along with the mean time
+    to load and serialize a note of each tier, measured on up to sample_size notes.
+    """
+    tiers = {
+        'plain': Note.objects.filter(archived=False).exclude(compressed_q()),
+        'compressed': Note.objects.filter(compressed_q(), archived=False),
+        'archived': Note.objects.filter(archived=True),
+    }
+    report = {}
+    for name, qs in tiers.items():
+        stats = qs.aggregate(notes=Count('pk'), content_size=Sum('content_length'), stored_size=Sum(Length('content')))
+        if name == 'archived':
+            stats['stored_size'] = NoteArchive.objects.aggregate(size=Sum(Length('data')))['size']
+        stats = {key: value or 0 for key, value in stats.items()}
+        sample = list(qs.order_by('pk').values_list('pk', flat=True)[:sample_size])
+        start = time.perf_counter()
+        for pk in sample:
+            serializers.NoteSerializer(Note.objects.get(pk=pk)).data
+        stats['read_ms'] = round((time.perf_counter() - start) * 1000 / len(sample), 3) if sample else None
+        report[name] = stats
+    return report
@@ -0,0 +1,140 @@
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from marknote.instrumentation import timer
+from marknote.serializers import (
+    FolderSummarySerializer, FolderTitleSerializer, NoteSummarySerializer, NoteTitleSerializer,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# fields whose representation of a database value is the value itself
+IDENTITY_FIELDS = (fields.CharField, fields.IntegerField, fields.ReadOnlyField)
+
+
+def get_datetime_converter(field):
+    """
+    Returns the function that represents datetimes already in the field's time zone in ISO 8601 without converting
+    them, and other datetimes with the field.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = getattr(field, 'timezone', field.default_timezone())
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if value.tzinfo is not field_timezone:
+            return field.to_representation(value)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return convert
+
+
+def get_converter(field):
+    """
+    Returns the function that represents a database value of field in the current time zone, or None if the value is
+    its own representation.
+    """
+    if type(field) in IDENTITY_FIELDS:
+        return None
+    if type(field) is relations.PrimaryKeyRelatedField:
+        return field.pk_field.to_representation if field.pk_field is not None else None
+    if type(field) is fields.DateTimeField:
+        return get_datetime_converter(field)
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Represents rows the way the read only fields of a model serializer represent instances, reading the rows with
+    values_list. Each field's converter is chosen once per list, so a row costs a dict and the calls of the fields
+    that are not their own representation, such as dates. Only fields sourced from one model field or the pk are
+    supported.
+    """
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._plan = None
+
+    def get_plan(self):
+        """
+        Returns the field names, the columns they are read from, and the fields that need converters by column index.
+        """
+        if self._plan is None:
+            serializer = self.serializer_class()
+            opts = serializer.Meta.model._meta
+            names = []
+            columns = []
+            converted = []
+            for field in serializer.fields.values():
+                if field.write_only:
+                    continue
+                if field.source == 'pk':
+                    column = 'pk'
+                else:
+                    try:
+                        column = opts.get_field(field.source).attname
+                    except FieldDoesNotExist:
+                        raise ImproperlyConfigured('{} cannot be read with values_list.'.format(field.field_name))
+                if get_converter(field) is not None:
+                    converted.append((field.field_name, len(columns), field))
+                names.append(field.field_name)
+                columns.append(column)
+            self._plan = (names, columns, converted)
+        return self._plan
+
+    def get_rows(self, queryset):
+        """
+        Returns queryset as named rows, which have the pk, title, and updated attributes pagination reads.
+        """
+        return queryset.values_list(*self.get_plan()[1], named=True)
+
+    def to_representation(self, rows):
+        names, columns, converted = self.get_plan()
+        # the time zone may differ between requests
+        converters = [(name, index, get_converter(field)) for name, index, field in converted]
+        with timer('serialize'):
+            data = [dict(zip(names, row)) for row in rows]
+            if converters:
+                for item, row in zip(data, rows):
+                    for name, index, converter in converters:
+                        value = row[index]
+                        if value is not None:
+                            item[name] = converter(value)
+        return data
+
+    def serialize(self, queryset):
+        return self.to_representation(self.get_rows(queryset))
+
+
+note_summaries = ValuesSerializer(NoteSummarySerializer)
+folder_summaries = ValuesSerializer(FolderSummarySerializer)
+note_titles = ValuesSerializer(NoteTitleSerializer)
+folder_titles = ValuesSerializer(FolderTitleSerializer)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders the same bytes as JSONRenderer with orjson when it is installed, for data without floats, whose
+    formatting differs. Types orjson does not support natively are encoded like JSONRenderer does, and anything
+    orjson cannot encode is rendered by JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # orjson only writes compact, unescaped unicode
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except (orjson.JSONEncodeError, ValueError):
+            return super(FastJSONRenderer, self).render(data, accepted_media_type, renderer_context)
+        # escaped like JSONRenderer so the output is a JavaScript subset
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,154 @@
+from django.contrib.auth.models import Permission, User
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITransactionTestCase
+
+import asyncio
+import io
+import json
+
+from marknote.asgi import ASGIHandler, get_environ
+from marknote.benchmark import ConcurrencyBenchmark
+from marknote.models import Note
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TestASGIHandler(APITransactionTestCase):
+    """
+    Test cases for the ASGI handler, which runs in other threads and so needs committed data.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        self.user.user_permissions.add(Permission.objects.get(codename='add_note'))
+        self.token = Token.objects.create(user=self.user)
+        # create note
+        self.note = Note.objects.create(title='note', content='content', owner=self.user)
+        self.application = ASGIHandler(WSGIHandler(), threads=2)
+
+    def tearDown(self):
+        self.application.executor.shutdown()
+
+    def request(self, method, path, body=b'', headers=()):
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', 'Token {}'.format(self.token.key).encode()),
+            ] + list(headers),
+        }
+        # the body arrives in two messages
+        messages = [
+            {'type': 'http.request', 'body': body[:1], 'more_body': True},
+            {'type': 'http.request', 'body': body[1:]},
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.application(scope, receive, send))
+        finally:
+            loop.close()
+        return sent
+
+    def test_get(self):
+        """
+        Tests that a GET request returns the same response as through WSGI.
+        """
+        start, body = self.request('GET', reverse('marknote:note-retrieve-update-destroy', args=[self.note.pk]))
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'application/json'), start['headers'])
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.get(reverse('marknote:note-retrieve-update-destroy', args=[self.note.pk]))
+        self.assertEqual(body['body'], response.content)
+
+    def test_post(self):
+        """
+        Tests that a request body is read.
+        """
+        start, body = self.request(
+            'POST', reverse('marknote:note-list-create'),
+            json.dumps({'title': 'posted', 'content': 'body'}).encode(),
+            [(b'content-type', b'application/json')],
+        )
+        self.assertEqual(start['status'], 201)
+        self.assertEqual(Note.objects.get(title='posted').content, 'body')
+
+    def test_environ(self):
+        """
+        Tests that repeated cookie headers are joined as one cookie header and bodies are read from the spooled file.
+        """
+        environ = get_environ(
+            {'method': 'POST', 'path': '/', 'headers': [(b'cookie', b'a=1'), (b'cookie', b'b=2'), (b'accept', b'a'),
+                                                         (b'accept', b'b')]},
+            io.BytesIO(b'body'),
+        )
+        self.assertEqual((environ['HTTP_COOKIE'], environ['HTTP_ACCEPT']), ('a=1; b=2', 'a,b'))
+        self.assertEqual((environ['CONTENT_LENGTH'], environ['wsgi.input'].read()), ('4', b'body'))
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=10)
+    def test_large_body(self):
+        """
+        Tests that bodies larger than the upload memory size are spooled to disk and read whole.
+        """
+        content = 'x' * 1000
+        start, body = self.request(
+            'POST', reverse('marknote:note-list-create'),
+            json.dumps({'title': 'large', 'content': content}).encode(),
+            [(b'content-type', b'application/json')],
+        )
+        self.assertEqual(start['status'], 201)
+        self.assertEqual(Note.objects.get(title='large').content, content)
+
+    def test_streaming(self):
+        """
+        Tests that a streaming response is sent in chunks.
+        """
+        Note.objects.create(title='other', content='other', owner=self.user)
+        messages = self.request('GET', reverse('marknote:export'))
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertEqual([message.get('more_body', False) for message in messages[1:]], [True, True, False])
+        lines = b''.join(message['body'] for message in messages[1:]).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['note', 'other'])
+
+    def test_lifespan(self):
+        """
+        Tests that lifespan events are acknowledged.
+        """
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(self.application({'type': 'lifespan'}, receive, send))
+        loop.close()
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+    def test_concurrency_benchmark(self):
+        """
+        Tests that the concurrency benchmark runs every request through both handlers.
+        """
+        report = ConcurrencyBenchmark(self.user, clients=2, requests=6).run()
+        self.assertEqual(report['requests'], 6)
+        for name in ('wsgi', 'asgi'):
+            self.assertEqual(report[name]['errors'], 0)
+            self.assertGreater(report[name]['requests_per_second'], 0)
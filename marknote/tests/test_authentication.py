@@ -0,0 +1,163 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient, APITestCase
+
+import time
+
+from marknote import authentication
+from marknote.lru import LRUCache
+
+
+class TestLRUCache(APITestCase):
+    """
+    Test cases for the in-process LRU cache.
+    """
+    def test_eviction(self):
+        """
+        Tests that the least recently used entry is evicted.
+        """
+        cache = LRUCache('TOKEN_CACHE_SIZE', 'TOKEN_CACHE_TIMEOUT')
+        with self.settings(MARKNOTE_TOKEN_CACHE_SIZE=2):
+            cache.set('a', 1)
+            cache.set('b', 2)
+            self.assertEqual(cache.get('a'), 1)
+            cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['evictions'], stats['size']), (2, 1, 1, 2))
+        self.assertEqual(stats['hit_rate'], 0.667)
+
+    def test_timeout(self):
+        """
+        Tests that entries expire after the timeout and are not kept when the size is zero.
+        """
+        cache = LRUCache('TOKEN_CACHE_SIZE', 'TOKEN_CACHE_TIMEOUT')
+        with self.settings(MARKNOTE_TOKEN_CACHE_TIMEOUT=0.01):
+            cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+        with self.settings(MARKNOTE_TOKEN_CACHE_SIZE=0):
+            cache.set('a', 1)
+        self.assertEqual(cache.get_stats()['size'], 0)
+
+
+class TestCachedTokenAuthentication(APITestCase):
+    """
+    Test cases for CachedTokenAuthentication.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_superuser(username=self.username, password=self.password, email='')
+        self.token = Token.objects.create(user=self.user)
+        # authenticate test client with the token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token {}'.format(self.token.key))
+        authentication.reset()
+
+    def tearDown(self):
+        authentication.reset()
+
+    def get_token_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('marknote:note-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [query for query in captured if 'authtoken_token' in query['sql']]
+
+    def test_cache_hit(self):
+        """
+        Tests that the token is only looked up on the first request.
+        """
+        self.assertEqual(len(self.get_token_queries()), 1)
+        self.assertEqual(len(self.get_token_queries()), 0)
+        stats = authentication.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+    def test_fresh_user(self):
+        """
+        Tests that each request gets its own copy of the cached user.
+        """
+        auth = authentication.CachedTokenAuthentication()
+        user, token = auth.authenticate_credentials(self.token.key)
+        user.first_name = 'changed'
+        other, other_token = auth.authenticate_credentials(self.token.key)
+        self.assertIsNot(user, other)
+        self.assertEqual(other.first_name, '')
+        self.assertEqual((other.pk, other_token.key, other_token.user_id), (self.user.pk, self.token.key, self.user.pk))
+        self.assertTrue(other.is_superuser)
+
+    def test_password_not_cached(self):
+        """
+        Tests that the password hash is not cached and is loaded if read.
+        """
+        auth = authentication.CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.key)
+        entry = authentication.token_cache.get(self.token.key)
+        self.assertNotIn('password', entry['fields'])
+        self.assertNotIn(self.user.password, entry['values'])
+        user, token = auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+        self.assertTrue(user.check_password(self.password))
+
+    def test_token_deleted(self):
+        """
+        Tests that a deleted token is forgotten at once.
+        """
+        self.get_token_queries()
+        self.token.delete()
+        response = self.client.get(reverse('marknote:note-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_deactivated(self):
+        """
+        Tests that saving a user forgets their tokens, but logging in does not.
+        """
+        self.get_token_queries()
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(len(self.get_token_queries()), 0)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('marknote:note-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_token(self):
+        """
+        Tests that invalid tokens are not cached.
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        for attempt in range(2):
+            response = self.client.get(reverse('marknote:note-list-create'))
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(authentication.get_stats()['size'], 0)
+
+    @override_settings(
+        MARKNOTE_TOKEN_CACHE_ALIAS='marknote-token',
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'marknote-token': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'token'},
+        },
+    )
+    def test_shared_cache(self):
+        """
+        Tests that other processes read the token from the shared cache until the user is saved.
+        """
+        caches['marknote-token'].clear()
+        self.assertEqual(len(self.get_token_queries()), 1)
+        # another process
+        authentication.token_cache.clear()
+        self.assertEqual(len(self.get_token_queries()), 0)
+        stats = authentication.get_stats()
+        self.assertEqual((stats['shared_hits'], stats['shared_misses']), (1, 1))
+        self.user.is_active = False
+        self.user.save()
+        authentication.token_cache.clear()
+        response = self.client.get(reverse('marknote:note-list-create'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
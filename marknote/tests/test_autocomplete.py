@@ -0,0 +1,151 @@
+from django.contrib.auth.models import Permission, User
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import datetime
+
+from marknote.autocomplete import get_prefix_key
+from marknote.models import Folder, Note, get_title_key, prefix_q
+
+
+class TestTitleKeys(APITestCase):
+    """
+    Test cases for the normalized title keys.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        for codename in ('change_note', 'change_folder'):
+            self.user.user_permissions.add(Permission.objects.get(codename=codename))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+
+    def test_normalize(self):
+        """
+        Tests that keys ignore case, accents, and repeated spaces, and that prefixes keep a trailing space.
+        """
+        self.assertEqual(get_title_key('  Café   NOTES '), 'cafe notes')
+        self.assertEqual(get_title_key('Straße'), 'strasse')
+        self.assertEqual(get_prefix_key('Café '), 'cafe ')
+        self.assertEqual(get_prefix_key('   '), '')
+
+    def test_prefix_q(self):
+        """
+        Tests that prefix filters match every key starting with the prefix, including after the last code point.
+        """
+        for title in ('me', 'me\U0010ffffx', 'mf', 'm'):
+            Note.objects.create(title=title, content='', owner=self.user)
+        notes = Note.objects.filter(prefix_q('me')).order_by('pk')
+        self.assertEqual([note.title for note in notes], ['me', 'me\U0010ffffx'])
+
+    def test_saved(self):
+        """
+        Tests that keys follow the title when saved, including with update_fields.
+        """
+        note = Note.objects.create(title='Café', content='', owner=self.user)
+        self.assertEqual(Note.objects.get(pk=note.pk).title_key, 'cafe')
+        note.title = 'Menu'
+        note.save(update_fields=['title'])
+        self.assertEqual(Note.objects.get(pk=note.pk).title_key, 'menu')
+
+    def test_bulk(self):
+        """
+        Tests that keys follow the title in bulk creates and updates.
+        """
+        folder = Folder.objects.create(title='Old', owner=self.user)
+        Note.objects.bulk_create([Note(title='Bulk Note', content='', owner=self.user)])
+        self.assertEqual(Note.objects.get(title='Bulk Note').title_key, 'bulk note')
+        response = self.client.post(reverse('marknote:folder-bulk'), {'operations': [
+            {'action': 'update', 'pk': folder.pk, 'data': {'title': 'NEW'}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Folder.objects.get(pk=folder.pk).title_key, 'new')
+
+
+class TestAutocomplete(APITestCase):
+    """
+    Test cases for AutocompleteView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # view name
+        self.view_name = 'marknote:autocomplete'
+        # notes updated a minute apart in the order created
+        now = timezone.now()
+        self.folder = Folder.objects.create(title='Meetings', owner=self.user)
+        titles = ['Meeting notes', 'meal plan', 'Mémo', 'Other', 'meeting  agenda']
+        self.notes = []
+        for index, title in enumerate(titles):
+            note = Note.objects.create(title=title, content='', owner=self.user, container=self.folder)
+            Note.objects.filter(pk=note.pk).update(updated=now + datetime.timedelta(minutes=index))
+            self.notes.append(note)
+        Note.objects.create(title='Meeting', content='', owner=User.objects.create_user('other'))
+
+    def get(self, **params):
+        response = self.client.get(reverse(self.view_name), params)
+        return response.status_code, response.json()
+
+    def titles(self, data, key='notes'):
+        return [item['title'] for item in data[key]]
+
+    def test_prefix(self):
+        """
+        Tests that owned notes and folders starting with the title are listed by recency.
+        """
+        status_code, data = self.get(title='ME')
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(self.titles(data), ['meeting  agenda', 'Mémo', 'meal plan', 'Meeting notes'])
+        self.assertEqual(self.titles(data, 'folders'), ['Meetings'])
+        self.assertEqual(set(data['notes'][0]), {'pk', 'title', 'container', 'updated'})
+        self.assertEqual(data['notes'][0]['container'], self.folder.pk)
+        self.assertEqual(self.titles(self.get(title='meeting ')[1]), ['meeting  agenda', 'Meeting notes'])
+        self.assertEqual(self.titles(self.get(title='memo')[1]), ['Mémo'])
+        self.assertEqual(self.get(title='x')[1], {'notes': [], 'folders': []})
+
+    def test_limit_and_type(self):
+        """
+        Tests that results are limited per type, an empty title lists the most recent, and types can be chosen.
+        """
+        status_code, data = self.get(limit=2, type='note')
+        self.assertEqual(self.titles(data), ['meeting  agenda', 'Other'])
+        self.assertNotIn('folders', data)
+        self.assertEqual(self.titles(self.get(limit=1000, title='m')[1]), [
+            'meeting  agenda', 'Mémo', 'meal plan', 'Meeting notes',
+        ])
+        self.assertEqual(self.get(type='tag')[0], status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(MARKNOTE_AUTOCOMPLETE_SORT_THRESHOLD=2)
+    def test_scan(self):
+        """
+        Tests that prefixes matching many titles are scanned by recency with the same results.
+        """
+        self.assertEqual(self.titles(self.get(title='me', type='note')[1]), [
+            'meeting  agenda', 'Mémo', 'meal plan', 'Meeting notes',
+        ])
+        self.assertEqual(self.titles(self.get(title='o', type='note')[1]), ['Other'])
+
+    def test_queries(self):
+        """
+        Tests that each type costs two queries after authentication.
+        """
+        # session, user, matches, notes
+        with self.assertNumQueries(4):
+            self.get(title='me', type='note')
+
+    def test_unauthenticated(self):
+        """
+        Tests that autocompletion requires authentication.
+        """
+        self.client.logout()
+        self.assertEqual(self.get(title='me')[0], status.HTTP_403_FORBIDDEN)
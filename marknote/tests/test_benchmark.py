@@ -0,0 +1,83 @@
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+import io
+import json
+import os
+import tempfile
+
+from marknote import search
+from marknote.benchmark import QUERY_BUDGETS, Benchmark, SerializationBenchmark, check_budgets, seed
+from marknote.models import Folder, Note
+
+
+class TestBenchmark(APITestCase):
+    """
+    Test cases for the seed data generator and the benchmark suite.
+    """
+    def test_seed(self):
+        """
+        Tests that seeded folders and notes have their paths, summaries, and search index.
+        """
+        # seed
+        user, = seed(width=2, depth=3, notes=20, note_size=50)
+        # test folders
+        folders = Folder.objects.filter(owner=user)
+        self.assertEqual(folders.count(), 2 + 4 + 8)
+        for folder in folders:
+            self.assertEqual(folder.path, folder.get_path())
+        # test notes
+        notes = Note.objects.filter(owner=user)
+        self.assertEqual(notes.count(), 20)
+        for note in notes:
+            self.assertEqual(note.content_length, len(note.content))
+        note = notes.first()
+        self.assertIn(note, search.get_backend().filter(Note.objects.all(), search=note.title))
+        self.assertTrue(user.has_perm('marknote.add_note'))
+
+    def test_benchmark(self):
+        """
+        Tests that every benchmark case succeeds within its query budget and leaves the database unchanged.
+        """
+        # seed
+        user, = seed(width=2, depth=2, notes=10, note_size=50)
+        notes = Note.objects.count()
+        # run
+        report = Benchmark(user, repeat=1).run()
+        # test report
+        self.assertEqual(set(report['results']), set(QUERY_BUDGETS))
+        for result in report['results'].values():
+            self.assertLess(result['status'], 300)
+        self.assertEqual(check_budgets(report), [])
+        self.assertEqual(report['dataset'], {'notes': 10, 'folders': 6})
+        self.assertEqual(set(report['response_cache']), {'hits', 'misses', 'invalidations', 'enabled'})
+        # test database
+        self.assertEqual(Note.objects.count(), notes)
+
+    def test_serialization_benchmark(self):
+        """
+        Tests that the serialization benchmark measures both paths for notes and folders.
+        """
+        # seed
+        user, = seed(width=2, depth=1, notes=10, note_size=50)
+        # run
+        results = SerializationBenchmark(user, repeat=1).run()
+        self.assertEqual((results['notes']['objects'], results['folders']['objects']), (10, 2))
+        for result in results.values():
+            self.assertGreater(result['serializer_per_second'], 0)
+            self.assertGreater(result['fast_per_second'], 0)
+
+    def test_benchmark_command(self):
+        """
+        Tests that the benchmark command writes a JSON report and fails when a budget is exceeded.
+        """
+        # seed
+        call_command('seed_marknote', notes=5, width=1, depth=1, stdout=io.StringIO())
+        # run
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command('benchmark_marknote', repeat=1, case=['note list'], output=output)
+            with open(output) as f:
+                report = json.load(f)
+        self.assertEqual(list(report['results']), ['note list'])
+        self.assertEqual(check_budgets(report, {'note list': 0}), ['note list: 2 queries, budget 0'])
@@ -0,0 +1,176 @@
+from django.contrib.auth.models import Permission, User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+
+import json
+
+from marknote.models import Folder, Note
+
+
+class TestNoteBulkPost(APITestCase):
+    """
+    Test cases for POST requests on NoteBulkView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        for codename in ('add_note', 'change_note', 'delete_note'):
+            self.user.user_permissions.add(Permission.objects.get(codename=codename))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # view name
+        self.view_name = 'marknote:note-bulk'
+
+    def post(self, operations, client=None):
+        response = (client or self.client).post(reverse(self.view_name), {'operations': operations}, format='json')
+        return response, json.loads(response.content.decode('utf-8'))
+
+    def test_note_bulk(self):
+        """
+        Tests that creates, updates, and deletes are applied with a result for each operation.
+        """
+        # create notes
+        updated = Note.objects.create(title='title', content='content', owner=self.user)
+        deleted = Note.objects.create(title='title', content='content', owner=self.user)
+        other = Note.objects.create(title='title', content='content', owner=User.objects.create_user('other_user'))
+        # request
+        response, body = self.post([
+            {'action': 'create', 'data': {'title': 'new', 'content': 'new content'}},
+            {'action': 'update', 'pk': updated.id, 'data': {'content': 'changed'}},
+            {'action': 'delete', 'pk': deleted.id},
+            {'action': 'create', 'data': {'content': 'no title'}},
+            {'action': 'delete', 'pk': other.id},
+            {'action': 'move'},
+        ])
+        # test database
+        created = Note.objects.get(title='new')
+        self.assertEqual(created.owner, self.user)
+        self.assertEqual(created.content, 'new content')
+        self.assertEqual(Note.objects.get(id=updated.id).content, 'changed')
+        self.assertGreater(Note.objects.get(id=updated.id).updated, updated.updated)
+        self.assertFalse(Note.objects.filter(id=deleted.id).exists())
+        self.assertTrue(Note.objects.filter(id=other.id).exists())
+        # test response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            [201, 200, 204, 400, 404, 400],
+        )
+        self.assertEqual(body['results'][0]['data']['pk'], created.id)
+        self.assertEqual(body['results'][2]['pk'], deleted.id)
+        self.assertTrue('title' in body['results'][3]['errors'])
+
+    def test_note_bulk_search_index(self):
+        """
+        Tests that bulk updates are reflected in search.
+        """
+        # create note
+        note = Note.objects.create(title='title', content='original', owner=self.user)
+        # request
+        self.post([{'action': 'update', 'pk': note.id, 'data': {'content': 'changed'}}])
+        response = self.client.get(reverse('marknote:note-list-create') + '?content=changed')
+        self.assertEqual(len(json.loads(response.content.decode('utf-8'))['notes']), 1)
+
+    def test_note_bulk_not_authorized(self):
+        """
+        Tests that each operation requires its model permission.
+        """
+        # create user with only add permission
+        user = User.objects.create_user(username='limited', password='limited')
+        user.user_permissions.add(Permission.objects.get(codename='add_note'))
+        note = Note.objects.create(title='title', content='content', owner=user)
+        client = APIClient()
+        client.login(username='limited', password='limited')
+        # request
+        response, body = self.post([
+            {'action': 'create', 'data': {'title': 'new', 'content': 'content'}},
+            {'action': 'delete', 'pk': note.id},
+        ], client=client)
+        # test database
+        self.assertEqual(Note.objects.filter(owner=user).count(), 2)
+        # test response
+        self.assertEqual([result['status'] for result in body['results']], [201, 403])
+
+    def test_note_bulk_not_authenticated(self):
+        """
+        Tests that bulk operations require authentication.
+        """
+        response, body = self.post([{'action': 'create', 'data': {'title': 'new', 'content': ''}}], APIClient())
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(Note.objects.count(), 0)
+
+    def test_note_bulk_invalid_pk(self):
+        """
+        Tests that operations whose pk is not an integer are rejected without affecting the others.
+        """
+        note = Note.objects.create(title='title', content='content', owner=self.user)
+        response, body = self.post([
+            {'action': 'update', 'pk': [note.id], 'data': {'title': 'list'}},
+            {'action': 'update', 'pk': {'id': note.id}, 'data': {'title': 'object'}},
+            {'action': 'delete', 'pk': True},
+            {'action': 'delete', 'pk': str(note.id)},
+            {'action': 'delete'},
+            {'action': 'update', 'pk': note.id, 'data': {'title': 'valid'}},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['status'] for result in body['results']], [400, 400, 400, 400, 400, 200])
+        self.assertEqual(body['results'][0]['errors'], {'pk': ['Must be an integer.']})
+        self.assertEqual(Note.objects.get(id=note.id).title, 'valid')
+
+    @override_settings(MARKNOTE_BULK_MAX_OPERATIONS=1)
+    def test_note_bulk_invalid(self):
+        """
+        Tests that the operations must be a list within the size limit.
+        """
+        response, body = self.post('create')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response, body = self.post([{'action': 'delete', 'pk': 1}] * 2)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TestFolderBulkPost(APITestCase):
+    """
+    Test cases for POST requests on FolderBulkView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        for codename in ('add_folder', 'change_folder', 'delete_folder'):
+            self.user.user_permissions.add(Permission.objects.get(codename=codename))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # view name
+        self.view_name = 'marknote:folder-bulk'
+
+    def test_folder_bulk(self):
+        """
+        Tests that folder operations keep the folder paths current and cannot create a cycle.
+        """
+        # create folders a/b and c
+        a = Folder.objects.create(title='a', owner=self.user)
+        b = Folder.objects.create(title='b', owner=self.user, container=a)
+        c = Folder.objects.create(title='c', owner=self.user)
+        # request
+        response = self.client.post(reverse(self.view_name), {'operations': [
+            {'action': 'create', 'data': {'title': 'new', 'container': b.id}},
+            {'action': 'update', 'pk': a.id, 'data': {'container': c.id}},
+            {'action': 'update', 'pk': c.id, 'data': {'container': b.id}},
+            {'action': 'update', 'pk': b.id, 'data': {'title': 'renamed'}},
+            {'action': 'delete', 'pk': b.id},
+        ]}, format='json')
+        body = json.loads(response.content.decode('utf-8'))
+        # test database
+        new = Folder.objects.get(title='new')
+        self.assertEqual(new.path, '/{}/{}/{}/{}/'.format(c.id, a.id, b.id, new.id))
+        self.assertEqual(Folder.objects.get(id=c.id).container, None)
+        self.assertEqual(Folder.objects.get(id=b.id).title, 'renamed')
+        # test response
+        self.assertEqual([result['status'] for result in body['results']], [201, 200, 400, 200, 400])
@@ -0,0 +1,173 @@
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import io
+
+from marknote.models import Change, ChangeCounter, Folder, Note
+
+
+class TestChangeFeed(APITestCase):
+    """
+    Test cases for ChangeFeedView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        for codename in ('add_note', 'change_note', 'delete_note', 'change_folder', 'delete_folder'):
+            self.user.user_permissions.add(Permission.objects.get(codename=codename))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create a folder with a subfolder and notes
+        self.folder = Folder.objects.create(title='folder', owner=self.user)
+        self.subfolder = Folder.objects.create(title='subfolder', owner=self.user, container=self.folder)
+        self.note = Note.objects.create(title='note', content='content', owner=self.user, container=self.folder)
+        self.other = Note.objects.create(title='other', content='other', owner=self.user, container=self.subfolder)
+        Note.objects.create(title='not mine', content='', owner=User.objects.create_user('other'))
+
+    def get(self, since=None, limit=None):
+        query = []
+        if since is not None:
+            query.append('since={}'.format(since))
+        if limit is not None:
+            query.append('limit={}'.format(limit))
+        response = self.client.get(reverse('marknote:changes') + '?' + '&'.join(query))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def summarize(self, data):
+        return [(change['type'], change['pk'], change['deleted']) for change in data['changes']]
+
+    def test_initial(self):
+        """
+        Tests that the feed starts with every object of the user in the order they were written.
+        """
+        data = self.get()
+        self.assertEqual(self.summarize(data), [
+            ('folder', self.folder.pk, False),
+            ('folder', self.subfolder.pk, False),
+            ('note', self.note.pk, False),
+            ('note', self.other.pk, False),
+        ])
+        self.assertEqual(data['changes'][2]['data']['content'], 'content')
+        self.assertEqual(data['changes'][1]['data']['container'], self.folder.pk)
+        self.assertFalse(data['more'])
+
+    def test_no_changes(self):
+        """
+        Tests that an unchanged feed returns its cursor with one query after authentication.
+        """
+        cursor = self.get()['cursor']
+        # session, user, changes
+        with self.assertNumQueries(3):
+            data = self.get(cursor)
+        self.assertEqual(data, {'changes': [], 'cursor': cursor, 'more': False})
+
+    def test_update_and_move(self):
+        """
+        Tests that updates and moves appear once at their latest change.
+        """
+        cursor = self.get()['cursor']
+        self.note.title = 'renamed'
+        self.note.save()
+        self.client.patch(
+            reverse('marknote:note-retrieve-update-destroy', args=[self.note.pk]),
+            {'container': self.subfolder.pk},
+            format='json',
+        )
+        data = self.get(cursor)
+        self.assertEqual(self.summarize(data), [('note', self.note.pk, False)])
+        self.assertEqual(data['changes'][0]['data']['title'], 'renamed')
+        self.assertEqual(data['changes'][0]['data']['container'], self.subfolder.pk)
+        self.assertGreater(data['cursor'], cursor)
+
+    def test_cascade_delete(self):
+        """
+        Tests that deleting a folder leaves a tombstone for it and everything below it.
+        """
+        cursor = self.get()['cursor']
+        response = self.client.delete(reverse('marknote:folder-retrieve-update-destroy', args=[self.folder.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        data = self.get(cursor)
+        self.assertEqual(sorted(self.summarize(data)), [
+            ('folder', self.folder.pk, True),
+            ('folder', self.subfolder.pk, True),
+            ('note', self.note.pk, True),
+            ('note', self.other.pk, True),
+        ])
+        self.assertEqual({change['data'] for change in data['changes']}, {None})
+
+    def test_deleted_after_update(self):
+        """
+        Tests that an object saved and then deleted only appears as a tombstone.
+        """
+        cursor = self.get()['cursor']
+        pk = self.note.pk
+        self.note.save()
+        self.note.delete()
+        self.assertEqual(self.summarize(self.get(cursor)), [('note', pk, True)])
+
+    def test_bulk(self):
+        """
+        Tests that bulk operations record their changes.
+        """
+        cursor = self.get()['cursor']
+        self.client.post(reverse('marknote:note-bulk'), {'operations': [
+            {'action': 'create', 'data': {'title': 'bulk', 'content': ''}},
+            {'action': 'update', 'pk': self.note.pk, 'data': {'title': 'bulk update'}},
+        ]}, format='json')
+        created = Note.objects.get(title='bulk')
+        self.assertEqual(sorted(self.summarize(self.get(cursor))), [
+            ('note', self.note.pk, False), ('note', created.pk, False),
+        ])
+
+    def test_limit(self):
+        """
+        Tests that the feed is read in pages by following the cursor.
+        """
+        data = self.get(limit=3)
+        self.assertEqual(len(data['changes']), 3)
+        self.assertTrue(data['more'])
+        data = self.get(data['cursor'], limit=3)
+        self.assertEqual(self.summarize(data), [('note', self.other.pk, False)])
+
+    def test_sequences(self):
+        """
+        Tests that each owner's changes are numbered from their own counter without gaps.
+        """
+        other = User.objects.get(username='other')
+        self.client.post(reverse('marknote:note-bulk'), {'operations': [
+            {'action': 'create', 'data': {'title': 'first', 'content': ''}},
+            {'action': 'create', 'data': {'title': 'second', 'content': ''}},
+        ]}, format='json')
+        sequences = list(Change.objects.filter(owner=self.user).order_by('pk').values_list('sequence', flat=True))
+        self.assertEqual(sequences, list(range(1, 7)))
+        self.assertEqual(list(Change.objects.filter(owner=other).values_list('sequence', flat=True)), [1])
+        self.assertEqual(ChangeCounter.objects.get(owner=self.user).sequence, 6)
+        self.assertEqual(self.get()['cursor'], 6)
+
+    def test_invalid_cursor(self):
+        """
+        Tests that a cursor must be a number within the range of the sequence column.
+        """
+        for since in ('abc', '\u00b2', '-1', '999999999999999999999999', str(2 ** 31)):
+            response = self.client.get(reverse('marknote:changes'), {'since': since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.get(2 ** 31 - 1)['changes'], [])
+
+    def test_compact_changes(self):
+        """
+        Tests that compacting keeps the latest change of each object.
+        """
+        self.note.save()
+        self.note.save()
+        stdout = io.StringIO()
+        call_command('compact_changes', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), 'Deleted 2 changes.')
+        self.assertEqual(Change.objects.filter(object_id=self.note.pk, kind='note').count(), 1)
+        self.assertEqual(len(self.get()['changes']), 4)
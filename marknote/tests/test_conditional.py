@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from marknote.models import Folder, Note
+
+
+class TestConditionalGet(APITestCase):
+    """
+    Test cases for ETag and Last-Modified support on the list and detail views.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create folder with a note
+        self.folder = Folder.objects.create(title='folder', owner=self.user)
+        self.note = Note.objects.create(title='note', content='content', owner=self.user, container=self.folder)
+
+    def test_note_not_modified(self):
+        """
+        Tests that a note detail request with a matching ETag is answered without loading the note.
+        """
+        url = reverse('marknote:note-retrieve-update-destroy', args=[self.note.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.has_header('Last-Modified'))
+        # session, user, validators
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_note_modified(self):
+        """
+        Tests that a note detail ETag changes when the note is updated.
+        """
+        url = reverse('marknote:note-retrieve-update-destroy', args=[self.note.id])
+        etag = self.client.get(url)['ETag']
+        self.note.content = 'changed'
+        self.note.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_folder_modified(self):
+        """
+        Tests that a folder detail ETag changes when its children change.
+        """
+        url = reverse('marknote:folder-retrieve-update-destroy', args=[self.folder.id])
+        etag = self.client.get(url)['ETag']
+        self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        # delete child note
+        self.note.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_list_modified(self):
+        """
+        Tests that list ETags change with the listed rows and the query.
+        """
+        url = reverse('marknote:note-list-create')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(self.client.get(url + '?title=n', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        # create note
+        Note.objects.create(title='other', content='content', owner=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        # folder list
+        url = reverse('marknote:folder-list-create')
+        etag = self.client.get(url)['ETag']
+        self.folder.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_page_modified(self):
+        """
+        Tests that paginated list ETags change with the rows on the page and the first row of the next.
+        """
+        url = reverse('marknote:note-list-create') + '?limit=1'
+        Note.objects.create(title='z', content='content', owner=self.user)
+        etag = self.client.get(url)['ETag']
+        # session, user, page validators
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        # create a note on a later page
+        Note.objects.create(title='zz', content='content', owner=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        # update the first note of the next page
+        Note.objects.get(title='z').save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_not_found(self):
+        """
+        Tests that a missing note is still not found.
+        """
+        response = self.client.get(reverse('marknote:note-retrieve-update-destroy', args=[0]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,153 @@
+from django.contrib.auth.models import User
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient, APITransactionTestCase
+
+import asyncio
+import json
+
+from marknote.asgi import ASGIHandler
+from marknote.brokers import LocalBroker
+from marknote.changes import get_latest_change
+from marknote.models import Folder, Note
+
+
+def parse_events(data):
+    events = []
+    for block in data.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'data' in fields:
+            events.append((int(fields['id']), json.loads(fields['data'])))
+    return events
+
+
+class TestLocalBroker(APITransactionTestCase):
+    """
+    Test cases for the in process broker.
+    """
+    def test_notify(self):
+        """
+        Tests that only the subscriptions of an owner are woken until they are closed.
+        """
+        broker = LocalBroker()
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+        broker.publish({1})
+        self.assertTrue(subscription.wait(0))
+        self.assertFalse(subscription.wait(0.01))
+        self.assertFalse(other.wait(0))
+        subscription.close()
+        broker.publish({1})
+        self.assertFalse(subscription.wait(0))
+        self.assertEqual(dict(broker.subscriptions), {2: {other}})
+
+
+@override_settings(
+    ALLOWED_HOSTS=['testserver'],
+    MARKNOTE_EVENT_KEEPALIVE=0.05,
+    MARKNOTE_EVENT_STREAM_TIMEOUT=0.3,
+)
+class TestEventStream(APITransactionTestCase):
+    """
+    Test cases for EventStreamView, which reads committed changes.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        self.folder = Folder.objects.create(title='folder', owner=self.user)
+
+    def test_resume(self):
+        """
+        Tests that a stream resumes after the Last-Event-ID and ends after its timeout.
+        """
+        cursor = get_latest_change(self.user.id)
+        note = Note.objects.create(title='note', content='', owner=self.user, container=self.folder)
+        Note.objects.create(title='other', content='', owner=User.objects.create_user('other'))
+        response = self.client.get(reverse('marknote:events'), HTTP_LAST_EVENT_ID=str(cursor))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        data = b''.join(response.streaming_content).decode('utf-8')
+        self.assertTrue(data.startswith('retry: 3000\n\n'))
+        self.assertEqual(parse_events(data), [(cursor + 1, {
+            'sequence': cursor + 1, 'type': 'note', 'pk': note.pk, 'deleted': False,
+        })])
+        self.assertIn(': keepalive', data)
+
+    def test_live(self):
+        """
+        Tests that changes are pushed as they are committed and idle streams make no queries.
+        """
+        response = self.client.get(reverse('marknote:events'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stream = iter(response.streaming_content)
+        self.assertEqual(next(stream), b'retry: 3000\n\n')
+        self.assertEqual(next(stream), b'')
+        # idle
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(next(stream), b': keepalive\n\n')
+        self.assertEqual(len(captured), 0)
+        # update and delete
+        self.folder.title = 'renamed'
+        self.folder.save()
+        pk = self.folder.pk
+        self.folder.delete()
+        events = parse_events(next(stream).decode('utf-8'))
+        self.assertEqual([event['deleted'] for sequence, event in events], [True])
+        self.assertEqual(events[0][1]['pk'], pk)
+        response.close()
+
+    def test_asgi(self):
+        """
+        Tests that the ASGI handler sends the stream from the event loop.
+        """
+        token = Token.objects.create(user=self.user)
+        cursor = get_latest_change(self.user.id)
+        Note.objects.create(title='note', content='', owner=self.user)
+        application = ASGIHandler(WSGIHandler(), threads=1)
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': reverse('marknote:events'),
+            'query_string': 'last_event_id={}'.format(cursor).encode(),
+            'headers': [(b'host', b'testserver'), (b'authorization', 'Token {}'.format(token.key).encode())],
+        }
+        sent = []
+
+        async def receive():
+            if not sent:
+                return {'type': 'http.request', 'body': b''}
+            # the client stays connected
+            await asyncio.Event().wait()
+
+        async def send(message):
+            sent.append(message)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(application(scope, receive, send))
+        finally:
+            loop.close()
+            application.executor.shutdown()
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(sent[-1].get('more_body', False))
+        data = b''.join(message['body'] for message in sent[1:]).decode('utf-8')
+        self.assertEqual([event['type'] for sequence, event in parse_events(data)], ['note'])
+
+    def test_invalid(self):
+        """
+        Tests that streams require authentication and a numeric Last-Event-ID.
+        """
+        for last_event_id in ('abc', '999999999999999999999999'):
+            response = self.client.get(reverse('marknote:events'), HTTP_LAST_EVENT_ID=last_event_id)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = APIClient().get(reverse('marknote:events'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import json
+
+from marknote.models import Folder, Note
+
+
+class TestFolderExpansion(APITestCase):
+    """
+    Test cases for the depth, expand, and limit parameters on FolderRetrieveUpdateDestroyView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create folder root with children a and b, grandchildren a/c and a/d, and great grandchild a/c/e
+        self.root = Folder.objects.create(title='root', owner=self.user)
+        self.a = Folder.objects.create(title='a', owner=self.user, container=self.root)
+        self.b = Folder.objects.create(title='b', owner=self.user, container=self.root)
+        self.c = Folder.objects.create(title='c', owner=self.user, container=self.a)
+        self.d = Folder.objects.create(title='d', owner=self.user, container=self.a)
+        self.e = Folder.objects.create(title='e', owner=self.user, container=self.c)
+        # create notes 1 to 3 in a, 4 in root, and 5 in c
+        for title, container in (('1', self.a), ('2', self.a), ('3', self.a), ('4', self.root), ('5', self.c)):
+            Note.objects.create(title=title, content='content', owner=self.user, container=container)
+
+    def get(self, folder, query='', status_code=status.HTTP_200_OK):
+        response = self.client.get(reverse('marknote:folder-retrieve-update-destroy', args=[folder.id]) + query)
+        self.assertEqual(response.status_code, status_code)
+        return json.loads(response.content.decode('utf-8'))
+
+    def titles(self, items):
+        return [item['title'] for item in items]
+
+    def test_depth(self):
+        """
+        Tests that depth returns that many levels of nested children with one query per level and relation.
+        """
+        # request
+        with self.assertNumQueries(9):
+            body = self.get(self.root, '?depth=2')
+        # test response
+        self.assertEqual(self.titles(body['folders']), ['a', 'b'])
+        self.assertEqual(self.titles(body['notes']), ['4'])
+        self.assertEqual(self.titles(body['folders'][0]['folders']), ['c', 'd'])
+        self.assertEqual(self.titles(body['folders'][0]['notes']), ['1', '2', '3'])
+        self.assertEqual(body['folders'][1]['folders'], [])
+        self.assertFalse('folders' in body['folders'][0]['folders'][0])
+        self.assertFalse('content' in body['folders'][0]['notes'][0])
+        self.assertEqual(body['ancestors'], [])
+
+    def test_expand(self):
+        """
+        Tests that expand limits the relations that are returned.
+        """
+        # request
+        body = self.get(self.root, '?depth=3&expand=folders')
+        # test response
+        self.assertFalse('notes' in body)
+        self.assertFalse('notes' in body['folders'][0])
+        self.assertEqual(self.titles(body['folders'][0]['folders'][0]['folders']), ['e'])
+        # invalid
+        self.get(self.root, '?expand=files', status.HTTP_400_BAD_REQUEST)
+        self.get(self.root, '?depth=0', status.HTTP_400_BAD_REQUEST)
+        self.get(self.root, '?depth=100', status.HTTP_400_BAD_REQUEST)
+
+    def test_limit(self):
+        """
+        Tests that limit caps the children of every folder and that the cursors continue their lists.
+        """
+        # request
+        body = self.get(self.root, '?depth=2&limit=2')
+        # test response
+        self.assertEqual(self.titles(body['folders']), ['a', 'b'])
+        self.assertEqual(body['folders_next'], None)
+        self.assertEqual(self.titles(body['folders'][0]['notes']), ['1', '2'])
+        self.assertFalse(body['folders'][0]['notes_next'] is None)
+        self.assertEqual(body['folders'][1]['notes_next'], None)
+        # continue the notes of a
+        body = self.get(self.a, '?limit=2&notes_cursor=' + body['folders'][0]['notes_next'])
+        self.assertEqual(self.titles(body['notes']), ['3'])
+        self.assertEqual(body['notes_next'], None)
+
+    def test_etag(self):
+        """
+        Tests that the ETag of an expanded detail changes when a nested note changes.
+        """
+        # request
+        url = reverse('marknote:folder-retrieve-update-destroy', args=[self.root.id]) + '?depth=3'
+        etag = self.client.get(url)['ETag']
+        # update nested note
+        note = Note.objects.get(title='5')
+        note.content = 'changed'
+        note.save()
+        # test response
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
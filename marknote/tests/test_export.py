@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+from marknote.models import Folder, Note
+
+
+class TestExport(APITestCase):
+    """
+    Test cases for ExportView and the export command.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create folders a/b and notes in the root, a, and b, with two notes named alike in b
+        self.a = Folder.objects.create(title='a', owner=self.user)
+        self.b = Folder.objects.create(title='b/c', owner=self.user, container=self.a)
+        Note.objects.create(title='root', content='root content', owner=self.user)
+        Note.objects.create(title='in a', content='a content', owner=self.user, container=self.a)
+        Note.objects.create(title='same', content='first', owner=self.user, container=self.b)
+        Note.objects.create(title='Same', content='second', owner=self.user, container=self.b)
+        Note.objects.create(title='other', content='', owner=User.objects.create_user('other'))
+
+    def export(self, query=''):
+        response = self.client.get(reverse('marknote:export') + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_export_ndjson(self):
+        """
+        Tests that the NDJSON export lists folders before their children and then every note.
+        """
+        rows = [json.loads(line) for line in self.export().decode('utf-8').splitlines()]
+        self.assertEqual([row['type'] for row in rows], ['folder'] * 2 + ['note'] * 4)
+        self.assertEqual(rows[1]['container'], rows[0]['pk'])
+        self.assertEqual({row['content'] for row in rows[2:]}, {'root content', 'a content', 'first', 'second'})
+
+    def test_export_zip(self):
+        """
+        Tests that the zip export lays out markdown files by folder with unique names.
+        """
+        archive = zipfile.ZipFile(io.BytesIO(self.export('?type=zip')))
+        self.assertEqual(sorted(archive.namelist()), [
+            'a/', 'a/b_c/', 'a/b_c/Same.md', 'a/b_c/same (2).md', 'a/in a.md', 'root.md',
+        ])
+        self.assertEqual(archive.read('a/in a.md'), b'a content')
+
+    def test_export_invalid(self):
+        """
+        Tests that exports require authentication and a known format.
+        """
+        response = self.client.get(reverse('marknote:export') + '?type=pdf')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = APIClient().get(reverse('marknote:export'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_command(self):
+        """
+        Tests that the export command writes the export to a file.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'export.zip')
+            call_command('export_notes', self.username, format='zip', output=output)
+            self.assertEqual(len(zipfile.ZipFile(output).namelist()), 6)
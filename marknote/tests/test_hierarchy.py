@@ -0,0 +1,129 @@
+from django.contrib.auth.models import Permission, User
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import json
+
+from marknote.models import Folder, Note, get_prefix_bound, subtree_q
+
+
+class TestFolderHierarchy(APITestCase):
+    """
+    Test cases for the materialized path index on Folder.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        self.user.user_permissions.add(Permission.objects.get(codename='change_folder'))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create folder chain a/b/c and a sibling d
+        self.a = Folder.objects.create(title='a', owner=self.user)
+        self.b = Folder.objects.create(title='b', owner=self.user, container=self.a)
+        self.c = Folder.objects.create(title='c', owner=self.user, container=self.b)
+        self.d = Folder.objects.create(title='d', owner=self.user)
+
+    def get(self, view_name, args=None, query=''):
+        response = self.client.get(reverse(view_name, args=args) + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_path_created(self):
+        """
+        Tests that new folders get their path and depth.
+        """
+        self.assertEqual(self.a.path, '/{}/'.format(self.a.id))
+        self.assertEqual(Folder.objects.get(id=self.c.id).path, '/{}/{}/{}/'.format(self.a.id, self.b.id, self.c.id))
+        self.assertEqual(Folder.objects.get(id=self.c.id).depth, 2)
+
+    def test_path_moved(self):
+        """
+        Tests that moving a folder updates the paths of its subtree.
+        """
+        # move b under d
+        response = self.client.patch(
+            reverse('marknote:folder-retrieve-update-destroy', args=[self.b.id]),
+            {'container': self.d.id},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # test database
+        c = Folder.objects.get(id=self.c.id)
+        self.assertEqual(c.path, '/{}/{}/{}/'.format(self.d.id, self.b.id, self.c.id))
+        self.assertEqual(c.depth, 2)
+        # move b to the top level
+        self.b.container = None
+        self.b.save()
+        c = Folder.objects.get(id=self.c.id)
+        self.assertEqual(c.path, '/{}/{}/'.format(self.b.id, self.c.id))
+        self.assertEqual(c.depth, 1)
+
+    def test_move_into_descendant(self):
+        """
+        Tests that a folder cannot be moved into itself or its subtree.
+        """
+        for container in (self.a, self.c):
+            response = self.client.patch(
+                reverse('marknote:folder-retrieve-update-destroy', args=[self.a.id]),
+                {'container': container.id},
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Folder.objects.get(id=self.a.id).container, None)
+
+    def test_ancestors(self):
+        """
+        Tests that folder detail lists its ancestors from the top level down in a constant number of queries.
+        """
+        # session, user, two ETag validators, folder, ancestors, notes, folders
+        with self.assertNumQueries(8):
+            body = self.get('marknote:folder-retrieve-update-destroy', args=[self.c.id])
+        self.assertEqual(body['ancestors'], [{'pk': self.a.id, 'title': 'a'}, {'pk': self.b.id, 'title': 'b'}])
+        body = self.get('marknote:folder-retrieve-update-destroy', args=[self.a.id])
+        self.assertEqual(body['ancestors'], [])
+
+    def test_subtree_filter(self):
+        """
+        Tests that the list views filter to everything below a folder.
+        """
+        # create notes
+        note_b = Note.objects.create(title='b', content='content', owner=self.user, container=self.b)
+        note_c = Note.objects.create(title='c', content='content', owner=self.user, container=self.c)
+        Note.objects.create(title='d', content='content', owner=self.user, container=self.d)
+        Note.objects.create(title='top', content='content', owner=self.user)
+        # test response
+        body = self.get('marknote:folder-list-create', query='?subtree={}'.format(self.a.id))
+        self.assertEqual([folder['pk'] for folder in body['folders']], [self.b.id, self.c.id])
+        body = self.get('marknote:note-list-create', query='?subtree={}'.format(self.a.id))
+        self.assertEqual([note['pk'] for note in body['notes']], [note_b.id, note_c.id])
+        for subtree in ('0', 'abc', '999999999999999999999999'):
+            body = self.get('marknote:note-list-create', query='?subtree={}'.format(subtree))
+            self.assertEqual(body['notes'], [])
+
+    def test_subtree_q(self):
+        """
+        Tests that the subtree filter matches paths by prefix whatever the ids sort next to.
+        """
+        Folder.objects.filter(pk=self.d.pk).update(path='{}0/'.format(self.a.path[:-1]))
+        self.assertEqual(
+            set(Folder.objects.filter(subtree_q(self.a.path)).values_list('pk', flat=True)),
+            {self.a.id, self.b.id, self.c.id},
+        )
+        self.assertEqual(get_prefix_bound('/1/5/'), '/1/50')
+        self.assertEqual(get_prefix_bound('a\U0010ffff'), 'b')
+        self.assertEqual(get_prefix_bound('\ud7ff'), '\ue000')
+        self.assertIsNone(get_prefix_bound(''))
+
+    def test_subtree_filter_not_owned(self):
+        """
+        Tests that the subtree filter does not match folders that are not owned.
+        """
+        # create folder for another user
+        other = User.objects.create_user(username='other_user')
+        folder = Folder.objects.create(title='other', owner=other)
+        Folder.objects.create(title='other', owner=other, container=folder)
+        # test response
+        body = self.get('marknote:folder-list-create', query='?subtree={}'.format(folder.id))
+        self.assertEqual(body['folders'], [])
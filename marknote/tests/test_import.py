@@ -0,0 +1,195 @@
+from django.contrib.auth.models import Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+
+import io
+import json
+import os
+import tarfile
+import tempfile
+import zipfile
+
+from marknote import search
+from marknote.export import iter_export
+from marknote.importer import Importer
+from marknote.models import Folder, Note
+
+
+class TestImport(APITestCase):
+    """
+    Test cases for ImportView and the import command.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        for codename in ('add_note', 'add_folder'):
+            self.user.user_permissions.add(Permission.objects.get(codename=codename))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+
+    def post(self, name, data, client=None, **extra):
+        return (client or self.client).post(
+            reverse('marknote:import'),
+            dict(file=SimpleUploadedFile(name, data), **extra),
+            format='multipart',
+        )
+
+    def get_notes(self):
+        response = self.client.get(reverse('marknote:note-list-create'))
+        return json.loads(response.content.decode('utf-8'))['notes']
+
+    def test_import_ndjson(self):
+        """
+        Tests that an NDJSON export is imported with its folder hierarchy and invalid lines are reported.
+        """
+        # export from another user
+        other = User.objects.create_user('other')
+        a = Folder.objects.create(title='a', owner=other)
+        b = Folder.objects.create(title='b', owner=other, container=a)
+        Note.objects.create(title='in b', content='# b content', owner=other, container=b)
+        Note.objects.create(title='root', content='root content', owner=other)
+        data = b''.join(iter_export(other.pk)) + b'not json\n{"type": "note", "title": ""}\n'
+        # import
+        response = self.post('export.ndjson', data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['folders'], 2)
+        self.assertEqual(response.data['notes'], 2)
+        self.assertEqual(response.data['error_count'], 2)
+        self.assertEqual([error['source'] for error in response.data['errors']], ['line 5', 'line 6'])
+        self.assertIn('notes_per_second', response.data)
+        # hierarchy, summaries, and search index
+        note = Note.objects.get(owner=self.user, title='in b')
+        self.assertEqual(note.container.container.title, 'a')
+        self.assertEqual(note.container.path, note.container.container.path + str(note.container.pk) + '/')
+        self.assertEqual(note.content, '# b content')
+        self.assertEqual(note.content_length, len('# b content'))
+        qs = search.get_backend().filter(Note.objects.filter(owner=self.user), content='b content')
+        self.assertEqual(list(qs), [note])
+        # revisions
+        self.assertEqual(note.revisions.count(), 1)
+
+    def test_import_zip(self):
+        """
+        Tests that a zip of markdown files is imported as folders and notes, skipping other files.
+        """
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, 'w') as archive:
+            archive.writestr('vault/', b'')
+            archive.writestr('vault/empty/', b'')
+            archive.writestr('vault/day/one.md', b'first')
+            archive.writestr('vault/day/two.markdown', b'second')
+            archive.writestr('vault/image.png', b'\x89PNG')
+            archive.writestr('vault/.obsidian/config.md', b'{}')
+            archive.writestr('vault/bad.md', b'\xff\xfe')
+        response = self.post('vault.zip', data.getvalue())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['folders'], response.data['notes'], response.data['skipped']), (3, 2, 2))
+        self.assertEqual(response.data['errors'], [{'source': 'vault/bad.md', 'error': 'Not UTF-8.'}])
+        self.assertEqual(sorted(Folder.objects.values_list('title', flat=True)), ['day', 'empty', 'vault'])
+        self.assertEqual(Note.objects.get(title='two').container.container.title, 'vault')
+
+    @override_settings(MARKNOTE_IMPORT_MAX_FILE_SIZE=10)
+    def test_import_zip_errors(self):
+        """
+        Tests that encrypted and oversized members are reported and the other members imported.
+        """
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, 'w') as archive:
+            archive.writestr('a.md', b'a')
+            archive.writestr('encrypted.md', b'secret')
+            archive.writestr('large.md', b'x' * 11)
+            archive.writestr('b.md', b'b')
+        data = bytearray(data.getvalue())
+        # flag the member as encrypted in its local and central directory headers
+        for signature, flags_offset, name_offset in ((b'PK\x03\x04', 6, 30), (b'PK\x01\x02', 8, 46)):
+            start = data.find(signature)
+            while start != -1:
+                if data[start + name_offset:].startswith(b'encrypted.md'):
+                    data[start + flags_offset] |= 0x1
+                start = data.find(signature, start + 1)
+        response = self.post('notes.zip', bytes(data))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['notes'], 2)
+        self.assertEqual([error['source'] for error in response.data['errors']], ['encrypted.md', 'large.md'])
+        self.assertTrue(response.data['errors'][0]['error'].startswith('Could not be read:'))
+
+    def test_import_tar(self):
+        """
+        Tests that a compressed tarball is read as a stream.
+        """
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode='w:gz') as archive:
+            for name, content in (('notes/a.md', b'a'), ('notes/b.md', b'b'), ('c.md', b'c')):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                archive.addfile(info, io.BytesIO(content))
+        response = self.post('notes.tar.gz', data.getvalue())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['folders'], response.data['notes']), (1, 3))
+        self.assertEqual(Note.objects.filter(container__title='notes').count(), 2)
+
+    def test_import_batches(self):
+        """
+        Tests that notes are inserted in batches and every batch is indexed.
+        """
+        lines = [
+            json.dumps({'type': 'note', 'title': 'note {}'.format(i), 'content': 'word{}'.format(i)}) for i in range(25)
+        ]
+        report = Importer(self.user, batch_size=10).run(io.BytesIO('\n'.join(lines).encode('utf-8')), 'ndjson')
+        self.assertEqual(report['notes'], 25)
+        pks = list(Note.objects.order_by('pk').values_list('pk', flat=True))
+        for i in (0, 12, 24):
+            qs = search.get_backend().filter(Note.objects.all(), content='word{}'.format(i))
+            self.assertEqual(list(qs.values_list('pk', flat=True)), [pks[i]])
+
+    @override_settings(MARKNOTE_RESPONSE_CACHE_ENABLED=True)
+    def test_import_invalidates_cache(self):
+        """
+        Tests that cached note lists include imported notes.
+        """
+        self.assertEqual(self.get_notes(), [])
+        self.post('a.ndjson', b'{"type": "note", "title": "a", "content": "a"}\n')
+        self.assertEqual([note['title'] for note in self.get_notes()], ['a'])
+
+    def test_import_invalid(self):
+        """
+        Tests that imports require the add permissions, a file, and a known type.
+        """
+        response = self.post('a.pdf', b'')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('marknote:import'), {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # bad pks
+        response = self.post('a.ndjson', b'{"type": "note", "title": "a", "container": [1]}\n{"type": "folder", '
+                                         b'"title": "b", "pk": {}}\n{"type": "note", "title": "c", "pk": true}\n')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([error['source'] for error in response.data['errors']], ['line 1', 'line 2', 'line 3'])
+        self.assertFalse(Note.objects.filter(title__in=['a', 'c']).exists())
+        # bad archive
+        response = self.post('a.zip', b'not a zip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['errors'][0]['source'], 'archive')
+        # no permissions
+        User.objects.create_user(username='other', password='other')
+        client = APIClient()
+        client.login(username='other', password='other')
+        response = self.post('a.ndjson', b'', client=client)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_import_command(self):
+        """
+        Tests that the import command imports a file by its extension.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'notes.ndjson')
+            with open(path, 'w') as file:
+                file.write('{"type": "folder", "pk": 1, "title": "a"}\n{"type": "note", "title": "b", "container": 1}\n')
+            call_command('import_notes', self.username, path, stdout=io.StringIO())
+        self.assertEqual(Note.objects.get(title='b').container.title, 'a')
@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+import unittest
+
+from marknote.management.commands.explain_list_queries import get_list_queries
+from marknote.models import Folder
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', 'Query plans are checked on SQLite.')
+class TestListQueryPlans(TestCase):
+    """
+    Test cases for the composite owner indexes.
+    """
+    def test_list_index_order(self):
+        """
+        Tests that the list queries read in index order instead of sorting after the scan.
+        """
+        user = User.objects.create_user(username='test')
+        Folder.objects.create(title='folder', owner=user)
+        for name, qs in get_list_queries(user.pk).items():
+            plan = qs.explain()
+            self.assertNotIn('TEMP B-TREE', plan, name)
+            self.assertIn('owner', plan.split('USING INDEX ')[1], name)
@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth.models import Permission, User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import re
+
+from marknote.models import Folder, Note
+
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + ['marknote.instrumentation.InstrumentationMiddleware'])
+class TestInstrumentation(APITestCase):
+    """
+    Test cases for InstrumentationMiddleware.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        self.user.user_permissions.add(Permission.objects.get(codename='view_folder'))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+
+    def get_timings(self, response):
+        return dict(re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing']))
+
+    def test_server_timing(self):
+        """
+        Tests that the query count and timings are sent in the Server-Timing header and logged.
+        """
+        # create folder with a note
+        folder = Folder.objects.create(title='title', owner=self.user)
+        Note.objects.create(title='title', content='content', owner=self.user, container=folder)
+        # request
+        with self.assertLogs('marknote.instrumentation', 'INFO') as logs:
+            response = self.client.get(reverse('marknote:folder-retrieve-update-destroy', args=[folder.id]))
+        # test response
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(self.get_timings(response)), {'db', 'serialize', 'render', 'total'})
+        self.assertGreater(float(self.get_timings(response)['serialize']), 0)
+        self.assertNotIn('budget', response['Server-Timing'])
+        queries = int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1))
+        self.assertGreater(queries, 0)
+        # test log
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(logs.records[0].marknote['queries'], queries)
+        self.assertEqual(logs.records[0].marknote['status'], 200)
+
+    @override_settings(MARKNOTE_QUERY_BUDGET=1)
+    def test_over_budget(self):
+        """
+        Tests that requests over the query budget are flagged.
+        """
+        # request
+        with self.assertLogs('marknote.instrumentation', 'INFO') as logs:
+            response = self.client.get(reverse('marknote:folder-list-create'))
+        # test response
+        self.assertIn('budget;desc="queries"', response['Server-Timing'])
+        # test log
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertIn('over_budget=queries', logs.output[0])
+
+    @override_settings(MARKNOTE_RESPONSE_CACHE_ENABLED=True)
+    def test_response_cache(self):
+        """
+        Tests that response cache misses and hits are sent and logged.
+        """
+        cache.clear()
+        for result in ('miss', 'hit'):
+            with self.assertLogs('marknote.instrumentation', 'INFO') as logs:
+                response = self.client.get(reverse('marknote:folder-list-create'))
+            self.assertIn('cache;desc="{}"'.format(result), response['Server-Timing'])
+            self.assertEqual(logs.records[0].marknote['response_cache'], result)
+        cache.clear()
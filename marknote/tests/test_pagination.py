@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.test import override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import json
+
+from marknote.models import Folder, Note
+
+
+class TestKeysetPagination(APITestCase):
+    """
+    Test cases for cursor pagination on NoteListCreateView and FolderListCreateView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+
+    def get(self, view_name, query=''):
+        response = self.client.get(reverse(view_name) + query)
+        return response, json.loads(response.content.decode('utf-8'))
+
+    def walk(self, view_name, key, limit):
+        pks = []
+        cursor = ''
+        while True:
+            response, body = self.get(view_name, '?limit={}&cursor={}'.format(limit, cursor))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(body[key]), limit)
+            pks.extend(item['pk'] for item in body[key])
+            if body['next'] is None:
+                return pks
+            cursor = body['next']
+
+    def test_note_pages(self):
+        """
+        Tests that walking the note pages returns every note once in the default ordering.
+        """
+        # create notes, including duplicate titles
+        for title in ['c', 'a', 'b', 'a', 'c', 'a', 'd']:
+            Note(title=title, content='content', owner=self.user).save()
+        # test response
+        expected = list(Note.objects.order_by('title', '-updated', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('marknote:note-list-create', 'notes', 2), expected)
+
+    def test_folder_pages(self):
+        """
+        Tests that walking the folder pages returns every folder once in the default ordering.
+        """
+        # create folders
+        for title in ['b', 'a', 'b', 'c']:
+            Folder(title=title, owner=self.user).save()
+        # test response
+        expected = list(Folder.objects.order_by('title', '-updated', 'pk').values_list('pk', flat=True))
+        self.assertEqual(self.walk('marknote:folder-list-create', 'folders', 3), expected)
+
+    def test_not_paginated_by_default(self):
+        """
+        Tests that lists are not paginated unless requested.
+        """
+        # create note
+        Note(title='title', content='content', owner=self.user).save()
+        # test response
+        response, body = self.get('marknote:note-list-create')
+        self.assertEqual(len(body['notes']), 1)
+        self.assertFalse('next' in body)
+
+    @override_settings(MARKNOTE_PAGE_SIZE=1, MARKNOTE_MAX_PAGE_SIZE=2)
+    def test_page_size_settings(self):
+        """
+        Tests that the page size settings apply the default and maximum limits.
+        """
+        # create notes
+        for title in ['a', 'b', 'c']:
+            Note(title=title, content='content', owner=self.user).save()
+        # test response
+        response, body = self.get('marknote:note-list-create')
+        self.assertEqual(len(body['notes']), 1)
+        self.assertIsNotNone(body['next'])
+        response, body = self.get('marknote:note-list-create', '?limit=50')
+        self.assertEqual(len(body['notes']), 2)
+
+    def test_invalid_cursor(self):
+        """
+        Tests that an invalid cursor is rejected.
+        """
+        response, body = self.get('marknote:note-list-create', '?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import Permission, User
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import json
+
+from marknote.models import Note, get_content_hash
+
+
+class TestNotePatch(APITestCase):
+    """
+    Test cases for content patches on NoteRetrieveUpdateDestroyView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        self.user.user_permissions.add(Permission.objects.get(codename='change_note'))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create note
+        self.note = Note.objects.create(title='title', content='line one\nline two\nline three', owner=self.user)
+
+    def patch(self, data):
+        response = self.client.patch(
+            reverse('marknote:note-retrieve-update-destroy', args=[self.note.id]), data, format='json',
+        )
+        return response, json.loads(response.content.decode('utf-8'))
+
+    def test_patch(self):
+        """
+        Tests that the operations are applied to the content against its base.
+        """
+        # request
+        response, body = self.patch({'content_patch': {'base': self.note.content_hash, 'operations': [
+            {'offset': 5, 'delete': 3, 'insert': '1'},
+            {'offset': 14, 'delete': 3, 'insert': '2'},
+            {'offset': 28, 'insert': '!'},
+        ]}})
+        # test response
+        content = 'line 1\nline 2\nline three!'
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(body['content'], content)
+        self.assertEqual(body['content_hash'], get_content_hash(content))
+        self.assertFalse('content_patch' in body)
+        # test database
+        note = Note.objects.get(id=self.note.id)
+        self.assertEqual(note.content, content)
+        self.assertEqual(note.content_length, len(content))
+
+    def test_patch_stale(self):
+        """
+        Tests that a patch against a stale base is rejected with a conflict.
+        """
+        # request
+        response, body = self.patch({'title': 'new', 'content_patch': {'base': get_content_hash('old'), 'operations': [
+            {'offset': 0, 'insert': 'x'},
+        ]}})
+        # test response
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(body['content_hash'], self.note.content_hash)
+        # test database
+        self.assertEqual(Note.objects.get(id=self.note.id).title, 'title')
+
+    def test_patch_invalid(self):
+        """
+        Tests that overlapping, out of range, or mixed patches are rejected.
+        """
+        base = self.note.content_hash
+        for data in (
+            {'content_patch': {'base': base, 'operations': [{'offset': 4, 'delete': 3}, {'offset': 5}]}},
+            {'content_patch': {'base': base, 'operations': [{'offset': 100, 'insert': 'x'}]}},
+            {'content_patch': {'base': base, 'operations': [{'offset': -1}]}},
+            {'content': 'new', 'content_patch': {'base': base, 'operations': []}},
+        ):
+            response, body = self.patch(data)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+        self.assertEqual(Note.objects.get(id=self.note.id).content, self.note.content)
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import AnonymousUser, Group, Permission, User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from marknote import permissions
+
+
+class TestCachedDjangoModelPermissions(APITestCase):
+    """
+    Test cases for CachedDjangoModelPermissions.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        self.permission = Permission.objects.get(codename='add_folder')
+        self.user.user_permissions.add(self.permission)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        permissions.reset()
+
+    def tearDown(self):
+        permissions.reset()
+
+    def create_folder(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('marknote:folder-list-create'), {'title': 'title'})
+        return response.status_code, [query for query in captured if 'auth_permission' in query['sql']]
+
+    def test_cache_hit(self):
+        """
+        Tests that the user's permissions are only loaded on the first request.
+        """
+        status_code, queries = self.create_folder()
+        self.assertEqual(status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(queries), 2)
+        status_code, queries = self.create_folder()
+        self.assertEqual(status_code, status.HTTP_201_CREATED)
+        self.assertEqual(queries, [])
+        stats = permissions.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_user_permissions_changed(self):
+        """
+        Tests that removing a permission from the user, from either side, is seen by the next request.
+        """
+        self.create_folder()
+        self.user.user_permissions.remove(self.permission)
+        self.assertEqual(self.create_folder()[0], status.HTTP_403_FORBIDDEN)
+        self.permission.user_set.add(self.user)
+        self.assertEqual(self.create_folder()[0], status.HTTP_201_CREATED)
+        self.permission.user_set.clear()
+        self.assertEqual(self.create_folder()[0], status.HTTP_403_FORBIDDEN)
+
+    def test_groups_changed(self):
+        """
+        Tests that changes to the user's groups and their permissions are seen by the next request.
+        """
+        self.user.user_permissions.clear()
+        group = Group.objects.create(name='writers')
+        group.permissions.add(self.permission)
+        self.assertEqual(self.create_folder()[0], status.HTTP_403_FORBIDDEN)
+        self.user.groups.add(group)
+        self.assertEqual(self.create_folder()[0], status.HTTP_201_CREATED)
+        group.permissions.remove(self.permission)
+        self.assertEqual(self.create_folder()[0], status.HTTP_403_FORBIDDEN)
+        group.permissions.add(self.permission)
+        self.assertEqual(self.create_folder()[0], status.HTTP_201_CREATED)
+        group.delete()
+        self.assertEqual(self.create_folder()[0], status.HTTP_403_FORBIDDEN)
+
+    def test_has_perms(self):
+        """
+        Tests that superusers have every permission, and inactive and anonymous users none.
+        """
+        superuser = User.objects.create_superuser(username='admin', password='admin', email='')
+        self.assertTrue(permissions.has_perms(superuser, ['marknote.delete_note']))
+        self.assertTrue(permissions.has_perms(self.user, ['marknote.add_folder']))
+        self.assertFalse(permissions.has_perms(self.user, ['marknote.add_folder', 'marknote.add_note']))
+        self.user.is_active = False
+        self.assertFalse(permissions.has_perms(self.user, ['marknote.add_folder']))
+        self.assertFalse(permissions.has_perms(AnonymousUser(), ['marknote.add_folder']))
+        self.assertTrue(permissions.has_perms(AnonymousUser(), []))
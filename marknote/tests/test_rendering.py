@@ -0,0 +1,165 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import io
+import unittest
+
+from marknote import rendering
+from marknote.models import Note
+
+
+renders = []
+
+
+def counting_renderer(content):
+    renders.append(content)
+    return '<p>{}</p>'.format(content)
+
+
+class TestRenderBasic(TestCase):
+    """
+    Test cases for the built in markdown renderer.
+    """
+    def test_blocks(self):
+        """
+        Tests that headings, paragraphs, lists, quotes, rules, and fenced code are rendered.
+        """
+        content = '# Title\n\nsome\ntext\n\n- a\n- b\n\n1. one\n\n> quoted\n\n---\n\n```\n<b>code</b>\n```'
+        self.assertEqual(rendering.render_basic(content), '\n'.join([
+            '<h1>Title</h1>',
+            '<p>some\ntext</p>',
+            '<ul>\n<li>a</li>\n<li>b</li>\n</ul>',
+            '<ol>\n<li>one</li>\n</ol>',
+            '<blockquote>\n<p>quoted</p>\n</blockquote>',
+            '<hr>',
+            '<pre><code>&lt;b&gt;code&lt;/b&gt;\n</code></pre>',
+        ]))
+
+    def test_inline(self):
+        """
+        Tests that emphasis, code spans, and links are rendered and raw HTML and unsafe links are escaped.
+        """
+        self.assertEqual(
+            rendering.render_inline('**bold** *em* `a*b*` [link](http://a.com?a=1&b=2) <script>'),
+            '<strong>bold</strong> <em>em</em> <code>a*b*</code> <a href="http://a.com?a=1&amp;b=2">link</a> '
+            '&lt;script&gt;',
+        )
+        self.assertEqual(rendering.render_inline('[x](javascript:alert(1))'), 'x)')
+
+
+@unittest.skipIf(rendering.markdown is None, 'The markdown package is not installed.')
+class TestRenderMarkdown(TestCase):
+    """
+    Test cases for rendering with the markdown package.
+    """
+    def test_escaped(self):
+        """
+        Tests that raw HTML is escaped and unsafe links are dropped like the built in renderer does.
+        """
+        self.assertEqual(
+            rendering.render_markdown('<script>alert(1)</script>\n\n<b>x</b> [x](javascript:alert(1)) [y](/y)'),
+            '<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>\n<p>&lt;b&gt;x&lt;/b&gt; <a>x</a> <a href="/y">y</a></p>',
+        )
+
+
+@override_settings(MARKNOTE_RENDERER='marknote.tests.test_rendering.counting_renderer')
+class TestRenderedNote(APITestCase):
+    """
+    Test cases for rendered notes and the render cache.
+    """
+    def setUp(self):
+        rendering.reset()
+        renders.clear()
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create notes with the same content
+        self.note = Note.objects.create(title='a', content='same', owner=self.user)
+        self.other = Note.objects.create(title='b', content='same', owner=self.user)
+
+    def get(self, note, query='?render=html'):
+        return self.client.get(reverse('marknote:note-retrieve-update-destroy', args=[note.pk]) + query)
+
+    def test_rendered(self):
+        """
+        Tests that the rendered field is only included when requested.
+        """
+        self.assertNotIn('rendered', self.get(self.note, '').data)
+        response = self.get(self.note)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rendered'], '<p>same</p>')
+        self.assertEqual(response.data['content'], 'same')
+
+    def test_render_cache(self):
+        """
+        Tests that content with the same hash is rendered once and changed content is rendered again.
+        """
+        self.get(self.note)
+        self.get(self.other)
+        self.get(self.note)
+        self.assertEqual(renders, ['same'])
+        self.assertEqual(rendering.get_stats(), {'hits': 2, 'misses': 1, 'renders': 1, 'size': 1})
+        # update
+        self.note.content = 'changed'
+        self.note.save()
+        self.assertEqual(self.get(self.note).data['rendered'], '<p>changed</p>')
+        self.assertEqual(renders, ['same', 'changed'])
+
+    @override_settings(MARKNOTE_RENDER_CACHE_SIZE=1)
+    def test_render_cache_eviction(self):
+        """
+        Tests that the least recently used render is evicted.
+        """
+        Note.objects.filter(pk=self.other.pk).update(content='other', content_hash='other')
+        self.get(self.note)
+        self.get(self.other)
+        self.get(self.note)
+        self.assertEqual(renders, ['same', 'other', 'same'])
+        self.assertEqual(rendering.get_stats()['size'], 1)
+
+    def test_rendered_etag(self):
+        """
+        Tests that rendered and raw responses have different ETags.
+        """
+        self.assertNotEqual(self.get(self.note, '')['ETag'], self.get(self.note)['ETag'])
+
+    def test_render_invalid(self):
+        """
+        Tests that an unknown render format is rejected.
+        """
+        self.assertEqual(self.get(self.note, '?render=pdf').status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(
+        MARKNOTE_RENDER_CACHE_ALIAS='marknote-render',
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'marknote-render': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'render'},
+        },
+    )
+    def test_prerender_command(self):
+        """
+        Tests that the prerender command fills the shared cache once, which requests then read.
+        """
+        caches['marknote-render'].clear()
+        stdout = io.StringIO()
+        call_command('prerender_notes', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), 'Rendered 1 of 2 notes.')
+        call_command('prerender_notes', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip().splitlines()[-1], 'Rendered 0 of 2 notes.')
+        self.get(self.note)
+        self.assertEqual(renders, ['same'])
+
+    def test_prerender_command_requires_cache(self):
+        """
+        Tests that the prerender command requires a shared cache.
+        """
+        with self.assertRaises(CommandError):
+            call_command('prerender_notes')
@@ -0,0 +1,125 @@
+from django.contrib.auth.models import Permission, User
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import json
+from unittest import mock
+
+from marknote import response_cache
+from marknote.models import Folder, Note
+
+
+@override_settings(
+    MARKNOTE_RESPONSE_CACHE_ENABLED=True,
+    MARKNOTE_RESPONSE_CACHE_ALIAS='marknote-test',
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'marknote-test': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'marknote-test'},
+    },
+)
+class TestResponseCache(APITestCase):
+    """
+    Test cases for the response cache on the folder and list views.
+    """
+    def setUp(self):
+        caches['marknote-test'].clear()
+        response_cache.reset_stats()
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        self.user.user_permissions.add(Permission.objects.get(codename='change_note'))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create folders with a note
+        self.folder = Folder.objects.create(title='folder', owner=self.user)
+        self.other_folder = Folder.objects.create(title='other', owner=self.user)
+        self.note = Note.objects.create(title='note', content='content', owner=self.user, container=self.folder)
+
+    def get(self, view_name, args=None):
+        response = self.client.get(reverse(view_name, args=args))
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_cache_hit(self):
+        """
+        Tests that a repeated folder request is served from the cache.
+        """
+        body = self.get('marknote:folder-retrieve-update-destroy', args=[self.folder.id])
+        self.assertEqual(response_cache.get_stats()['misses'], 1)
+        # session, user, ETag validators
+        with self.assertNumQueries(4):
+            cached = self.get('marknote:folder-retrieve-update-destroy', args=[self.folder.id])
+        self.assertEqual(cached, body)
+        self.assertEqual(response_cache.get_stats()['hits'], 1)
+
+    def test_note_invalidates_folders(self):
+        """
+        Tests that moving a note invalidates the folder it left and the folder it joined.
+        """
+        self.get('marknote:folder-retrieve-update-destroy', args=[self.folder.id])
+        self.get('marknote:folder-retrieve-update-destroy', args=[self.other_folder.id])
+        self.get('marknote:note-list-create')
+        # move note through the API
+        self.client.patch(
+            reverse('marknote:note-retrieve-update-destroy', args=[self.note.id]),
+            {'container': self.other_folder.id},
+        )
+        body = self.get('marknote:folder-retrieve-update-destroy', args=[self.folder.id])
+        self.assertEqual(body['notes'], [])
+        body = self.get('marknote:folder-retrieve-update-destroy', args=[self.other_folder.id])
+        self.assertEqual(body['notes'][0]['pk'], self.note.id)
+        body = self.get('marknote:note-list-create')
+        self.assertEqual(body['notes'][0]['container'], self.other_folder.id)
+        self.assertEqual(response_cache.get_stats()['hits'], 0)
+
+    def test_folder_invalidates_lists(self):
+        """
+        Tests that changing a folder invalidates the folder list and tree.
+        """
+        self.get('marknote:folder-list-create')
+        self.get('marknote:folder-tree')
+        self.folder.title = 'renamed'
+        self.folder.save()
+        # lists are unordered
+        body = self.get('marknote:folder-list-create')
+        self.assertIn('renamed', [folder['title'] for folder in body['folders']])
+        body = self.get('marknote:folder-tree')
+        self.assertIn('renamed', [folder['title'] for folder in body['folders']])
+        self.assertEqual(response_cache.get_stats()['hits'], 0)
+
+    def test_cache_per_owner(self):
+        """
+        Tests that cached responses are not shared between owners.
+        """
+        self.get('marknote:note-list-create')
+        User.objects.create_user(username='other_user', password='other_user')
+        self.client.login(username='other_user', password='other_user')
+        body = self.get('marknote:note-list-create')
+        self.assertEqual(body['notes'], [])
+
+    @override_settings(MARKNOTE_RESPONSE_CACHE_ENABLED=False)
+    def test_cache_disabled(self):
+        """
+        Tests that nothing is cached when the cache is disabled.
+        """
+        response_cache.reset_stats()
+        self.note.save()
+        self.get('marknote:note-list-create')
+        self.get('marknote:note-list-create')
+        self.assertEqual(response_cache.get_stats(), {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def test_invalidated_on_commit(self):
+        """
+        Tests that a change starts another generation once its transaction commits.
+        """
+        with mock.patch.object(response_cache.transaction, 'on_commit') as on_commit:
+            self.note.save()
+        generation = response_cache.get_generations([('notes', self.user.id)])
+        # a request caching the rows from before the commit
+        self.get('marknote:note-list-create')
+        for args, kwargs in on_commit.call_args_list:
+            if args[0].__module__ == response_cache.__name__:
+                args[0]()
+        self.assertNotEqual(response_cache.get_generations([('notes', self.user.id)]), generation)
@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import io
+import json
+import time
+
+from marknote.models import Note, NoteRevision
+from marknote.revisions import compact_revisions, get_revision_content, make_operations
+from marknote.patch import apply_operations
+
+
+@override_settings(MARKNOTE_REVISION_SNAPSHOT_INTERVAL=3)
+class TestNoteRevisions(APITestCase):
+    """
+    Test cases for note revisions and their views.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        self.user.user_permissions.add(Permission.objects.get(codename='change_note'))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create note with five versions
+        self.versions = ['one\ntwo\n', 'one\n2\n', 'zero\none\n2\n', 'zero\none\n2\nthree', 'one\nthree']
+        self.note = Note.objects.create(title='title', content=self.versions[0], owner=self.user)
+        for content in self.versions[1:]:
+            self.note = Note.objects.get(id=self.note.id)
+            self.note.content = content
+            self.note.save()
+
+    def get(self, view_name, args, status_code=status.HTTP_200_OK):
+        response = self.client.get(reverse(view_name, args=args))
+        self.assertEqual(response.status_code, status_code)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_make_operations(self):
+        """
+        Tests that the operations between two texts reproduce the second.
+        """
+        for old, new in (('', 'abc'), ('abc', ''), ('a\nb\nc\n', 'a\nx\nc\n'), ('same', 'same'), ('ab', 'aXb')):
+            self.assertEqual(apply_operations(old, make_operations(old, new)), new)
+
+    def test_revisions(self):
+        """
+        Tests that every version is recorded as deltas between periodic snapshots.
+        """
+        revisions = list(NoteRevision.objects.filter(note=self.note).order_by('number'))
+        self.assertEqual([revision.number for revision in revisions], [1, 2, 3, 4, 5])
+        self.assertEqual([revision.is_snapshot for revision in revisions], [True, False, False, True, False])
+        self.assertEqual([get_revision_content(revision) for revision in revisions], self.versions)
+        # saving without changes records nothing
+        self.note.save()
+        self.assertEqual(NoteRevision.objects.filter(note=self.note).count(), 5)
+
+    def test_large_rewrite(self):
+        """
+        Tests that rewriting every paragraph of a large note is stored as a snapshot without diffing it.
+        """
+        self.note.content = ''.join('paragraph {}\n\n'.format(index) for index in range(5000))
+        self.note.save()
+        self.note = Note.objects.get(id=self.note.id)
+        self.note.content = ''.join('rewritten {}\n\n'.format(index) for index in range(5000))
+        start = time.monotonic()
+        self.note.save()
+        self.assertLess(time.monotonic() - start, 2)
+        revision = NoteRevision.objects.filter(note=self.note).latest('number')
+        self.assertTrue(revision.is_snapshot)
+        self.assertEqual(get_revision_content(revision), self.note.content)
+        self.assertIsNone(make_operations('a\nb\n' * 500, 'c\nd\n' * 500))
+
+    def test_revision_views(self):
+        """
+        Tests that revisions are listed and fetched for the note's owner only.
+        """
+        # list
+        body = self.get('marknote:note-revision-list', [self.note.id])
+        self.assertEqual([revision['number'] for revision in body['revisions']], [5, 4, 3, 2, 1])
+        self.assertFalse('content' in body['revisions'][0])
+        # retrieve
+        body = self.get('marknote:note-revision-retrieve', [self.note.id, 3])
+        self.assertEqual(body['content'], self.versions[2])
+        # other user
+        other = Note.objects.create(title='other', content='', owner=User.objects.create_user('other'))
+        self.get('marknote:note-revision-list', [other.id], status.HTTP_404_NOT_FOUND)
+        self.get('marknote:note-revision-retrieve', [other.id, 1], status.HTTP_404_NOT_FOUND)
+
+    def test_restore(self):
+        """
+        Tests that restoring a revision sets the note's content and records a new revision.
+        """
+        # request
+        response = self.client.post(reverse('marknote:note-revision-restore', args=[self.note.id, 2]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content.decode('utf-8'))['content'], self.versions[1])
+        # test database
+        self.assertEqual(Note.objects.get(id=self.note.id).content, self.versions[1])
+        self.assertEqual(NoteRevision.objects.filter(note=self.note).count(), 6)
+
+    def test_compact(self):
+        """
+        Tests that compaction keeps the latest revisions readable.
+        """
+        # compact
+        self.assertEqual(compact_revisions(keep=2), 3)
+        revisions = list(NoteRevision.objects.filter(note=self.note).order_by('number'))
+        self.assertEqual([revision.number for revision in revisions], [4, 5])
+        self.assertEqual([get_revision_content(revision) for revision in revisions], self.versions[3:])
+        # compact everything older than a day, which keeps the latest
+        NoteRevision.objects.update(created=timezone.now() - timedelta(days=2))
+        call_command('compact_revisions', days=1, stdout=io.StringIO())
+        revision = NoteRevision.objects.get(note=self.note)
+        self.assertEqual((revision.number, revision.is_snapshot), (5, True))
+        self.assertEqual(get_revision_content(revision), self.versions[4])
@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import io
+import json
+
+from marknote import search
+from marknote.models import Note
+
+
+class TestNoteSearch(APITestCase):
+    """
+    Test cases for the full text search on NoteListCreateView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # view name
+        self.view_name = 'marknote:note-list-create'
+
+    def search(self, query):
+        response = self.client.get(reverse(self.view_name) + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [note['pk'] for note in json.loads(response.content.decode('utf-8'))['notes']]
+
+    def test_search_backend_indexed(self):
+        """
+        Tests that the test database is searched with the FTS5 index.
+        """
+        self.assertIsInstance(search.get_backend(), search.SQLiteSearchBackend)
+
+    def test_search_ranked(self):
+        """
+        Tests that general search matches title or content and ranks title matches first.
+        """
+        # create notes
+        content_note = Note(title='aaa', content='a note about kittens', owner=self.user)
+        content_note.save()
+        title_note = Note(title='kittens', content='kittens', owner=self.user)
+        title_note.save()
+        Note(title='dogs', content='a note about dogs', owner=self.user).save()
+        # test response
+        self.assertEqual(self.search('?search=KITTEN'), [title_note.id, content_note.id])
+
+    def test_search_short_term(self):
+        """
+        Tests that terms too short to be indexed are still matched.
+        """
+        # create notes
+        note = Note(title='ab', content='content', owner=self.user)
+        note.save()
+        Note(title='cd', content='content', owner=self.user).save()
+        # test response
+        self.assertEqual(self.search('?search=b'), [note.id])
+        self.assertEqual(self.search('?title=b&content=tent'), [note.id])
+
+    def test_search_quotes(self):
+        """
+        Tests that FTS5 syntax in a query is matched literally.
+        """
+        # create note
+        note = Note(title='title', content='say "hi" AND bye', owner=self.user)
+        note.save()
+        # test response
+        self.assertEqual(self.search('?content="hi" AND'), [note.id])
+        self.assertEqual(self.search('?content=hi bye'), [])
+
+    def test_search_index_updated(self):
+        """
+        Tests that the index follows note updates and deletes.
+        """
+        # create note
+        note = Note(title='title', content='original', owner=self.user)
+        note.save()
+        # update note
+        note.content = 'changed'
+        note.save()
+        self.assertEqual(self.search('?content=original'), [])
+        self.assertEqual(self.search('?content=changed'), [note.id])
+        # delete note
+        note.delete()
+        self.assertEqual(self.search('?content=changed'), [])
+
+    def test_search_rebuild(self):
+        """
+        Tests that the management command rebuilds the index.
+        """
+        # create note and clear the index
+        note = Note(title='title', content='content', owner=self.user)
+        note.save()
+        search.get_backend().clear()
+        self.assertEqual(self.search('?content=content'), [])
+        # rebuild index
+        out = io.StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 1 notes', out.getvalue())
+        self.assertEqual(self.search('?content=content'), [note.id])
@@ -0,0 +1,193 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import io
+import json
+from unittest import mock
+
+from marknote import search
+from marknote.models import COMPRESSED_PREFIX, Note, NoteArchive
+from marknote.storage import archive_notes, compress_notes, get_report
+
+
+@override_settings(MARKNOTE_COMPRESS_THRESHOLD=100)
+class TestNoteStorage(APITestCase):
+    """
+    Test cases for compressed and archived note content.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # permissions
+        self.user.user_permissions.add(Permission.objects.get(codename='change_note'))
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # content
+        self.content = 'compressible content ' * 50
+
+    def get_stored(self, note):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT content FROM marknote_notes WHERE id = %s', [note.id])
+            return cursor.fetchone()[0]
+
+    def get(self, note):
+        response = self.client.get(reverse('marknote:note-retrieve-update-destroy', args=[note.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode('utf-8'))
+
+    def archive(self, note):
+        Note.objects.filter(id=note.id).update(updated=timezone.now() - timedelta(days=30))
+        self.assertEqual(archive_notes(days=7), 1)
+
+    def test_compressed(self):
+        """
+        Tests that content above the threshold is stored compressed and read back unchanged.
+        """
+        # create notes
+        note = Note.objects.create(title='large', content=self.content, owner=self.user)
+        small = Note.objects.create(title='small', content='\x01small', owner=self.user)
+        # test database
+        self.assertTrue(self.get_stored(note).startswith(COMPRESSED_PREFIX))
+        self.assertLess(len(self.get_stored(note)), len(self.content))
+        self.assertEqual(Note.objects.get(id=note.id).content, self.content)
+        self.assertEqual(Note.objects.get(id=small.id).content, '\x01small')
+        # test response
+        self.assertEqual(self.get(note)['content'], self.content)
+
+    def test_compress_existing(self):
+        """
+        Tests that existing large notes are compressed without changing their update time.
+        """
+        # create note before compression is enabled
+        with override_settings(MARKNOTE_COMPRESS_THRESHOLD=None):
+            note = Note.objects.create(title='large', content=self.content, owner=self.user)
+        self.assertFalse(self.get_stored(note).startswith(COMPRESSED_PREFIX))
+        # compress
+        self.assertEqual(compress_notes(), 1)
+        self.assertTrue(self.get_stored(note).startswith(COMPRESSED_PREFIX))
+        self.assertEqual(Note.objects.get(id=note.id).updated, note.updated)
+
+    def test_saved_while_archiving(self):
+        """
+        Tests that archiving reads notes locked and leaves a note saved since it was read as saved.
+        """
+        note = Note.objects.create(title='old', content='old content', owner=self.user)
+        Note.objects.filter(id=note.id).update(updated=timezone.now() - timedelta(days=30))
+        bulk_create = NoteArchive.objects.bulk_create
+
+        def save_first(objs):
+            Note.objects.filter(id=note.id).update(content='new content', updated=timezone.now())
+            return bulk_create(objs)
+
+        with mock.patch('django.db.models.query.QuerySet.select_for_update', autospec=True,
+                        side_effect=lambda qs: qs) as select_for_update:
+            with mock.patch.object(NoteArchive.objects, 'bulk_create', side_effect=save_first):
+                self.assertEqual(archive_notes(days=7), 0)
+        self.assertTrue(select_for_update.called)
+        self.assertEqual(Note.objects.get(id=note.id).content, 'new content')
+        self.assertFalse(NoteArchive.objects.exists())
+
+    def test_archived(self):
+        """
+        Tests that archived notes read the same through the API and are restored when updated.
+        """
+        # create and archive note
+        note = Note.objects.create(title='old', content='old content', owner=self.user)
+        self.archive(note)
+        self.assertEqual(self.get_stored(note), '')
+        self.assertEqual(self.get(note)['content'], 'old content')
+        # update title
+        response = self.client.patch(
+            reverse('marknote:note-retrieve-update-destroy', args=[note.id]), {'title': 'renamed'}, format='json',
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # test database
+        note = Note.objects.get(id=note.id)
+        self.assertFalse(note.archived)
+        self.assertEqual(note.content, 'old content')
+        self.assertEqual(note.content_length, len('old content'))
+        self.assertFalse(NoteArchive.objects.exists())
+
+    def test_archived_bulk(self):
+        """
+        Tests that bulk updates restore archived notes.
+        """
+        # create and archive note
+        note = Note.objects.create(title='old', content='old content', owner=self.user)
+        self.archive(note)
+        # request
+        response = self.client.post(reverse('marknote:note-bulk'), {'operations': [
+            {'action': 'update', 'pk': note.id, 'data': {'title': 'renamed'}},
+        ]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # test database
+        note = Note.objects.get(id=note.id)
+        self.assertEqual((note.title, note.content, note.archived), ('renamed', 'old content', False))
+        self.assertFalse(NoteArchive.objects.exists())
+
+    def test_search(self):
+        """
+        Tests that compressed and archived notes are found by indexed and unindexed searches.
+        """
+        # create notes
+        Note.objects.create(title='large', content=self.content + 'xy', owner=self.user)
+        archived = Note.objects.create(title='old', content='old xy content', owner=self.user)
+        self.archive(archived)
+        # request
+        for query in ('?content=xy', '?search=xy', '?content=compressible', '?search=old%20xy'):
+            response = self.client.get(reverse('marknote:note-list-create') + query)
+            notes = json.loads(response.content.decode('utf-8'))['notes']
+            self.assertEqual(len(notes), {'?content=compressible': 1, '?search=old%20xy': 1}.get(query, 2), query)
+        # rebuild
+        call_command('rebuild_search_index', stdout=io.StringIO())
+        response = self.client.get(reverse('marknote:note-list-create') + '?search=old%20xy')
+        self.assertEqual(len(json.loads(response.content.decode('utf-8'))['notes']), 1)
+
+    def test_search_encoding(self):
+        """
+        Tests that content searches never match the encoding of compressed notes, with and without the index.
+        """
+        # create note
+        note = Note.objects.create(title='large', content=self.content, owner=self.user)
+        stored = self.get_stored(note)
+        terms = [stored[i:i + length] for length in (2, 3) for i in range(2, len(stored) - length)]
+        terms = [term for term in terms if term.lower() not in self.content.lower() and term.isalnum()][:5]
+        self.assertTrue(terms)
+        # request
+        for backend in (search.BasicSearchBackend('default'), search.get_backend()):
+            with mock.patch.object(search, 'get_backend', return_value=backend):
+                for term in terms + ['compressible']:
+                    response = self.client.get(reverse('marknote:note-list-create'), {'content': term})
+                    notes = json.loads(response.content.decode('utf-8'))['notes']
+                    self.assertEqual(len(notes), 1 if term == 'compressible' else 0, (backend, term))
+        # stored content is read once per request
+        with mock.patch.object(search, 'get_backend', return_value=search.BasicSearchBackend('default')):
+            with mock.patch.object(search, 'get_stored_matches', return_value=[]) as get_stored_matches:
+                self.client.get(reverse('marknote:note-list-create'), {'content': 'compressible', 'limit': 1})
+        self.assertEqual(get_stored_matches.call_count, 1)
+
+    def test_report(self):
+        """
+        Tests that the report counts the notes and stored size of each tier.
+        """
+        # create notes
+        Note.objects.create(title='plain', content='plain', owner=self.user)
+        Note.objects.create(title='large', content=self.content, owner=self.user)
+        self.archive(Note.objects.create(title='old', content='old content', owner=self.user))
+        # report
+        report = get_report()
+        self.assertEqual({name: stats['notes'] for name, stats in report.items()}, {
+            'plain': 1, 'compressed': 1, 'archived': 1,
+        })
+        self.assertLess(report['compressed']['stored_size'], report['compressed']['content_size'])
+        call_command('note_storage_report', stdout=io.StringIO())
@@ -0,0 +1,121 @@
+from collections import OrderedDict
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers as drf_serializers
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from marknote import summaries
+from marknote.models import Folder, Note
+from marknote.serializers import FolderSummarySerializer, NoteSummarySerializer
+from marknote.summaries import FastJSONRenderer, ValuesSerializer, folder_summaries, note_summaries
+
+
+TITLES = ['plain', 'ñandú', 'emoji \U0001f4dd', 'line\u2028separator\u2029', 'control\x01\x1f', 'quote " and \\', '']
+
+
+class TestValuesSerializer(APITestCase):
+    """
+    Test cases for the values_list summary serializers.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        self.folder = Folder.objects.create(title='folder', owner=self.user)
+        for index, title in enumerate(TITLES):
+            Folder.objects.create(title=title, owner=self.user, container=self.folder if index % 2 else None)
+            Note.objects.create(
+                title=title, content=title * 50, owner=self.user, container=self.folder if index % 2 else None,
+            )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_notes(self):
+        """
+        Tests that note rows are represented and rendered byte for byte like NoteSummarySerializer.
+        """
+        notes = Note.objects.filter(owner=self.user)
+        expected = self.render(NoteSummarySerializer(notes, many=True).data)
+        self.assertEqual(self.render(note_summaries.serialize(notes)), expected)
+        self.assertEqual(FastJSONRenderer().render(note_summaries.serialize(notes)), expected)
+
+    def test_folders(self):
+        """
+        Tests that folder rows are represented and rendered byte for byte like FolderSummarySerializer.
+        """
+        folders = Folder.objects.filter(owner=self.user)
+        expected = self.render(FolderSummarySerializer(folders, many=True).data)
+        self.assertEqual(FastJSONRenderer().render(folder_summaries.serialize(folders)), expected)
+
+    def test_list_views(self):
+        """
+        Tests that the list views respond with the bytes of the serializers, paginated or not.
+        """
+        response = self.client.get(reverse('marknote:note-list-create'))
+        notes = Note.objects.filter(owner=self.user)
+        self.assertEqual(response.content, self.render({'notes': NoteSummarySerializer(notes, many=True).data}))
+        response = self.client.get(reverse('marknote:folder-list-create'), {'limit': 3})
+        folders = Folder.objects.filter(owner=self.user).order_by('title', '-updated', 'pk')[:3]
+        self.assertEqual(
+            response.content,
+            self.render(OrderedDict([
+                ('folders', FolderSummarySerializer(folders, many=True).data),
+                ('next', response.data['next']),
+            ])),
+        )
+        self.assertIsNotNone(response.data['next'])
+
+    def test_unsupported_field(self):
+        """
+        Tests that fields not read from a model field are rejected.
+        """
+        class MethodSerializer(FolderSummarySerializer):
+            extra = drf_serializers.SerializerMethodField()
+
+            class Meta(FolderSummarySerializer.Meta):
+                fields = FolderSummarySerializer.Meta.fields + ('extra',)
+
+        with self.assertRaises(ImproperlyConfigured):
+            ValuesSerializer(MethodSerializer).get_plan()
+
+
+class TestFastJSONRenderer(APITestCase):
+    """
+    Test cases for FastJSONRenderer.
+    """
+    data = OrderedDict([
+        ('text', 'ñ \u2028 \u2029 \x00 \x7f "\\/'),
+        ('numbers', [0, -1, 2 ** 53, True, False, None]),
+        ('nested', {'updated': timezone.now(), 'errors': [ErrorDetail('Invalid.', code='invalid')]}),
+        ('empty', [{}, [], '']),
+    ])
+
+    def test_identical(self):
+        """
+        Tests that the output matches JSONRenderer with and without orjson.
+        """
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        with mock.patch.object(summaries, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_fallback(self):
+        """
+        Tests that indented output and data orjson cannot encode are rendered by JSONRenderer.
+        """
+        data = {'big': 2 ** 70, 1: 'key'}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, 'application/json; indent=2'),
+            JSONRenderer().render(self.data, 'application/json; indent=2'),
+        )
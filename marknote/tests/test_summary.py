@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+import hashlib
+import json
+
+from marknote.models import Folder, Note
+
+
+class TestNoteSummary(APITestCase):
+    """
+    Test cases for the precomputed note summary fields.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # create folder with a note
+        self.folder = Folder.objects.create(title='folder', owner=self.user)
+        self.content = '# Heading\n\n' + 'word ' * 100
+        self.note = Note.objects.create(title='note', content=self.content, owner=self.user, container=self.folder)
+
+    def test_summary_fields(self):
+        """
+        Tests that the summary fields are computed on save.
+        """
+        self.assertEqual(self.note.content_length, len(self.content))
+        self.assertEqual(self.note.preview, ('# Heading ' + 'word ' * 20)[:100])
+        self.assertEqual(self.note.content_hash, hashlib.sha256(self.content.encode('utf-8')).hexdigest())
+        # update content
+        self.note.content = 'changed'
+        self.note.save(update_fields=['content'])
+        note = Note.objects.get(id=self.note.id)
+        self.assertEqual(note.content_length, 7)
+        self.assertEqual(note.preview, 'changed')
+
+    def test_summary_not_loading_content(self):
+        """
+        Tests that the list and folder views return summaries without selecting content.
+        """
+        for url, key in (
+            (reverse('marknote:note-list-create'), 'notes'),
+            (reverse('marknote:folder-retrieve-update-destroy', args=[self.folder.id]), 'notes'),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            body = json.loads(response.content.decode('utf-8'))
+            self.assertEqual(body[key][0]['content_length'], len(self.content))
+            self.assertEqual(body[key][0]['preview'], self.note.preview)
+            self.assertEqual(body[key][0]['content_hash'], self.note.content_hash)
+            self.assertFalse('content' in body[key][0])
+            for query in queries.captured_queries:
+                self.assertNotRegex(query['sql'], r'"marknote_notes"\."content"(,| FROM)')
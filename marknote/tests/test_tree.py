@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase, APIClient
+
+import json
+
+from marknote.models import Folder, Note
+
+
+class TestFolderTreeGet(APITestCase):
+    """
+    Test cases for GET requests on FolderTreeView.
+    """
+    def setUp(self):
+        # create test user
+        self.username = 'test'
+        self.password = 'test'
+        self.user = User.objects.create_user(username=self.username, password=self.password)
+        # log in test client
+        self.client.login(username=self.username, password=self.password)
+        # view name
+        self.view_name = 'marknote:folder-tree'
+        # create tree a/b/c and d
+        self.a = Folder.objects.create(title='a', owner=self.user)
+        self.b = Folder.objects.create(title='b', owner=self.user, container=self.a)
+        self.c = Folder.objects.create(title='c', owner=self.user, container=self.b)
+        self.d = Folder.objects.create(title='d', owner=self.user)
+        self.note_top = Note.objects.create(title='top', content='content', owner=self.user)
+        self.note_c = Note.objects.create(title='c', content='content', owner=self.user, container=self.c)
+
+    def get(self, query=''):
+        response = self.client.get(reverse(self.view_name) + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_tree(self):
+        """
+        Tests that the whole folder tree is nested in the default ordering.
+        """
+        body = self.get()
+        self.assertEqual([folder['pk'] for folder in body['folders']], [self.a.id, self.d.id])
+        b = body['folders'][0]['folders'][0]
+        self.assertEqual(b['pk'], self.b.id)
+        self.assertEqual(b['folders'][0]['pk'], self.c.id)
+        self.assertEqual(b['folders'][0]['folders'], [])
+        self.assertFalse('notes' in body)
+        self.assertFalse('notes' in b)
+
+    def test_tree_notes(self):
+        """
+        Tests that note summaries are nested in their folders when requested.
+        """
+        body = self.get('?notes=true')
+        self.assertEqual([note['pk'] for note in body['notes']], [self.note_top.id])
+        c = body['folders'][0]['folders'][0]['folders'][0]
+        self.assertEqual([note['pk'] for note in c['notes']], [self.note_c.id])
+        self.assertFalse('content' in c['notes'][0])
+
+    def test_tree_query_count(self):
+        """
+        Tests that the tree is built with a constant number of queries regardless of depth.
+        """
+        # deepen the tree
+        container = self.c
+        for i in range(10):
+            container = Folder.objects.create(title=str(i), owner=self.user, container=container)
+            Note.objects.create(title=str(i), content='content', owner=self.user, container=container)
+        # session, user, folders, notes
+        with self.assertNumQueries(4):
+            self.get('?notes=true')
+
+    def test_tree_subtree(self):
+        """
+        Tests that the tree can be rooted at a folder.
+        """
+        body = self.get('?notes=true&subtree={}'.format(self.b.id))
+        self.assertEqual([folder['pk'] for folder in body['folders']], [self.c.id])
+        self.assertEqual(body['notes'], [])
+
+    def test_tree_owned(self):
+        """
+        Tests that only owned folders are in the tree.
+        """
+        Folder.objects.create(title='other', owner=User.objects.create_user(username='other_user'))
+        body = self.get()
+        self.assertEqual(len(body['folders']), 2)
+
+    def test_tree_not_authenticated(self):
+        """
+        Tests that the tree is not retrieved when the user is not authenticated.
+        """
+        response = APIClient().get(reverse(self.view_name))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
@@ -6,13 +6,46 @@ urlpatterns = [
     url(r'^note$',
         views.NoteListCreateView.as_view(),
         name='note-list-create'),
+    url(r'^note/bulk$',
+        views.NoteBulkView.as_view(),
+        name='note-bulk'),
     url(r'^note/(?P<pk>\d+)$',
         views.NoteRetrieveUpdateDestroyView.as_view(),
         name='note-retrieve-update-destroy'),
+    url(r'^note/(?P<pk>\d+)/revisions$',
+        views.NoteRevisionListView.as_view(),
+        name='note-revision-list'),
+    url(r'^note/(?P<pk>\d+)/revisions/(?P<number>\d+)$',
+        views.NoteRevisionRetrieveView.as_view(),
+        name='note-revision-retrieve'),
+    url(r'^note/(?P<pk>\d+)/revisions/(?P<number>\d+)/restore$',
+        views.NoteRevisionRestoreView.as_view(),
+        name='note-revision-restore'),
     url(r'^folder$',
         views.FolderListCreateView.as_view(),
         name='folder-list-create'),
+    url(r'^folder/bulk$',
+        views.FolderBulkView.as_view(),
+        name='folder-bulk'),
+    url(r'^folder/tree$',
+        views.FolderTreeView.as_view(),
+        name='folder-tree'),
     url(r'^folder/(?P<pk>\d+)$',
         views.FolderRetrieveUpdateDestroyView.as_view(),
         name='folder-retrieve-update-destroy'),
+    url(r'^autocomplete$',
+        views.AutocompleteView.as_view(),
+        name='autocomplete'),
+    url(r'^changes$',
+        views.ChangeFeedView.as_view(),
+        name='changes'),
+    url(r'^events$',
+        views.EventStreamView.as_view(),
+        name='events'),
+    url(r'^export$',
+        views.ExportView.as_view(),
+        name='export'),
+    url(r'^import$',
+        views.ImportView.as_view(),
+        name='import'),
 ]
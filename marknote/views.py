@@ -1,64 +1,196 @@
-from django.db.models import Q
-from rest_framework.authentication import SessionAuthentication, TokenAuthentication
-from rest_framework.permissions import DjangoModelPermissions
-from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
+import re
 
-from marknote import serializers
-from marknote.models import Note, Folder
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+from rest_framework.authentication import SessionAuthentication
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.generics import (
+    GenericAPIView, ListAPIView, ListCreateAPIView, RetrieveAPIView, RetrieveUpdateDestroyAPIView, get_object_or_404,
+)
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
 
+from marknote import changes, export, search, serializers
+from marknote.authentication import CachedTokenAuthentication
+from marknote.autocomplete import get_matches
+from marknote.bulk import FolderBulkOperations, NoteBulkOperations
+from marknote.conditional import FolderConditionalGetMixin, ListConditionalGetMixin, NoteConditionalGetMixin
+from marknote.events import EventStream, EventStreamRenderer
+from marknote.expansion import FolderExpansion, get_expansion_options
+from marknote.importer import TYPES as IMPORT_TYPES, Importer, get_import_type
+from marknote.models import Change, Note, NoteRevision, Folder, load_archived_content, subtree_q
+from marknote.pagination import KeysetPagination
+from marknote.permissions import CachedDjangoModelPermissions, has_perms
+from marknote.response_cache import CachedResponseMixin
+from marknote.revisions import get_revision_content
+from marknote.settings import marknote_settings
+from marknote.summaries import FastJSONRenderer, folder_summaries, folder_titles, note_summaries, note_titles
 
-class NoteListCreateView(ListCreateAPIView):
-    authentication_classes = (SessionAuthentication, TokenAuthentication)
-    permission_classes = (DjangoModelPermissions,)
+# the largest value of an integer column on every supported database
+MAX_INTEGER = 2 ** 31 - 1
+
+
+def parse_integer(value):
+    """
+    Returns value as an integer if it is a decimal number an integer column can hold, and None otherwise.
+    """
+    if value is None or not re.fullmatch('[0-9]+', value) or int(value) > MAX_INTEGER:
+        return None
+    return int(value)
+
+
+def get_subtree_path(request):
+    """
+    Returns the path of the owned folder named by the subtree query parameter, an empty string if it does not exist,
+    or None if no subtree was requested.
+    """
+    pk = request.GET.get('subtree')
+    if pk is None:
+        return None
+    pk = parse_integer(pk)
+    if pk is None:
+        return ''
+    return Folder.objects.filter(owner=request.user.id, pk=pk).values_list('path', flat=True).first() or ''
+
+
+class NoteListCreateView(ListConditionalGetMixin, CachedResponseMixin, ListCreateAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
     lookup_field = 'pk'
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     serializer_class = serializers.NoteSummarySerializer
+    pagination_class = KeysetPagination
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        # the subtree filter depends on the folders
+        return [('notes', request.user.id), ('folders', request.user.id)]
+
+    def get_queryset(self):
+        # built once per request, since content searches may read stored content in Python
+        if getattr(self, '_queryset', None) is not None:
+            return self._queryset.all()
+        # summaries never include content
+        qs = Note.objects.all().filter(owner=self.request.user.id).defer('content')
+        # subtree filter
+        path = get_subtree_path(self.request)
+        if path == '':
+            qs = qs.none()
+        elif path is not None:
+            qs = qs.filter(subtree_q(path, 'container__path'))
+        # general, title, and content search
+        self._queryset = search.get_backend(qs.db).filter(
+            qs,
+            search=self.request.GET.get('search'),
+            title=self.request.GET.get('title'),
+            content=self.request.GET.get('content'),
+        )
+        return self._queryset.all()
+
+    def list(self, request, *args, **kwargs):
+        # summaries are read as rows, skipping the serializer fields
+        rows = note_summaries.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        data = note_summaries.to_representation(page if page is not None else rows)
+        return Response(self.paginator.get_envelope('notes', data))
+
+
+class NoteRetrieveUpdateDestroyView(NoteConditionalGetMixin, RetrieveUpdateDestroyAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
+    lookup_field = 'pk'
+    serializer_class = serializers.NoteSerializer
 
     def get_queryset(self):
         qs = Note.objects.all().filter(owner=self.request.user.id)
-        # general search
-        print(self.request.user.id)
-        query = self.request.GET.get('search')
-        if query is not None:
-            qs = qs.filter(
-                Q(title__icontains=query) |
-                Q(content__icontains=query)
-            ).distinct()
-        # title search
-        query = self.request.GET.get('title')
-        if query is not None:
-            qs = qs.filter(title__icontains=query)
-        # content search
-        query = self.request.GET.get('content')
-        if query is not None:
-            qs = qs.filter(content__icontains=query)
+        if self.request.method in ('PUT', 'PATCH'):
+            # content patches are applied to the content their base was checked against
+            qs = qs.select_for_update()
         return qs
 
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super(NoteRetrieveUpdateDestroyView, self).update(request, *args, **kwargs)
+
+
+class NoteRevisionListView(ListAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
+    serializer_class = serializers.NoteRevisionSummarySerializer
+
+    def get_queryset(self):
+        return NoteRevision.objects.all().filter(
+            note__owner=self.request.user.id,
+            note=self.kwargs['pk'],
+        ).defer('data').order_by('-number')
+
     def list(self, request, *args, **kwargs):
-        response = super(NoteListCreateView, self).list(request, *args, **kwargs)
-        response.data = {
-            'notes': response.data,
-        }
+        if not Note.objects.filter(owner=request.user.id, pk=kwargs['pk']).exists():
+            raise NotFound()
+        response = super(NoteRevisionListView, self).list(request, *args, **kwargs)
+        response.data = {'revisions': response.data}
         return response
 
 
-class NoteRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
-    authentication_classes = (SessionAuthentication, TokenAuthentication)
-    permission_classes = (DjangoModelPermissions,)
+class NoteRevisionRetrieveView(RetrieveAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
+    lookup_field = 'number'
+    serializer_class = serializers.NoteRevisionSerializer
+
+    def get_queryset(self):
+        return NoteRevision.objects.all().filter(note__owner=self.request.user.id, note=self.kwargs['pk'])
+
+
+class RestorePermissions(CachedDjangoModelPermissions):
+    # restoring a revision changes the note
+    perms_map = dict(CachedDjangoModelPermissions.perms_map, POST=['%(app_label)s.change_%(model_name)s'])
+
+
+class NoteRevisionRestoreView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (RestorePermissions,)
     lookup_field = 'pk'
     serializer_class = serializers.NoteSerializer
 
     def get_queryset(self):
         return Note.objects.all().filter(owner=self.request.user.id)
 
+    def post(self, request, *args, **kwargs):
+        """
+        Sets the title and content of the note to those of the revision, which records a new revision.
+        """
+        note = self.get_object()
+        revision = get_object_or_404(NoteRevision.objects.filter(note=note), number=kwargs['number'])
+        note.thaw()
+        note.title = revision.title
+        note.content = get_revision_content(revision)
+        note.save()
+        return Response(self.get_serializer(note).data)
 
-class FolderListCreateView(ListCreateAPIView):
-    authentication_classes = (SessionAuthentication, TokenAuthentication)
-    permission_classes = (DjangoModelPermissions,)
+
+class FolderListCreateView(ListConditionalGetMixin, CachedResponseMixin, ListCreateAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
     lookup_field = 'pk'
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     serializer_class = serializers.FolderSummarySerializer
+    pagination_class = KeysetPagination
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [('folders', request.user.id)]
 
     def get_queryset(self):
         qs = Folder.objects.all().filter(owner=self.request.user.id)
+        # subtree filter
+        path = get_subtree_path(self.request)
+        if path == '':
+            return qs.none()
+        if path is not None:
+            qs = qs.filter(subtree_q(path)).exclude(path=path)
         query = self.request.GET.get('search')
         if query is not None:
             qs = qs.filter(title__icontains=query)
@@ -68,18 +200,244 @@ class FolderListCreateView(ListCreateAPIView):
         return qs
 
     def list(self, request, *args, **kwargs):
-        response = super(FolderListCreateView, self).list(request, *args, **kwargs)
-        response.data = {
-            'folders': response.data,
-        }
-        return response
+        rows = folder_summaries.get_rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        data = folder_summaries.to_representation(page if page is not None else rows)
+        return Response(self.paginator.get_envelope('folders', data))
 
 
-class FolderRetrieveUpdateDestroyView(RetrieveUpdateDestroyAPIView):
-    authentication_classes = (SessionAuthentication, TokenAuthentication)
-    permission_classes = (DjangoModelPermissions,)
+class FolderRetrieveUpdateDestroyView(FolderConditionalGetMixin, CachedResponseMixin, RetrieveUpdateDestroyAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
     lookup_field = 'pk'
     serializer_class = serializers.FolderSerializer
 
+    def get_cache_scopes(self, request, *args, **kwargs):
+        scopes = [('folders', request.user.id), ('folder', kwargs['pk'])]
+        options = get_expansion_options(request)
+        if options is not None and options['depth'] > 1:
+            # nested notes are in other folders' scopes
+            scopes.append(('notes', request.user.id))
+        return scopes
+
+    def get_queryset(self):
+        qs = Folder.objects.all().filter(owner=self.request.user.id)
+        if self.request.method == 'GET' and get_expansion_options(self.request) is not None:
+            return qs
+        return qs.prefetch_related(
+            Prefetch('notes', queryset=Note.objects.defer('content')),
+            'folders',
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        options = get_expansion_options(request)
+        if options is None:
+            return super(FolderRetrieveUpdateDestroyView, self).retrieve(request, *args, **kwargs)
+        expansion = FolderExpansion(self.get_object(), **options)
+        return Response(expansion.get_data(self.get_serializer_context()))
+
+
+class FolderTreeView(CachedResponseMixin, ListAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (CachedDjangoModelPermissions,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    serializer_class = serializers.FolderSummarySerializer
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [('notes', request.user.id), ('folders', request.user.id)]
+
     def get_queryset(self):
         return Folder.objects.all().filter(owner=self.request.user.id)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Assembles the nested folder tree in memory from one flat query, plus one for note summaries if requested.
+        Folders and notes whose container is not in the result are returned at the top level.
+        """
+        include_notes = request.GET.get('notes', '').lower() in ('1', 'true', 'yes')
+        folders = self.get_queryset()
+        notes = Note.objects.all().filter(owner=request.user.id).defer('content')
+        # subtree filter
+        path = get_subtree_path(request)
+        if path == '':
+            folders = folders.none()
+            notes = notes.none()
+        elif path is not None:
+            folders = folders.filter(subtree_q(path)).exclude(path=path)
+            notes = notes.filter(subtree_q(path, 'container__path'))
+        # assemble tree
+        folders = folder_summaries.serialize(folders)
+        nodes = {}
+        for folder in folders:
+            folder['folders'] = []
+            if include_notes:
+                folder['notes'] = []
+            nodes[folder['pk']] = folder
+        tree = {'folders': []}
+        for folder in folders:
+            nodes.get(folder['container'], tree)['folders'].append(folder)
+        if include_notes:
+            tree['notes'] = []
+            for note in note_summaries.serialize(notes):
+                nodes.get(note['container'], tree)['notes'].append(note)
+        return Response(tree)
+
+
+class AutocompleteView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    types = (('note', 'notes', Note, note_titles), ('folder', 'folders', Folder, folder_titles))
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = marknote_settings.AUTOCOMPLETE_LIMIT
+        return max(1, min(limit, marknote_settings.AUTOCOMPLETE_MAX_LIMIT))
+
+    def get(self, request, *args, **kwargs):
+        """
+        Lists the most recently updated notes and folders whose titles start with the title query parameter, ignoring
+        case, accents, and repeated spaces, optionally of one type.
+        """
+        requested = request.query_params.get('type')
+        if requested is not None and requested not in [name for name, key, model, titles in self.types]:
+            return Response({'type': ['Must be note or folder.']}, status=status.HTTP_400_BAD_REQUEST)
+        prefix = request.query_params.get('title', '')
+        limit = self.get_limit(request)
+        data = {}
+        for name, key, model, titles in self.types:
+            if requested in (None, name):
+                rows = titles.get_rows(model.objects.filter(owner=request.user.id))
+                data[key] = titles.to_representation(get_matches(rows, prefix, limit))
+        return Response(data)
+
+
+class ChangeFeedView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Lists the notes and folders created, updated, or deleted since the cursor in the since query parameter.
+        """
+        since = parse_integer(request.query_params.get('since', '0'))
+        if since is None:
+            return Response(
+                {'since': ['Must be a cursor from a previous response.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rows, cursor, more = changes.get_changes(request.user.id, since, KeysetPagination().get_limit(request))
+        notes = [row['object'] for row in rows if row['type'] == Change.NOTE and not row['deleted']]
+        load_archived_content(notes)
+        data = []
+        for row in rows:
+            obj = row.pop('object')
+            if obj is None:
+                row['data'] = None
+            elif row['type'] == Change.NOTE:
+                row['data'] = serializers.NoteSerializer(obj, context=self.get_serializer_context()).data
+            else:
+                row['data'] = serializers.FolderSummarySerializer(obj, context=self.get_serializer_context()).data
+            data.append(row)
+        return Response({'changes': data, 'cursor': cursor, 'more': more})
+
+
+class EventStreamView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (JSONRenderer, EventStreamRenderer)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Streams the changes of the user's notes and folders as server-sent events, from the Last-Event-ID header or
+        last_event_id query parameter if given and from now otherwise.
+        """
+        last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+        cursor = parse_integer(last_event_id)
+        if last_event_id is not None and cursor is None:
+            return Response(
+                {'last_event_id': ['Must be the id of a previous event.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if cursor is None:
+            cursor = changes.get_latest_change(request.user.id)
+        stream = EventStream(request.user.id, cursor)
+        response = StreamingHttpResponse(stream, content_type=EventStreamRenderer.media_type)
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        response.asgi_streaming_content = stream.stream_async
+        return response
+
+
+class ExportView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Streams the user's folders and notes as NDJSON, or as a zip of markdown files with type=zip.
+        """
+        # the format query parameter is taken by content negotiation
+        export_format = request.GET.get('type', 'ndjson')
+        if export_format not in export.FORMATS:
+            return Response(
+                {'type': ['Must be one of {}.'.format(', '.join(export.FORMATS))]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        content_type, extension = export.FORMATS[export_format]
+        response = StreamingHttpResponse(export.iter_export(request.user.id, export_format), content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="marknote.{}"'.format(extension)
+        return response
+
+
+class ImportView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+    parser_classes = (MultiPartParser,)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Imports an uploaded NDJSON export or zip or tar archive of markdown files into the user's folders and notes.
+        """
+        if not has_perms(request.user, ('marknote.add_note', 'marknote.add_folder')):
+            raise PermissionDenied()
+        file = request.FILES.get('file')
+        if file is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        import_type = request.data.get('type') or get_import_type(file.name)
+        if import_type not in IMPORT_TYPES:
+            return Response(
+                {'type': ['Must be one of {}.'.format(', '.join(IMPORT_TYPES))]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(Importer(request.user).run(file, import_type))
+
+
+class BulkView(GenericAPIView):
+    authentication_classes = (SessionAuthentication, CachedTokenAuthentication)
+    # model permissions are checked for each operation
+    permission_classes = (IsAuthenticated,)
+    bulk_class = None
+
+    def post(self, request, *args, **kwargs):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list):
+            return Response({'operations': ['Expected a list of operations.']}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > marknote_settings.BULK_MAX_OPERATIONS:
+            return Response(
+                {'operations': ['Ensure there are no more than {} operations.'.format(
+                    marknote_settings.BULK_MAX_OPERATIONS,
+                )]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({'results': self.bulk_class(request, operations).run()})
+
+
+class NoteBulkView(BulkView):
+    bulk_class = NoteBulkOperations
+
+
+class FolderBulkView(BulkView):
+    bulk_class = FolderBulkOperations
@@ -33,16 +33,19 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
         'Programming Language :: Python :: 3.7',
         'Topic :: Internet :: WWW/HTTP',
     ],
     keywords='django rest api notes',
-    python_requires='>=3.5',
+    python_requires='>=3.6',
     install_requires=[
         'django',
         'djangorestframework'
-    ]
+    ],
+    extras_require={
+        'markdown': ['markdown'],
+        'orjson': ['orjson'],
+    },
 )
 